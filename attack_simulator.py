@@ -1,206 +1,199 @@
 #!/usr/bin/env python3
+import argparse
 import subprocess
+import sys
 import time
-import os
-import json
-import threading
-import random
 from datetime import datetime
-from scapy.all import sniff, IP, TCP, UDP, ICMP, wrpcap, send, sr1
+from capture_session import session_options as capture_options, start_sessions, write_summary, get_interface
+from rollups import update_rollups
+from packet_generator import PacketGenerator
+from probe_engine import run_probe, DEFAULT_CONCURRENCY
+from pcap_replay import PcapReplayer
 
 TARGET_IP = "127.0.0.1"
 OUTPUT_DIR = "../captures/attack"
-
-attack_stats = {
-    "start_time": "",
-    "end_time": "",
-    "total_packets": 0,
-    "tcp_packets": 0,
-    "udp_packets": 0,
-    "icmp_packets": 0,
-    "unique_src_ips": [],
-    "unique_dst_ips": [],
-    "port_frequency": {},
-    "packets_per_second": [],
-    "attacks_performed": []
-}
-
-captured_packets = []
-seen_src = set()
-seen_dst = set()
-second_counter = {"count": 0, "last_second": int(time.time())}
-
-def get_interface():
-    result = subprocess.run(['ip', 'route'], capture_output=True, text=True)
-    for line in result.stdout.split('\n'):
-        if 'default' in line:
-            parts = line.split()
-            if 'dev' in parts:
-                return parts[parts.index('dev') + 1]
-    return "wlan0"
-
-def packet_handler(pkt):
-    global second_counter
-    if not pkt.haslayer(IP):
-        return
-    attack_stats["total_packets"] += 1
-    captured_packets.append(pkt)
-    current_second = int(time.time())
-    if current_second != second_counter["last_second"]:
-        attack_stats["packets_per_second"].append(second_counter["count"])
-        second_counter["count"] = 1
-        second_counter["last_second"] = current_second
-    else:
-        second_counter["count"] += 1
-    seen_src.add(pkt[IP].src)
-    seen_dst.add(pkt[IP].dst)
-    if pkt.haslayer(TCP):
-        attack_stats["tcp_packets"] += 1
-        port = pkt[TCP].dport
-        attack_stats["port_frequency"][port] = attack_stats["port_frequency"].get(port, 0) + 1
-    elif pkt.haslayer(UDP):
-        attack_stats["udp_packets"] += 1
-    elif pkt.haslayer(ICMP):
-        attack_stats["icmp_packets"] += 1
-
-def attack_port_scan():
+CAPTURE_SECONDS = 90
+CAPTURE_FILTER = "ip"
+SNAPLEN = 0
+STREAM_TO_DISK = True
+ROTATE_MAX_BYTES = 100 * 1024 * 1024
+ROTATE_MAX_SECONDS = 0
+RING_SIZE = 1000
+WRITE_FEATURES = True
+SKETCH_MODE = False
+SKETCH_TOP_K = 64
+RUN_DETECTOR = True
+TRACK_FLOWS = True
+FLOW_CAPACITY = 200000
+CAPTURE_BACKEND = "sniff"  # "sniff", "pipeline" or "ring"
+PIPELINE_WORKERS = 1
+QUEUE_SIZE = 65536
+QUEUE_POLICY = "drop_oldest"
+# Sampled handler latency, kernel drops, queue depth and memory, written
+# to ../captures/metrics every METRICS_INTERVAL seconds while capturing.
+INSTRUMENT = True
+METRICS_INTERVAL = 10
+FLOOD_RATE = 0
+FLOOD_BURST = 64
+BANNER_PORTS = [21, 22, 23, 25, 80, 443, 3306, 8080]
+PROBE_MODE = "connect"
+PROBE_CONCURRENCY = DEFAULT_CONCURRENCY
+PROBE_TIMEOUT = 0.5
+REPLAY_IFACE = "lo"
+
+def session_options():
+    return capture_options(sys.modules[__name__])
+
+def attack_port_scan(ports="1-1000"):
     print("\n  [ATTACK 1] Nmap Port Scan...")
     start = datetime.now().isoformat()
     result = subprocess.run(
-        ['nmap', '-sS', '-p', '1-1000', '--open', TARGET_IP],
+        ['nmap', '-sS', '-p', ports, '--open', TARGET_IP],
         capture_output=True, text=True
     )
-    attack_stats["attacks_performed"].append({
+    record = {
         "type": "nmap_port_scan",
         "target": TARGET_IP,
-        "ports_scanned": "1-1000",
+        "ports_scanned": ports,
         "start_time": start,
         "end_time": datetime.now().isoformat()
-    })
+    }
     print("  [✓] Port scan complete")
+    return record
+
+def run_flood(kind, count, rate=FLOOD_RATE, duration=None, stop=None):
+    generator = PacketGenerator(TARGET_IP, kind, rate=rate, duration=duration, count=count, burst=FLOOD_BURST,
+                                stop=stop)
+    return generator.run()
 
-def attack_syn_flood():
-    print("\n  [ATTACK 2] SYN Flood (200 packets)...")
+def attack_syn_flood(count=200, rate=FLOOD_RATE, duration=None, stop=None):
+    print(f"\n  [ATTACK 2] SYN Flood ({count or 'timed'} packets)...")
     start = datetime.now().isoformat()
-    for i in range(200):
-        pkt = IP(dst=TARGET_IP)/TCP(
-            dport=random.randint(1, 65535),
-            sport=random.randint(1024, 65535),
-            flags="S"
-        )
-        send(pkt, verbose=False)
-    attack_stats["attacks_performed"].append({
+    result = run_flood("syn", count, rate, duration, stop)
+    record = {
         "type": "syn_flood",
         "target": TARGET_IP,
-        "packets_sent": 200,
+        "packets_sent": result["packets_sent"],
+        "target_pps": result["target_pps"],
+        "achieved_pps": result["achieved_pps"],
+        "send_errors": result["send_errors"],
         "start_time": start,
         "end_time": datetime.now().isoformat()
-    })
-    print("  [✓] SYN flood complete")
+    }
+    print(f"  [✓] SYN flood complete ({result['achieved_pps']:,} pkt/s)")
+    return record
 
-def attack_icmp_flood():
-    print("\n  [ATTACK 3] ICMP Flood (100 packets)...")
+def attack_icmp_flood(count=100, rate=FLOOD_RATE, duration=None, stop=None):
+    print(f"\n  [ATTACK 3] ICMP Flood ({count or 'timed'} packets)...")
     start = datetime.now().isoformat()
-    for i in range(100):
-        pkt = IP(dst=TARGET_IP)/ICMP()
-        send(pkt, verbose=False)
-    attack_stats["attacks_performed"].append({
+    result = run_flood("icmp", count, rate, duration, stop)
+    record = {
         "type": "icmp_flood",
         "target": TARGET_IP,
-        "packets_sent": 100,
+        "packets_sent": result["packets_sent"],
+        "target_pps": result["target_pps"],
+        "achieved_pps": result["achieved_pps"],
+        "send_errors": result["send_errors"],
         "start_time": start,
         "end_time": datetime.now().isoformat()
-    })
-    print("  [✓] ICMP flood complete")
+    }
+    print(f"  [✓] ICMP flood complete ({result['achieved_pps']:,} pkt/s)")
+    return record
 
-def attack_udp_flood():
-    print("\n  [ATTACK 4] UDP Flood (150 packets)...")
+def attack_udp_flood(count=150, rate=FLOOD_RATE, duration=None, stop=None):
+    print(f"\n  [ATTACK 4] UDP Flood ({count or 'timed'} packets)...")
     start = datetime.now().isoformat()
-    for i in range(150):
-        pkt = IP(dst=TARGET_IP)/UDP(
-            dport=random.randint(1, 65535),
-            sport=random.randint(1024, 65535)
-        )
-        send(pkt, verbose=False)
-    attack_stats["attacks_performed"].append({
+    result = run_flood("udp", count, rate, duration, stop)
+    record = {
         "type": "udp_flood",
         "target": TARGET_IP,
-        "packets_sent": 150,
+        "packets_sent": result["packets_sent"],
+        "target_pps": result["target_pps"],
+        "achieved_pps": result["achieved_pps"],
+        "send_errors": result["send_errors"],
         "start_time": start,
         "end_time": datetime.now().isoformat()
-    })
-    print("  [✓] UDP flood complete")
+    }
+    print(f"  [✓] UDP flood complete ({result['achieved_pps']:,} pkt/s)")
+    return record
 
-def attack_banner_grab():
-    print("\n  [ATTACK 5] Banner Grab...")
+def attack_banner_grab(ports=None, mode=PROBE_MODE):
+    ports = ports or BANNER_PORTS
+    print(f"\n  [ATTACK 5] Banner Grab ({len(ports)} ports, {mode})...")
     start = datetime.now().isoformat()
-    common_ports = [21, 22, 23, 25, 80, 443, 3306, 8080]
-    grabbed = []
-    for port in common_ports:
-        pkt = IP(dst=TARGET_IP)/TCP(dport=port, flags="S")
-        response = sr1(pkt, timeout=0.5, verbose=False)
-        if response:
-            grabbed.append(port)
-    attack_stats["attacks_performed"].append({
+    results, elapsed = run_probe(TARGET_IP, ports, mode=mode,
+                                 concurrency=PROBE_CONCURRENCY, timeout=PROBE_TIMEOUT)
+    responsive = [r for r in results if r["state"] in ("open", "closed")]
+    record = {
         "type": "banner_grab",
         "target": TARGET_IP,
-        "ports_probed": common_ports,
-        "responsive_ports": grabbed,
+        "probe_mode": mode,
+        "ports_probed": ports if len(ports) <= 64 else f"{min(ports)}-{max(ports)} ({len(ports)} ports)",
+        "responsive_ports": [r["port"] for r in responsive],
+        "open_ports": [
+            {"port": r["port"], "latency_ms": r["latency_ms"], "banner": r["banner"]}
+            for r in results if r["state"] == "open"
+        ],
+        "probe_seconds": round(elapsed, 3),
         "start_time": start,
         "end_time": datetime.now().isoformat()
-    })
-    print(f"  [✓] Banner grab complete")
+    }
+    print(f"  [✓] Banner grab complete ({len(responsive)} responsive in {elapsed:.2f}s)")
+    return record
 
-def run_attacks():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    interface = get_interface()
+def attack_replay(pcaps, speed=1.0, pps=None, iface=REPLAY_IFACE, stop=None):
+    print(f"\n  [REPLAY] {len(pcaps)} pcap file(s) on {iface} "
+          f"({f'{pps:g} pkt/s' if pps else f'{speed:g}x' if speed else 'max rate'})...")
+    start = datetime.now().isoformat()
+    result = PcapReplayer(pcaps, iface, speed, pps, stop=stop).run()
+    record = {
+        "type": "pcap_replay",
+        "target": iface,
+        **result,
+        "start_time": start,
+        "end_time": datetime.now().isoformat()
+    }
+    print(f"  [✓] Replay complete ({result['packets_sent']} packets, {result['achieved_pps']:,} pkt/s)")
+    return record
+
+def run_attacks(interfaces=None, duration=CAPTURE_SECONDS, replay=None, speed=1.0, pps=None):
+    # replay: pcap files to re-inject instead of the live attack mix, for
+    # runs that have to be repeatable.
+    interfaces = interfaces or [get_interface()]
     print("\n[*] Starting attack simulation — target: localhost (SAFE)")
-    attack_stats["start_time"] = datetime.now().isoformat()
-
-    capture_thread = threading.Thread(
-        target=lambda: sniff(
-            iface=interface,
-            prn=packet_handler,
-            timeout=90,
-            store=False
-        )
-    )
-    capture_thread.start()
+    sessions = start_sessions("attack", interfaces, OUTPUT_DIR, duration, **session_options())
     time.sleep(2)
 
-    attack_port_scan()
-    time.sleep(3)
-    attack_syn_flood()
-    time.sleep(3)
-    attack_icmp_flood()
-    time.sleep(3)
-    attack_udp_flood()
-    time.sleep(3)
-    attack_banner_grab()
-
-    print("\n[*] Waiting for capture thread...")
-    capture_thread.join()
-
-    attack_stats["end_time"] = datetime.now().isoformat()
-    attack_stats["unique_src_ips"] = list(seen_src)
-    attack_stats["unique_dst_ips"] = list(seen_dst)
-    top_ports = dict(sorted(
-        attack_stats["port_frequency"].items(),
-        key=lambda x: x[1], reverse=True
-    )[:20])
-    attack_stats["port_frequency"] = top_ports
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    pcap_file = f"{OUTPUT_DIR}/attack_{timestamp}.pcap"
-    wrpcap(pcap_file, captured_packets)
-    json_file = f"{OUTPUT_DIR}/attack_stats_{timestamp}.json"
-    with open(json_file, 'w') as f:
-        json.dump(attack_stats, f, indent=2)
-
-    print(f"\n[✓] Done! Total packets: {attack_stats['total_packets']}")
-    print(f"[✓] Saved: {pcap_file}")
-    print(f"[✓] Saved: {json_file}")
-    return json_file
+    if replay:
+        attacks = [attack_replay(replay, speed, pps)]
+    else:
+        attacks = [attack_port_scan()]
+        time.sleep(3)
+        attacks.append(attack_syn_flood())
+        time.sleep(3)
+        attacks.append(attack_icmp_flood())
+        time.sleep(3)
+        attacks.append(attack_udp_flood())
+        time.sleep(3)
+        attacks.append(attack_banner_grab())
+
+    print("\n[*] Waiting for capture to finish...")
+    json_files = []
+    for session in sessions:
+        session.stats["attacks_performed"] = attacks
+        json_files.append(session.finish())
+    update_rollups()
+    if len(json_files) > 1:
+        return write_summary("attack", json_files, OUTPUT_DIR)
+    return json_files[0]
 
 if __name__ == "__main__":
-    run_attacks()
+    parser = argparse.ArgumentParser(description="Run the attack mix against localhost while capturing")
+    parser.add_argument("-i", "--iface", action="append", help="repeat for several interfaces (default: route)")
+    parser.add_argument("-d", "--duration", type=float, default=CAPTURE_SECONDS)
+    parser.add_argument("--replay", nargs="+", metavar="PCAP", help="replay these pcaps instead of the live attacks")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--speed", type=float, default=1.0, help="replay timing multiplier (0 = as fast as possible)")
+    pacing.add_argument("--pps", type=float, help="replay at a fixed packet rate")
+    args = parser.parse_args()
+    run_attacks(args.iface, args.duration, args.replay, args.speed, args.pps)
@@ -1,87 +1,88 @@
 #!/usr/bin/env python3
-import subprocess
-import time
-import os
-import json
-from datetime import datetime
-from scapy.all import sniff, IP, TCP, UDP, ICMP, wrpcap
+import argparse
+import sys
+from capture_session import session_options as capture_options, run_sessions, write_summary, get_interface, SESSION_MODES
+from rollups import update_rollups
+from baseline_model import ingest_capture
 
 CAPTURE_DURATION = 60
 OUTPUT_DIR = "../captures/baseline"
+CAPTURE_FILTER = "ip"
+SNAPLEN = 0
+STREAM_TO_DISK = True
+ROTATE_MAX_BYTES = 100 * 1024 * 1024
+ROTATE_MAX_SECONDS = 0
+RING_SIZE = 1000
+WRITE_FEATURES = True
+SKETCH_MODE = False
+SKETCH_TOP_K = 64
+RUN_DETECTOR = True
+TRACK_FLOWS = True
+FLOW_CAPACITY = 200000
+CAPTURE_BACKEND = "sniff"  # "sniff", "pipeline" or "ring"
+PIPELINE_WORKERS = 1
+QUEUE_SIZE = 65536
+QUEUE_POLICY = "drop_oldest"
+# Sampled handler latency, kernel drops, queue depth and memory, written
+# to ../captures/metrics every METRICS_INTERVAL seconds while capturing.
+INSTRUMENT = True
+METRICS_INTERVAL = 10
+SESSION_MODE = "thread"  # "thread" or "process", for several interfaces
+UPDATE_BASELINE_MODEL = True
+# Adaptive mode: capture until per-protocol rate CIs and the port mix
+# settle, between MIN_DURATION and MAX_DURATION seconds.
+ADAPTIVE_DURATION = False
+MIN_DURATION = 20
+MAX_DURATION = 600
+RATE_TOLERANCE = 0.1
+PORT_TOLERANCE = 0.05
+CONFIDENCE = 0.95
 
-stats = {
-    "start_time": "",
-    "end_time": "",
-    "total_packets": 0,
-    "tcp_packets": 0,
-    "udp_packets": 0,
-    "icmp_packets": 0,
-    "unique_src_ips": [],
-    "unique_dst_ips": [],
-    "port_frequency": {},
-    "packets_per_second": []
-}
+def adaptive_options(max_seconds=MAX_DURATION):
+    return {
+        "tolerance": RATE_TOLERANCE,
+        "port_tolerance": PORT_TOLERANCE,
+        "confidence": CONFIDENCE,
+        "min_seconds": MIN_DURATION,
+        "max_seconds": max_seconds,
+    }
 
-captured_packets = []
-seen_src = set()
-seen_dst = set()
-second_counter = {"count": 0, "last_second": int(time.time())}
+def session_options(adaptive=ADAPTIVE_DURATION, max_seconds=MAX_DURATION):
+    return capture_options(sys.modules[__name__], adaptive=adaptive_options(max_seconds) if adaptive else None)
 
-def get_interface():
-    result = subprocess.run(['ip', 'route'], capture_output=True, text=True)
-    for line in result.stdout.split('\n'):
-        if 'default' in line:
-            parts = line.split()
-            if 'dev' in parts:
-                return parts[parts.index('dev') + 1]
-    return "wlan0"
-
-def packet_handler(pkt):
-    global second_counter
-    if not pkt.haslayer(IP):
-        return
-    stats["total_packets"] += 1
-    captured_packets.append(pkt)
-    current_second = int(time.time())
-    if current_second != second_counter["last_second"]:
-        stats["packets_per_second"].append(second_counter["count"])
-        second_counter["count"] = 1
-        second_counter["last_second"] = current_second
+def run_capture(interfaces=None, duration=None, mode=SESSION_MODE, adaptive=ADAPTIVE_DURATION):
+    # One session per interface, all captured at once. Returns the stats
+    # JSON, or the merged summary when several interfaces were captured.
+    # In adaptive mode a given duration is the upper bound.
+    interfaces = interfaces or [get_interface()]
+    if adaptive:
+        max_seconds = duration = duration or MAX_DURATION
+        if max_seconds < MIN_DURATION:
+            raise ValueError(f"adaptive capture needs a duration of at least {MIN_DURATION}s")
+        print(f"\n[*] Starting adaptive baseline capture on {', '.join(interfaces)} "
+              f"({MIN_DURATION}-{max_seconds:g}s, stops when rates converge to ±{RATE_TOLERANCE:.0%})")
+        options = session_options(True, max_seconds)
     else:
-        second_counter["count"] += 1
-    seen_src.add(pkt[IP].src)
-    seen_dst.add(pkt[IP].dst)
-    if pkt.haslayer(TCP):
-        stats["tcp_packets"] += 1
-        port = pkt[TCP].dport
-        stats["port_frequency"][port] = stats["port_frequency"].get(port, 0) + 1
-    elif pkt.haslayer(UDP):
-        stats["udp_packets"] += 1
-    elif pkt.haslayer(ICMP):
-        stats["icmp_packets"] += 1
-
-def run_capture():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    interface = get_interface()
-    print(f"\n[*] Starting baseline capture on {interface} for {CAPTURE_DURATION}s")
+        duration = duration or CAPTURE_DURATION
+        print(f"\n[*] Starting baseline capture on {', '.join(interfaces)} for {duration}s")
+        options = session_options(False)
     print("[*] Generate NORMAL traffic — browse, ping, etc\n")
-    stats["start_time"] = datetime.now().isoformat()
-    sniff(iface=interface, prn=packet_handler, timeout=CAPTURE_DURATION, store=False)
-    stats["end_time"] = datetime.now().isoformat()
-    stats["unique_src_ips"] = list(seen_src)
-    stats["unique_dst_ips"] = list(seen_dst)
-    top_ports = dict(sorted(stats["port_frequency"].items(), key=lambda x: x[1], reverse=True)[:20])
-    stats["port_frequency"] = top_ports
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    pcap_file = f"{OUTPUT_DIR}/baseline_{timestamp}.pcap"
-    wrpcap(pcap_file, captured_packets)
-    json_file = f"{OUTPUT_DIR}/baseline_stats_{timestamp}.json"
-    with open(json_file, 'w') as f:
-        json.dump(stats, f, indent=2)
-    print(f"\n[✓] Done! Total packets: {stats['total_packets']}")
-    print(f"[✓] Saved: {pcap_file}")
-    print(f"[✓] Saved: {json_file}")
+    json_files = run_sessions("baseline", interfaces, OUTPUT_DIR, duration, mode, **options)
+    update_rollups()
+    json_file = write_summary("baseline", json_files, OUTPUT_DIR) if len(json_files) > 1 else json_files[0]
+    if UPDATE_BASELINE_MODEL:
+        # One observation per run: a multi-interface run feeds its merged series.
+        ingest_capture(json_file)
     return json_file
 
 if __name__ == "__main__":
-    run_capture()
+    parser = argparse.ArgumentParser(description="Capture baseline traffic")
+    parser.add_argument("-i", "--iface", action="append", help="repeat for several interfaces (default: route)")
+    parser.add_argument("-d", "--duration", type=float,
+                        help=f"seconds (default {CAPTURE_DURATION}); with --adaptive, the upper bound "
+                             f"(default {MAX_DURATION})")
+    parser.add_argument("--mode", choices=SESSION_MODES, default=SESSION_MODE)
+    parser.add_argument("--adaptive", action="store_true", default=ADAPTIVE_DURATION,
+                        help=f"stop once statistics converge ({MIN_DURATION}-{MAX_DURATION}s)")
+    args = parser.parse_args()
+    run_capture(args.iface, args.duration, args.mode, args.adaptive)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+import json
+import math
+import os
+import sys
+from datetime import datetime
+
+from timeseries import series_for_capture
+
+MODEL_PATH = "../captures/baseline_model.json"
+BUCKET_MINUTES = 60
+HALF_LIFE_DAYS = 7.0
+SIGMA_THRESHOLD = 3.0
+MIN_WEIGHT = 30.0
+PROTOCOLS = ("total", "tcp", "udp", "icmp")
+
+
+class BaselineModel:
+    # Packets-per-second mean/variance per protocol and time-of-day bucket,
+    # updated incrementally with an exponentially weighted Welford step.
+    # Old samples decay with HALF_LIFE_DAYS, which gives the report's
+    # "rolling 7-day baseline" without keeping any history. Size is fixed
+    # at len(PROTOCOLS) * buckets * 3 floats.
+    def __init__(self, bucket_minutes=BUCKET_MINUTES, half_life_days=HALF_LIFE_DAYS):
+        self.bucket_minutes = bucket_minutes
+        self.half_life = half_life_days * 86400.0
+        self.buckets = 24 * 60 // bucket_minutes
+        self.cells = {p: [[0.0, 0.0, 0.0] for _ in range(self.buckets)] for p in PROTOCOLS}
+        self.last_update = None
+        self.captures = 0
+
+    def bucket_of(self, when):
+        return (when.hour * 60 + when.minute) // self.bucket_minutes
+
+    def _decay_to(self, ts):
+        if self.last_update is not None and ts > self.last_update:
+            factor = 0.5 ** ((ts - self.last_update) / self.half_life)
+            for rows in self.cells.values():
+                for cell in rows:
+                    cell[0] *= factor
+                    cell[2] *= factor
+        if self.last_update is None or ts > self.last_update:
+            self.last_update = ts
+
+    def add(self, protocol, bucket, value, weight=1.0):
+        cell = self.cells[protocol][bucket]
+        cell[0] += weight
+        delta = value - cell[1]
+        cell[1] += weight / cell[0] * delta
+        cell[2] += weight * delta * (value - cell[1])
+
+    def add_series(self, protocol, start_ts, counts, resolution=1.0):
+        # counts[i] is the packet count of the window starting at
+        # start_ts + i * resolution.
+        for i, count in enumerate(counts):
+            when = datetime.fromtimestamp(start_ts + i * resolution)
+            self.add(protocol, self.bucket_of(when), count / resolution)
+
+    def mean_std(self, protocol, bucket):
+        weight, mean, m2 = self.cells[protocol][bucket]
+        if weight <= 0:
+            return None, None
+        return mean, math.sqrt(max(m2 / weight, 0.0))
+
+    def zscore(self, protocol, rate, when):
+        weight = self.cells[protocol][self.bucket_of(when)][0]
+        mean, std = self.mean_std(protocol, self.bucket_of(when))
+        if mean is None or weight < MIN_WEIGHT:
+            return None
+        if std == 0:
+            return 0.0 if rate == mean else math.copysign(math.inf, rate - mean)
+        return (rate - mean) / std
+
+    def is_anomalous(self, protocol, rate, when, sigma=SIGMA_THRESHOLD):
+        z = self.zscore(protocol, rate, when)
+        return z is not None and abs(z) > sigma
+
+    def to_dict(self):
+        return {
+            "bucket_minutes": self.bucket_minutes,
+            "half_life_days": self.half_life / 86400.0,
+            "last_update": self.last_update,
+            "captures": self.captures,
+            "cells": self.cells,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls(data["bucket_minutes"], data["half_life_days"])
+        model.last_update = data["last_update"]
+        model.captures = data["captures"]
+        model.cells = data["cells"]
+        return model
+
+
+def load_model(path=MODEL_PATH):
+    if not os.path.exists(path):
+        return BaselineModel()
+    with open(path) as f:
+        return BaselineModel.from_dict(json.load(f))
+
+
+def save_model(model, path=MODEL_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(model.to_dict(), f)
+    os.replace(tmp, path)
+
+
+def per_second_series(stats):
+    # {protocol: (start_ts, counts)} from the feature sidecar when there is
+    # one (packet timestamps, empty seconds included), else the summary pps.
+    series = series_for_capture(stats, 1.0)
+    if series is not None:
+        return {name: (series["start"], series[name].tolist()) for name in PROTOCOLS}
+    if not stats.get("start_time"):
+        return {}
+    start = datetime.fromisoformat(stats["start_time"]).timestamp()
+    return {"total": (start, stats.get("packets_per_second", []))}
+
+
+def ingest_capture(json_file, path=MODEL_PATH):
+    with open(json_file) as f:
+        stats = json.load(f)
+    model = load_model(path)
+    series = per_second_series(stats)
+    if series:
+        model._decay_to(max(start + len(counts) for start, counts in series.values()))
+        for protocol, (start, counts) in series.items():
+            model.add_series(protocol, start, counts)
+        model.captures += 1
+        save_model(model, path)
+    print(f"[✓] Baseline model updated ({model.captures} captures): {path}")
+    return model
+
+
+def check_capture(stats, model=None, sigma=SIGMA_THRESHOLD):
+    # Mean rate of each protocol over the capture against the model bucket
+    # the capture started in.
+    model = model or load_model()
+    when = datetime.fromisoformat(stats["start_time"]) if stats.get("start_time") else datetime.now()
+    result = {}
+    for protocol, (start, counts) in per_second_series(stats).items():
+        rate = sum(counts) / len(counts) if counts else 0.0
+        z = model.zscore(protocol, rate, when)
+        mean, std = model.mean_std(protocol, model.bucket_of(when))
+        result[protocol] = {
+            "rate": round(rate, 2),
+            "baseline_mean": None if mean is None else round(mean, 2),
+            "baseline_std": None if std is None else round(std, 2),
+            "zscore": None if z is None else round(z, 2),
+            "anomalous": z is not None and abs(z) > sigma,
+        }
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: baseline_model.py <baseline_stats.json> [more.json ...]")
+        sys.exit(1)
+    for json_file in sys.argv[1:]:
+        ingest_capture(json_file)
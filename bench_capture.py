@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from capture_filter import open_capture_socket, kernel_stats
+from packet_ring import RingCapture
+from scapy.all import sniff
+
+SETTLE_SECONDS = 0.5
+
+
+def start_generator(kind, rate, duration, target="127.0.0.1"):
+    # Separate process so the sender does not compete for our GIL.
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "packet_generator.py")
+    return subprocess.Popen(
+        [sys.executable, script, "--kind", kind, "--rate", str(rate),
+         "--duration", str(duration), "--target", target],
+        stdout=subprocess.PIPE, text=True
+    )
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def capture_sniff(iface, duration, bpf_filter):
+    sock = open_capture_socket(iface, bpf_filter)
+    kernel_stats(sock.ins)
+    count = [0]
+
+    def handler(pkt):
+        count[0] += 1
+
+    sniff(opened_socket=sock, prn=handler, timeout=duration, store=False)
+    packets, drops = kernel_stats(sock.ins)
+    sock.close()
+    return count[0], packets, drops
+
+
+def capture_ring(iface, duration, bpf_filter):
+    stats, metrics = RingCapture(iface, bpf_filter).run(duration)
+    return metrics["captured"], metrics["kernel_packets"], metrics["kernel_dropped"]
+
+
+def bench(backend, iface, rate, duration, kind, bpf_filter):
+    capture = capture_sniff if backend == "sniff" else capture_ring
+    generator = start_generator(kind, rate, duration)
+    cpu_start = cpu_seconds()
+    wall_start = time.perf_counter()
+    captured, kernel_packets, drops = capture(iface, duration + SETTLE_SECONDS, bpf_filter)
+    wall = time.perf_counter() - wall_start
+    cpu = cpu_seconds() - cpu_start
+    generator.wait()
+    return {
+        "backend": backend,
+        "target_pps": rate,
+        "generator": generator.stdout.read().strip(),
+        "captured": captured,
+        "kernel_packets": kernel_packets,
+        "kernel_dropped": drops,
+        "captured_pps": round(captured / wall, 1),
+        "cpu_percent": round(100 * cpu / wall, 1),
+        "cpu_us_per_packet": round(1e6 * cpu / captured, 2) if captured else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loopback capture benchmark: scapy sniff vs TPACKET_V3 ring")
+    parser.add_argument("--iface", default="lo")
+    parser.add_argument("--rates", default="5000,20000,50000", help="comma-separated pps, 0 = unthrottled")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--kind", default="udp")
+    parser.add_argument("--filter", default="ip")
+    parser.add_argument("--backends", default="sniff,ring")
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for rate in (float(r) for r in args.rates.split(",")):
+        for backend in args.backends.split(","):
+            r = bench(backend, args.iface, rate, args.duration, args.kind, args.filter)
+            results.append(r)
+            loss = r["kernel_dropped"] / r["kernel_packets"] * 100 if r["kernel_packets"] else 0.0
+            print(f"[*] {backend:5} @ {rate or 'max':>7} pkt/s: captured {r['captured_pps']:>10,.1f} pkt/s, "
+                  f"kernel drops {r['kernel_dropped']} ({loss:.1f}%), CPU {r['cpu_percent']}% "
+                  f"({r['cpu_us_per_packet']} us/pkt)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[✓] Saved: {args.output}")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import random
+import struct
+import time
+
+from pcap_stream import RotatingPcapWriter
+from pcap_reader import analyze_pcap, iter_records
+
+ETH_HEADER = bytes.fromhex("020000000002" "020000000001" "0800")
+
+
+def build_frame(src, dst, proto, sport, dport, flags=0x02, payload=b""):
+    if proto == 6:
+        l4 = struct.pack("!HHIIBBHHH", sport, dport, 0, 0, 0x50, flags, 8192, 0, 0)
+    elif proto == 17:
+        l4 = struct.pack("!HHHH", sport, dport, 8 + len(payload), 0)
+    else:
+        l4 = struct.pack("!BBHHH", 8, 0, 0, 0, 0)
+    l4 += payload
+    ip = struct.pack("!BBHHHBBHII", 0x45, 0, 20 + len(l4), 0, 0, 64, proto, 0, src, dst)
+    return ETH_HEADER + ip + l4
+
+
+def generate_pcap(path, packets, seed=1):
+    rng = random.Random(seed)
+    hosts = [0x0a000000 + rng.randint(1, 254) for _ in range(64)]
+    common_ports = [80, 443, 53, 22, 8080, 3306, 123, 25]
+    ts = time.time() - packets / 5000
+    prefix = path[:-5] if path.endswith(".pcap") else path
+    writer = RotatingPcapWriter(prefix)
+    for i in range(packets):
+        roll = rng.random()
+        src = rng.choice(hosts)
+        dst = rng.choice(hosts)
+        if roll < 0.7:
+            port = rng.choice(common_ports) if rng.random() < 0.8 else rng.randint(1, 65535)
+            frame = build_frame(src, dst, 6, rng.randint(1024, 65535), port)
+        elif roll < 0.9:
+            frame = build_frame(src, dst, 17, rng.randint(1024, 65535), rng.choice(common_ports))
+        elif roll < 0.97:
+            frame = build_frame(src, dst, 1, 0, 0)
+        else:
+            frame = ETH_HEADER[:12] + b"\x08\x06" + bytes(28)
+        ts += rng.expovariate(5000)
+        writer.write(ts, frame)
+    return writer.close()[0]
+
+
+def bench_fast(path):
+    start = time.perf_counter()
+    result = analyze_pcap(path)
+    elapsed = time.perf_counter() - start
+    records = sum(1 for _ in iter_records(path))
+    return records, result, elapsed
+
+
+def bench_scapy(path, limit):
+    from scapy.utils import PcapReader
+    from capture_session import CaptureSession
+    # Never started, so no writers, detector or flow table: just the
+    # handler's own counting, as in the live capture.
+    session = CaptureSession("baseline", "bench", os.path.dirname(path))
+    start = time.perf_counter()
+    count = 0
+    with PcapReader(path) as reader:
+        for pkt in reader:
+            session.packet_handler(pkt)
+            count += 1
+            if limit and count >= limit:
+                break
+    return count, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare raw-bytes pcap ingestion against the scapy packet_handler path")
+    parser.add_argument("pcap", nargs="?", default="../captures/bench/bench_ingest.pcap")
+    parser.add_argument("--generate", type=int, default=0, metavar="N",
+                        help="write a synthetic pcap with N packets first (30M packets ~ 2.5 GB)")
+    parser.add_argument("--scapy-limit", type=int, default=200000,
+                        help="stop the scapy path after this many packets (0 = whole file)")
+    args = parser.parse_args()
+
+    if args.generate:
+        print(f"[*] Generating {args.generate} synthetic packets -> {args.pcap}")
+        generate_pcap(args.pcap, args.generate)
+    size_mb = os.path.getsize(args.pcap) / 1e6
+    print(f"[*] Input: {args.pcap} ({size_mb:.1f} MB)")
+
+    records, result, fast_elapsed = bench_fast(args.pcap)
+    fast_pps = records / fast_elapsed if fast_elapsed else 0
+    print(f"[✓] Raw-bytes path : {records} packets in {fast_elapsed:.2f}s -> {fast_pps:,.0f} pkt/s ({size_mb / fast_elapsed:.1f} MB/s)")
+
+    scapy_count, scapy_elapsed = bench_scapy(args.pcap, args.scapy_limit)
+    scapy_pps = scapy_count / scapy_elapsed if scapy_elapsed else 0
+    print(f"[✓] Scapy path     : {scapy_count} packets in {scapy_elapsed:.2f}s -> {scapy_pps:,.0f} pkt/s")
+    if scapy_pps:
+        print(f"[✓] Speedup        : {fast_pps / scapy_pps:.1f}x")
+    print(f"    IPv4 packets {result['total_packets']}, TCP {result['tcp_packets']}, "
+          f"UDP {result['udp_packets']}, ICMP {result['icmp_packets']}")
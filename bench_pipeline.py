@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import platform
+import resource
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from bench_ingest import ETH_HEADER
+from pcap_reader import PROTO_TCP, PROTO_UDP, PROTO_ICMP, LINKTYPE_ETHERNET
+
+BENCH_DIR = "../captures/bench"
+RESULTS_DIR = f"{BENCH_DIR}/results"
+BASELINE_RESULT = f"{RESULTS_DIR}/baseline.json"
+PACKETS = 1_000_000
+SEED = 1
+# Background traffic: protocol shares, host pool with Zipf popularity,
+# and the packet rate that sets how many seconds the capture spans.
+MIX = {"tcp": 0.75, "udp": 0.2, "icmp": 0.05}
+HOSTS = 500
+SERVERS = 2000
+FLOWS = 20000
+ZIPF = 1.1
+RATE = 20000
+REPLY_SHARE = 0.4
+TCP_PORTS = {443: 0.55, 80: 0.2, 22: 0.03, 8080: 0.02, 25: 0.01, 993: 0.01, 3306: 0.01}
+UDP_PORTS = {53: 0.5, 443: 0.2, 123: 0.05, 5353: 0.05}
+# Attack capture: this share of its packets is attacks, one window each,
+# starting at these fractions of the timeline.
+ATTACK_SHARE = 0.2
+ATTACKS = (("port_scan", 0.15), ("syn_flood", 0.35), ("udp_flood", 0.55), ("icmp_flood", 0.75))
+ATTACK_WINDOW = 0.08
+VICTIM, SCANNER, FLOODER = 0x0a000001, 0xc0a80142, 0xc0a80143
+# Every frame is captured at 60 bytes (an Ethernet minimum frame, as with
+# a short snaplen); wire lengths follow a realistic size mix.
+FRAME_LEN = 60
+CHUNK = 1 << 20
+SESSION_OPTIONS = {
+    "write_features": True,
+    "run_detector": True,
+    "track_flows": True,
+    "flow_capacity": 200000,
+}
+# A stage regresses when it is this much slower than the stored baseline
+# and the difference is more than noise.
+REGRESSION_TOLERANCE = 0.15
+MIN_REGRESSION_SECONDS = 0.05
+RSS_TOLERANCE = 0.2
+
+RECORD_DTYPE = np.dtype([
+    ("ts_sec", "<u4"), ("ts_usec", "<u4"), ("caplen", "<u4"), ("wirelen", "<u4"),
+    ("eth", "V14"),
+    ("ver_ihl", "u1"), ("tos", "u1"), ("ip_len", ">u2"), ("ip_id", ">u2"), ("frag", ">u2"),
+    ("ttl", "u1"), ("proto", "u1"), ("ip_csum", ">u2"), ("src", ">u4"), ("dst", ">u4"),
+    ("sport", ">u2"), ("dport", ">u2"), ("seq", ">u4"), ("ack", ">u4"),
+    ("offset", "u1"), ("flags", "u1"), ("window", ">u2"), ("l4_csum", ">u2"), ("urg", ">u2"),
+    ("pad", "V6"),
+])
+assert RECORD_DTYPE.itemsize == 16 + FRAME_LEN
+
+
+def zipf_choice(rng, values, n, exponent=ZIPF):
+    weights = 1.0 / np.arange(1, len(values) + 1) ** exponent
+    return np.asarray(values)[rng.choice(len(values), n, p=weights / weights.sum())]
+
+
+def weighted_ports(rng, table, n):
+    # Ports from table by weight; the leftover share is uniform 1024-65535.
+    ports = np.array(list(table) + [0], dtype=np.int64)
+    weights = np.array(list(table.values()) + [max(1.0 - sum(table.values()), 0.0)])
+    picked = ports[rng.choice(len(ports), n, p=weights / weights.sum())]
+    tail = picked == 0
+    picked[tail] = rng.integers(1024, 65536, int(tail.sum()))
+    return picked
+
+
+def background(rng, n, start, mix=MIX, rate=RATE):
+    # Columns of n packets between internal hosts and external servers.
+    # Packets belong to flows (fixed client, server, ports) and flows to a
+    # protocol, so each protocol keeps its share of packets; Zipf over
+    # flows gives the heavy hitters real traffic has.
+    shares = np.array([mix.get("tcp", 0), mix.get("udp", 0), mix.get("icmp", 0)], dtype=np.float64)
+    shares /= shares.sum()
+    numbers = (PROTO_TCP, PROTO_UDP, PROTO_ICMP)
+    proto = np.array(numbers, dtype=np.uint8)[rng.choice(3, n, p=shares)]
+    hosts = 0x0a000000 + rng.choice(np.arange(2, 65535), HOSTS, replace=False)
+    servers = rng.integers(0x01000000, 0xdf000000, SERVERS)
+    cols = {k: np.zeros(n, dtype=np.int64) for k in ("src", "dst", "sport", "dport")}
+    reply = rng.random(n) < REPLY_SHARE
+    for number, share, table in zip(numbers, shares, (TCP_PORTS, UDP_PORTS, None)):
+        idx = np.flatnonzero(proto == number)
+        flows = max(int(FLOWS * share), 1)
+        client, server = zipf_choice(rng, hosts, flows), zipf_choice(rng, servers, flows)
+        service = weighted_ports(rng, table, flows) if table else np.zeros(flows, dtype=np.int64)
+        ephemeral = rng.integers(32768, 61000, flows) if table else np.zeros(flows, dtype=np.int64)
+        flow = zipf_choice(rng, np.arange(flows), len(idx))
+        back = reply[idx]
+        cols["src"][idx] = np.where(back, server[flow], client[flow])
+        cols["dst"][idx] = np.where(back, client[flow], server[flow])
+        cols["sport"][idx] = np.where(back, service[flow], ephemeral[flow])
+        cols["dport"][idx] = np.where(back, ephemeral[flow], service[flow])
+    cols["ts"] = start + np.sort(rng.uniform(0, n / rate, n))
+    cols["proto"] = proto
+    cols["flags"] = np.where(rng.random(n) < 0.9, 0x10, np.where(rng.random(n) < 0.5, 0x02, 0x18))
+    # TCP: bare ACKs, full segments and everything between; UDP mostly
+    # small; ICMP echo at 98 bytes.
+    size = rng.choice(3, n, p=[0.4, 0.4, 0.2])
+    wirelen = np.where(size == 0, FRAME_LEN, np.where(size == 1, 1514, rng.integers(FRAME_LEN, 1515, n)))
+    wirelen[proto == PROTO_UDP] = rng.integers(FRAME_LEN, 600, int(np.count_nonzero(proto == PROTO_UDP)))
+    wirelen[proto == PROTO_ICMP] = 98
+    cols["wirelen"] = wirelen
+    return cols
+
+
+def attack_columns(rng, kind, n, start, end):
+    ts = np.sort(rng.uniform(start, end, n))
+    cols = {"ts": ts, "dst": np.full(n, VICTIM), "wirelen": np.full(n, FRAME_LEN),
+            "flags": np.full(n, 0x02), "proto": np.full(n, PROTO_TCP, dtype=np.uint8)}
+    if kind == "port_scan":
+        cols.update(src=np.full(n, SCANNER), sport=np.full(n, 40000), dport=1 + np.arange(n) % 1000)
+    elif kind == "syn_flood":
+        cols.update(src=rng.integers(0x0b000000, 0xdf000000, n), sport=rng.integers(1024, 65536, n),
+                    dport=np.full(n, 80))
+    elif kind == "udp_flood":
+        cols.update(src=np.full(n, FLOODER), sport=rng.integers(1024, 65536, n),
+                    dport=rng.integers(1, 65536, n), proto=np.full(n, PROTO_UDP, dtype=np.uint8),
+                    flags=np.zeros(n))
+    else:
+        cols.update(src=np.full(n, FLOODER), sport=np.zeros(n), dport=np.zeros(n),
+                    proto=np.full(n, PROTO_ICMP, dtype=np.uint8), flags=np.zeros(n),
+                    wirelen=np.full(n, 98))
+    return cols
+
+
+def write_pcap(path, cols):
+    # One structured array per chunk, written with a single tobytes().
+    n = len(cols["ts"])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xa1b2c3d4, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        for lo in range(0, n, CHUNK):
+            hi = min(lo + CHUNK, n)
+            c = {k: np.asarray(v[lo:hi]) for k, v in cols.items()}
+            proto = c["proto"]
+            header = np.where(proto == PROTO_TCP, 40, 28)
+            rec = np.zeros(hi - lo, dtype=RECORD_DTYPE)
+            usec = np.round(c["ts"] * 1e6).astype(np.int64)
+            rec["ts_sec"], rec["ts_usec"] = usec // 1_000_000, usec % 1_000_000
+            rec["caplen"] = FRAME_LEN
+            rec["wirelen"] = c["wirelen"]
+            rec["eth"] = np.void(ETH_HEADER)
+            rec["ver_ihl"] = 0x45
+            ip_len = np.where(c["wirelen"] > FRAME_LEN, c["wirelen"] - 14, header)
+            rec["ip_len"] = ip_len
+            rec["ip_id"] = np.arange(lo, hi) & 0xffff
+            rec["ttl"] = 64
+            rec["proto"] = proto
+            rec["src"], rec["dst"] = c["src"], c["dst"]
+            rec["sport"], rec["dport"] = c["sport"], c["dport"]
+            tcp, udp, icmp = proto == PROTO_TCP, proto == PROTO_UDP, proto == PROTO_ICMP
+            rec["offset"][tcp] = 0x50
+            rec["flags"][tcp] = c["flags"][tcp]
+            rec["window"][tcp] = 64240
+            # UDP length sits where TCP's sequence number starts; ICMP echo
+            # has type 8 in the sport position.
+            rec["seq"][udp] = (ip_len[udp] - 20).astype(np.uint32) << 16
+            rec["sport"][icmp] = 0x0800
+            rec["seq"][icmp] = np.arange(lo, hi)[icmp] & 0xffff
+            f.write(rec.tobytes())
+    return path
+
+
+def merge(parts):
+    cols = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    order = np.argsort(cols["ts"], kind="stable")
+    return {k: v[order] for k, v in cols.items()}
+
+
+def generate_captures(packets=PACKETS, mix=MIX, rate=RATE, attack_share=ATTACK_SHARE, seed=SEED,
+                      out_dir=BENCH_DIR):
+    # (baseline pcap, attack pcap, attacks_performed) for this config;
+    # reused from disk when an earlier run already wrote them.
+    config = {"packets": packets, "mix": mix, "rate": rate, "attack_share": attack_share, "seed": seed}
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:10]
+    paths = [f"{out_dir}/bench_pipeline_{kind}_{packets}_{digest}.pcap" for kind in ("baseline", "attack")]
+    meta = f"{out_dir}/bench_pipeline_attacks_{packets}_{digest}.json"
+    if all(os.path.exists(p) for p in paths + [meta]):
+        with open(meta) as f:
+            return paths[0], paths[1], json.load(f)
+
+    rng = np.random.default_rng(seed)
+    span = packets / rate
+    start = time.time() - 2 * span - 60
+    print(f"[*] Generating 2 x {packets:,} synthetic packets ({span:.0f}s of traffic each)...")
+    write_pcap(paths[0], background(rng, packets, start, mix, rate))
+
+    attack_start = start + span + 30
+    n_attack = int(packets * attack_share)
+    parts = [background(rng, packets - n_attack, attack_start, mix, rate * (1 - attack_share))]
+    attacks = []
+    for i, (kind, at) in enumerate(ATTACKS):
+        n = n_attack // len(ATTACKS) + (i < n_attack % len(ATTACKS))
+        lo, hi = attack_start + at * span, attack_start + (at + ATTACK_WINDOW) * span
+        parts.append(attack_columns(rng, kind, n, lo, hi))
+        attacks.append({"type": kind, "target": "10.0.0.1", "packets_sent": n,
+                        "start_time": datetime.fromtimestamp(lo).isoformat(),
+                        "end_time": datetime.fromtimestamp(hi).isoformat()})
+    write_pcap(paths[1], merge(parts))
+    with open(meta, "w") as f:
+        json.dump(attacks, f, indent=2)
+    return paths[0], paths[1], attacks
+
+
+def peak_rss_mb():
+    # (this process, children) high-water marks; ru_maxrss is in KiB on Linux.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own / 1024, 1), round(children / 1024, 1)
+
+
+class StageTimer:
+    # Wall time per named stage, the packets it handled, and the RSS
+    # high-water mark once it finished (which shows the stage that grew it).
+    def __init__(self, quiet=True):
+        self.stages = {}
+        self.quiet = quiet
+
+    @contextlib.contextmanager
+    def stage(self, name, packets):
+        with open(os.devnull, "w") as sink, contextlib.ExitStack() as stack:
+            if self.quiet:
+                stack.enter_context(contextlib.redirect_stdout(sink))
+            start = time.perf_counter()
+            yield
+            elapsed = time.perf_counter() - start
+        own, children = peak_rss_mb()
+        self.stages[name] = {
+            "seconds": round(elapsed, 4),
+            "packets": packets,
+            "pps": round(packets / elapsed, 1) if elapsed else 0.0,
+            "peak_rss_mb": own,
+            "children_peak_rss_mb": children,
+        }
+        print(f"    {name:<18} {elapsed:>8.3f}s  {self.stages[name]['pps']:>14,.0f} pkt/s  rss {own:>7.1f} MB")
+
+
+def run_pipeline(baseline_pcap, attack_pcap, attacks, packets, work_dir, workers, quiet=True):
+    # One pass over every stage from ingestion to the HTML report.
+    from capture_session import CaptureSession
+    from traffic_analyzer import apply_feature_stats, calculate_deviation, render_charts, CHARTS
+    from deviation import window_deviation
+    from baseline_model import ingest_capture, check_capture, load_model
+    from report_generator import generate_report
+
+    timer = StageTimer(quiet)
+    both = 2 * packets
+    with timer.stage("ingest_baseline", packets):
+        base = CaptureSession("baseline", "bench", work_dir, **SESSION_OPTIONS).ingest(baseline_pcap)
+    with timer.stage("ingest_attack", packets):
+        attack = CaptureSession("attack", "bench", work_dir, **SESSION_OPTIONS).ingest(attack_pcap)
+    with timer.stage("finalise", both):
+        baseline_json = base.finish(register=False)
+        attack.stats["attacks_performed"] = attacks
+        attack.finish(register=False)
+    baseline, attack = base.stats, attack.stats
+    with timer.stage("feature_stats", both):
+        apply_feature_stats(baseline)
+        apply_feature_stats(attack)
+    with timer.stage("deviation", both):
+        deviation = calculate_deviation(baseline, attack)
+    with timer.stage("window_deviation", both):
+        windows = window_deviation(baseline, attack)
+    with timer.stage("model_check", both):
+        model_path = f"{work_dir}/baseline_model.json"
+        ingest_capture(baseline_json, model_path)
+        model_check = check_capture(attack, load_model(model_path))
+    with timer.stage("charts", both):
+        charts = render_charts([(baseline, attack)], workers, cache_dir=f"{work_dir}/chart_cache")[0]
+    results = {
+        "baseline": baseline,
+        "attack": attack,
+        "deviation": deviation,
+        "model_check": model_check,
+        "windows": windows,
+        "segments": attack.get("segments"),
+        "charts": [path for path, _ in charts],
+        "chart_png": [png for _, png in charts],
+    }
+    with timer.stage("report", both):
+        generate_report(results, f"{work_dir}/report.html")
+    assert len(charts) == len(CHARTS)
+    return timer.stages
+
+
+def summarize(runs, packets):
+    # Median of each stage over the repeats; pipeline rate over their sum.
+    stages = {}
+    for name in runs[0]:
+        seconds = [r[name]["seconds"] for r in runs]
+        median = float(np.median(seconds))
+        stages[name] = {
+            "seconds": round(median, 4),
+            "min_seconds": round(min(seconds), 4),
+            "pps": round(runs[0][name]["packets"] / median, 1) if median else 0.0,
+            "peak_rss_mb": max(r[name]["peak_rss_mb"] for r in runs),
+        }
+    total = sum(s["seconds"] for s in stages.values())
+    own, children = peak_rss_mb()
+    return {
+        "stages": stages,
+        "total_seconds": round(total, 3),
+        "pipeline_pps": round(2 * packets / total, 1) if total else 0.0,
+        "peak_rss_mb": own,
+        "children_peak_rss_mb": children,
+    }
+
+
+def compare(result, baseline):
+    # Stages (and peak RSS) worse than the stored baseline beyond the
+    # tolerances; None when the two runs used different configs.
+    if baseline.get("config") != result["config"]:
+        return None
+    regressions, improvements = [], []
+    for name, stage in result["stages"].items():
+        old = baseline["stages"].get(name)
+        if not old:
+            continue
+        change = (stage["seconds"] - old["seconds"]) / old["seconds"] if old["seconds"] else 0.0
+        entry = {"stage": name, "seconds": stage["seconds"], "baseline_seconds": old["seconds"],
+                 "change_pct": round(change * 100, 1)}
+        if abs(stage["seconds"] - old["seconds"]) < MIN_REGRESSION_SECONDS:
+            continue
+        if change > REGRESSION_TOLERANCE:
+            regressions.append(entry)
+        elif change < -REGRESSION_TOLERANCE:
+            improvements.append(entry)
+    old_rss = baseline.get("peak_rss_mb")
+    if old_rss and result["peak_rss_mb"] > old_rss * (1 + RSS_TOLERANCE):
+        regressions.append({"stage": "peak_rss", "mb": result["peak_rss_mb"], "baseline_mb": old_rss,
+                            "change_pct": round((result["peak_rss_mb"] / old_rss - 1) * 100, 1)})
+    return {"baseline_started_at": baseline.get("started_at"), "regressions": regressions,
+            "improvements": improvements}
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, share = part.partition("=")
+        if name not in MIX:
+            raise argparse.ArgumentTypeError(f"unknown protocol {name!r} in mix, expected {sorted(MIX)}")
+        mix[name] = float(share)
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark: synthetic pcaps through ingestion, "
+                                                 "analysis, charts and report")
+    parser.add_argument("-n", "--packets", type=int, default=PACKETS, help="packets per capture (baseline and attack)")
+    parser.add_argument("--mix", type=parse_mix, default=MIX, help="e.g. tcp=0.75,udp=0.2,icmp=0.05")
+    parser.add_argument("--rate", type=float, default=RATE, help="background packets per second of capture time")
+    parser.add_argument("--attack-share", type=float, default=ATTACK_SHARE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="runs per stage; the median is reported")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="chart rendering processes")
+    parser.add_argument("--baseline", default=BASELINE_RESULT, help="stored result to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--keep", action="store_true", help="keep each run's session outputs and report")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the pipeline's own output")
+    args = parser.parse_args()
+
+    gen_start = time.perf_counter()
+    baseline_pcap, attack_pcap, attacks = generate_captures(args.packets, args.mix, args.rate,
+                                                            args.attack_share, args.seed)
+    print(f"[*] Inputs ready in {time.perf_counter() - gen_start:.1f}s: {baseline_pcap}, {attack_pcap}")
+
+    runs = []
+    for i in range(args.repeat):
+        print(f"[*] Run {i + 1}/{args.repeat}")
+        work_dir = tempfile.mkdtemp(prefix="bench_pipeline_", dir=BENCH_DIR)
+        try:
+            runs.append(run_pipeline(baseline_pcap, attack_pcap, attacks, args.packets, work_dir,
+                                     args.workers, quiet=not args.verbose))
+        finally:
+            if args.keep:
+                print(f"[*] Outputs kept in {work_dir}")
+            else:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = {
+        "started_at": datetime.now().isoformat(),
+        "config": {"packets": args.packets, "mix": args.mix, "rate": args.rate,
+                   "attack_share": args.attack_share, "seed": args.seed, "chart_workers": args.workers},
+        "host": {"python": platform.python_version(), "numpy": np.__version__,
+                 "machine": platform.machine(), "cpus": os.cpu_count()},
+        "repeat": args.repeat,
+        **summarize(runs, args.packets),
+        "runs": runs,
+    }
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        result["comparison"] = compare(result, stored)
+        if stored.get("host") != result["host"]:
+            print("[!] Baseline was recorded on a different host/toolchain; compare with care")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = f"{RESULTS_DIR}/bench_pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n[✓] {2 * args.packets:,} packets end to end in {result['total_seconds']}s "
+          f"-> {result['pipeline_pps']:,} pkt/s, peak RSS {result['peak_rss_mb']} MB "
+          f"(chart workers {result['children_peak_rss_mb']} MB)")
+    print(f"[✓] Saved: {out}")
+
+    comparison = result.get("comparison")
+    if args.save_baseline:
+        shutil.copyfile(out, args.baseline)
+        print(f"[✓] Stored as baseline: {args.baseline}")
+    elif comparison is None and "comparison" in result:
+        print("[!] Baseline used a different config; not compared")
+    elif comparison:
+        for r in comparison["improvements"]:
+            print(f"[✓] {r['stage']}: {r['change_pct']}% ({r['baseline_seconds']}s -> {r['seconds']}s)")
+        for r in comparison["regressions"]:
+            print(f"[!] REGRESSION {r['stage']}: +{r['change_pct']}%")
+        if comparison["regressions"]:
+            sys.exit(1)
+        print("[✓] No regressions against the stored baseline")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+CATALOG_PATH = "../captures/catalog.sqlite"
+KINDS = ("baseline", "attack")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    json_path TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    interface TEXT,
+    start_ts REAL,
+    end_ts REAL,
+    total_packets INTEGER,
+    tcp_packets INTEGER,
+    udp_packets INTEGER,
+    icmp_packets INTEGER,
+    pcap_files TEXT,
+    features_file TEXT,
+    flows_dir TEXT,
+    registered_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_kind_start ON runs (kind, start_ts);
+CREATE INDEX IF NOT EXISTS runs_interface_start ON runs (interface, start_ts);
+"""
+
+
+def connect(path=CATALOG_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _timestamp(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def _row_values(json_file, kind, stats, interface):
+    return (
+        os.path.abspath(json_file), kind, interface or stats.get("interface"),
+        _timestamp(stats.get("start_time")), _timestamp(stats.get("end_time")),
+        stats.get("total_packets"), stats.get("tcp_packets"),
+        stats.get("udp_packets"), stats.get("icmp_packets"),
+        json.dumps(stats.get("pcap_files", [])), stats.get("features_file"),
+        (stats.get("flows") or {}).get("flows_dir"), time.time(),
+    )
+
+
+_UPSERT = """
+INSERT INTO runs (json_path, kind, interface, start_ts, end_ts, total_packets, tcp_packets,
+                  udp_packets, icmp_packets, pcap_files, features_file, flows_dir, registered_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (json_path) DO UPDATE SET
+    kind = excluded.kind, interface = excluded.interface, start_ts = excluded.start_ts,
+    end_ts = excluded.end_ts, total_packets = excluded.total_packets,
+    tcp_packets = excluded.tcp_packets, udp_packets = excluded.udp_packets,
+    icmp_packets = excluded.icmp_packets, pcap_files = excluded.pcap_files,
+    features_file = excluded.features_file, flows_dir = excluded.flows_dir,
+    registered_at = excluded.registered_at
+"""
+
+
+def register_run(json_file, kind, stats=None, interface=None, path=CATALOG_PATH):
+    if kind not in KINDS:
+        raise ValueError(f"unknown run kind {kind!r}, expected one of {KINDS}")
+    if stats is None:
+        with open(json_file) as f:
+            stats = json.load(f)
+    conn = connect(path)
+    with conn:
+        conn.execute(_UPSERT, _row_values(json_file, kind, stats, interface))
+    conn.close()
+
+
+def import_folder(folder, kind, path=CATALOG_PATH, only_new=False):
+    # Backfill for captures made before the catalog existed, or copied into
+    # the folder since. only_new skips files already catalogued, so it is
+    # cheap enough to run before every lookup.
+    conn = connect(path)
+    count = 0
+    known = {row[0] for row in conn.execute("SELECT json_path FROM runs")} if only_new else set()
+    with conn:
+        for json_file in glob.glob(f"{folder}/*_stats_*.json"):
+            if os.path.abspath(json_file) in known:
+                continue
+            try:
+                with open(json_file) as f:
+                    stats = json.load(f)
+            except (OSError, ValueError):
+                continue
+            conn.execute(_UPSERT, _row_values(json_file, kind, stats, None))
+            count += 1
+    conn.close()
+    return count
+
+
+def _as_dict(row):
+    run = dict(row)
+    run["pcap_files"] = json.loads(run["pcap_files"] or "[]")
+    return run
+
+
+def find_runs(kind=None, interface=None, since=None, until=None, limit=None, path=CATALOG_PATH):
+    # Newest first. since/until accept unix timestamps or ISO strings and
+    # filter on the capture start time.
+    clauses, params = [], []
+    for column, op, value in (("kind", "=", kind), ("interface", "=", interface),
+                              ("start_ts", ">=", _timestamp(since)), ("start_ts", "<", _timestamp(until))):
+        if value is not None:
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+    sql = "SELECT * FROM runs"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY start_ts DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    conn = connect(path)
+    try:
+        return [_as_dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def latest_run(kind, interface=None, path=CATALOG_PATH):
+    runs = find_runs(kind, interface, limit=1, path=path)
+    return runs[0] if runs else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query or backfill the capture catalog")
+    parser.add_argument("--catalog", default=CATALOG_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    listing = sub.add_parser("list")
+    listing.add_argument("--kind", choices=KINDS)
+    listing.add_argument("--iface")
+    listing.add_argument("--since", help="ISO date/time")
+    listing.add_argument("--until", help="ISO date/time")
+    listing.add_argument("--limit", type=int, default=50)
+    backfill = sub.add_parser("import")
+    backfill.add_argument("folder")
+    backfill.add_argument("kind", choices=KINDS)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        count = import_folder(args.folder, args.kind, args.catalog)
+        print(f"[✓] Registered {count} {args.kind} runs from {args.folder}")
+    else:
+        runs = find_runs(args.kind, args.iface, args.since, args.until, args.limit, args.catalog)
+        for run in runs:
+            start = datetime.fromtimestamp(run["start_ts"]).isoformat(" ", "seconds") if run["start_ts"] else "?"
+            print(f"{start}  {run['kind']:<8} {run['interface'] or '-':<8} "
+                  f"{run['total_packets'] or 0:>9} pkts  {run['json_path']}")
+        print(f"[✓] {len(runs)} runs")
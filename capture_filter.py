@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+import ctypes
+import ctypes.util
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import threading
+
+from pcap_reader import (iter_records, LINKTYPE_ETHERNET, LINKTYPE_RAW, LINKTYPE_IPV4,
+                         LINKTYPE_LINUX_SLL, PROTO_TCP, PROTO_UDP, PROTO_ICMP)
+from pcap_stream import RotatingPcapWriter
+
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
+SO_ATTACH_FILTER = 26
+MAX_SNAPLEN = 262144
+
+# Expressions that compile without libpcap or tcpdump.
+BUILTIN_PROTOCOLS = {
+    "ip": None,
+    "tcp": (PROTO_TCP,),
+    "udp": (PROTO_UDP,),
+    "icmp": (PROTO_ICMP,),
+    "tcp or udp": (PROTO_TCP, PROTO_UDP),
+    "tcp or udp or icmp": (PROTO_TCP, PROTO_UDP, PROTO_ICMP),
+}
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _builtin_program(expr, snaplen, linktype):
+    # ldh [ethertype] / jeq #0x800 / (ldb [proto] / jeq #p ...) / ret
+    expr = " ".join(expr.lower().split())
+    if expr and expr not in BUILTIN_PROTOCOLS:
+        return None
+    accept = [(0x06, 0, 0, snaplen)]
+    reject = [(0x06, 0, 0, 0)]
+    if not expr:
+        return accept
+    if linktype == LINKTYPE_ETHERNET:
+        ip_check, ip = [(0x28, 0, 0, 12)], 14
+    elif linktype == LINKTYPE_LINUX_SLL:
+        ip_check, ip = [(0x28, 0, 0, 14)], 16
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        ip_check, ip = [(0x30, 0, 0, 0), (0x54, 0, 0, 0xf0)], 0
+    else:
+        return None
+    value = 0x40 if ip == 0 else 0x0800
+    protos = BUILTIN_PROTOCOLS[expr] or ()
+    body = []
+    for i, proto in enumerate(protos):
+        remaining = len(protos) - i - 1
+        body.append((0x15, remaining, 0 if remaining else 1, proto))
+    program = list(ip_check)
+    # jeq #value: fall through to the protocol checks, else jump to reject.
+    program.append((0x15, 0, len(body) + 2 if protos else 1, value))
+    if protos:
+        program.append((0x30, 0, 0, ip + 9))
+        program.extend(body)
+    return program + accept + reject
+
+
+def _libpcap_program(expr, snaplen, linktype):
+    name = ctypes.util.find_library("pcap")
+    if not name:
+        return None
+    lib = ctypes.CDLL(name)
+
+    class BpfInsn(ctypes.Structure):
+        _fields_ = [("code", ctypes.c_ushort), ("jt", ctypes.c_ubyte),
+                    ("jf", ctypes.c_ubyte), ("k", ctypes.c_uint)]
+
+    class BpfProgram(ctypes.Structure):
+        _fields_ = [("bf_len", ctypes.c_uint), ("bf_insns", ctypes.POINTER(BpfInsn))]
+
+    lib.pcap_open_dead.restype = ctypes.c_void_p
+    lib.pcap_geterr.restype = ctypes.c_char_p
+    handle = lib.pcap_open_dead(linktype, snaplen)
+    program = BpfProgram()
+    try:
+        if lib.pcap_compile(ctypes.c_void_p(handle), ctypes.byref(program), expr.encode(), 1, 0xffffffff) != 0:
+            raise FilterError(lib.pcap_geterr(ctypes.c_void_p(handle)).decode())
+        insns = [(i.code, i.jt, i.jf, i.k) for i in program.bf_insns[:program.bf_len]]
+        lib.pcap_freecode(ctypes.byref(program))
+        return insns
+    finally:
+        lib.pcap_close(ctypes.c_void_p(handle))
+
+
+def _tcpdump_program(expr, snaplen, linktype):
+    tcpdump = shutil.which("tcpdump")
+    if not tcpdump:
+        return None
+    names = {LINKTYPE_ETHERNET: "EN10MB", LINKTYPE_RAW: "RAW", LINKTYPE_LINUX_SLL: "LINUX_SLL"}
+    cmd = [tcpdump, "-ddd", "-s", str(snaplen)]
+    if linktype in names:
+        cmd += ["-y", names[linktype]]
+    result = subprocess.run(cmd + [expr], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise FilterError(result.stderr.strip())
+    lines = result.stdout.split("\n")
+    return [tuple(int(v) for v in line.split()) for line in lines[1:int(lines[0]) + 1]]
+
+
+def compile_bpf(expr, snaplen=0, linktype=LINKTYPE_ETHERNET):
+    # Returns classic BPF as [(code, jt, jf, k), ...]. Accepting returns are
+    # clamped to snaplen so the kernel truncates packets before copying.
+    expr = expr or ""
+    snaplen = snaplen or MAX_SNAPLEN
+    program = (_builtin_program(expr, snaplen, linktype)
+               or _libpcap_program(expr, snaplen, linktype)
+               or _tcpdump_program(expr, snaplen, linktype))
+    if program is None:
+        raise FilterError(f"cannot compile {expr!r}: needs libpcap or tcpdump "
+                          f"(built-in: {', '.join(BUILTIN_PROTOCOLS)})")
+    return [(code, jt, jf, min(k, snaplen) if code == 0x06 and k else k)
+            for code, jt, jf, k in program]
+
+
+def attach_bpf(sock, program):
+    insns = b"".join(struct.pack("HBBI", *insn) for insn in program)
+    buf = ctypes.create_string_buffer(insns)
+    fprog = struct.pack("HL", len(program), ctypes.addressof(buf))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+    return buf
+
+
+def kernel_stats(sock):
+    # tp_packets includes drops. The kernel resets both on every read.
+    packets, drops = struct.unpack("II", sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 8))
+    return packets, drops
+
+
+def interface_packets(iface):
+    total = 0
+    for name in ("rx_packets", "tx_packets"):
+        try:
+            with open(f"/sys/class/net/{iface}/statistics/{name}") as f:
+                total += int(f.read())
+        except (OSError, ValueError):
+            return None
+    return total
+
+
+def open_raw_socket(iface, expr="", snaplen=0):
+    # Plain AF_PACKET socket (no scapy) with the same filter/snaplen pushdown.
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(0x0003))
+    sock.bind((iface, 0))
+    if expr or snaplen:
+        attach_bpf(sock, compile_bpf(expr, snaplen, LINKTYPE_ETHERNET))
+    return sock
+
+
+def open_capture_socket(iface, expr="", snaplen=0):
+    # A scapy L2 listen socket with our own BPF attached, so sniff() gets
+    # kernel-side filtering and truncation through opened_socket=.
+    from scapy.all import conf
+    sock = conf.L2listen(iface=iface)
+    if expr or snaplen:
+        try:
+            program = compile_bpf(expr, snaplen, LINKTYPE_ETHERNET)
+            sock._bpf_buf = attach_bpf(sock.ins, program)
+        except FilterError as e:
+            print(f"[!] Capture filter not applied ({e}); capturing unfiltered")
+    return sock
+
+
+class CaptureCounters:
+    # The kernel resets its counters on every read, so poll() keeps running
+    # totals; safe to call from a metrics thread while capturing.
+    def __init__(self, iface, sock):
+        self.iface = iface
+        self.raw = getattr(sock, "ins", sock)
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.dropped = 0
+        kernel_stats(self.raw)
+        self.wire_start = interface_packets(iface)
+
+    def poll(self):
+        with self.lock:
+            if self.raw.fileno() < 0:
+                return self.accepted, self.dropped
+            accepted, dropped = kernel_stats(self.raw)
+            self.accepted += accepted
+            self.dropped += dropped
+            return self.accepted, self.dropped
+
+    def finish(self, handled):
+        accepted, dropped = self.poll()
+        wire_end = interface_packets(self.iface)
+        wire = None if self.wire_start is None or wire_end is None else wire_end - self.wire_start
+        return {
+            "interface_packets": wire,
+            "kernel_accepted": accepted,
+            "kernel_dropped": dropped,
+            "kernel_filtered": None if wire is None else max(wire - accepted, 0),
+            "handled_ip_packets": handled,
+            "userspace_discarded": max(accepted - dropped - handled, 0),
+        }
+
+
+def run_bpf(program, buf, off, caplen, wirelen):
+    # Classic BPF interpreter for offline pcaps, so the same filter string
+    # selects the same packets as the kernel does live. Returns the number
+    # of bytes to keep (0 = drop).
+    A = X = 0
+    mem = [0] * 16
+    pc = 0
+    end = off + caplen
+    n = len(program)
+    while pc < n:
+        code, jt, jf, k = program[pc]
+        pc += 1
+        cls = code & 0x07
+        if cls == 0x00 or cls == 0x01:
+            mode = code & 0xe0
+            size = code & 0x18
+            if mode == 0x00:
+                val = k
+            elif mode == 0x80:
+                val = wirelen
+            elif mode == 0x60:
+                val = mem[k & 0x0f]
+            elif mode == 0xa0:
+                pos = off + k
+                if pos >= end:
+                    return 0
+                val = (buf[pos] & 0x0f) * 4
+            else:
+                pos = off + k + (X if mode == 0x40 else 0)
+                width = 4 if size == 0x00 else 2 if size == 0x08 else 1
+                if k >= 0xfffff000 or pos + width > end:
+                    return 0
+                val = int.from_bytes(buf[pos:pos + width], "big")
+            if cls == 0x00:
+                A = val
+            else:
+                X = val
+        elif cls == 0x02:
+            mem[k & 0x0f] = A
+        elif cls == 0x03:
+            mem[k & 0x0f] = X
+        elif cls == 0x04:
+            op = code & 0xf0
+            operand = X if code & 0x08 else k
+            if op == 0x00:
+                A = A + operand
+            elif op == 0x10:
+                A = A - operand
+            elif op == 0x20:
+                A = A * operand
+            elif op == 0x30:
+                if operand == 0:
+                    return 0
+                A = A // operand
+            elif op == 0x40:
+                A = A | operand
+            elif op == 0x50:
+                A = A & operand
+            elif op == 0x60:
+                A = A << operand
+            elif op == 0x70:
+                A = A >> operand
+            elif op == 0x80:
+                A = -A
+            elif op == 0x90:
+                if operand == 0:
+                    return 0
+                A = A % operand
+            elif op == 0xa0:
+                A = A ^ operand
+            A &= 0xffffffff
+        elif cls == 0x05:
+            op = code & 0xf0
+            if op == 0x00:
+                pc += k
+                continue
+            operand = X if code & 0x08 else k
+            if op == 0x10:
+                taken = A == operand
+            elif op == 0x20:
+                taken = A > operand
+            elif op == 0x30:
+                taken = A >= operand
+            else:
+                taken = bool(A & operand)
+            pc += jt if taken else jf
+        elif cls == 0x06:
+            rval = code & 0x18
+            return A if rval == 0x10 else X if rval == 0x08 else k
+        else:
+            if code & 0xf8 == 0x80:
+                A = X
+            else:
+                X = A
+    return 0
+
+
+def filter_pcap(in_paths, out_prefix, expr="", snaplen=0):
+    # Offline equivalent of the live capture options: writes the packets
+    # the filter accepts, truncated to snaplen.
+    if isinstance(in_paths, str):
+        in_paths = [in_paths]
+    counters = {"records": 0, "accepted": 0, "filtered": 0}
+    writer = None
+    programs = {}
+    for path in in_paths:
+        for ts, caplen, wirelen, data, mm, linktype in iter_records(path):
+            if linktype not in programs:
+                programs[linktype] = compile_bpf(expr, snaplen, linktype)
+            if writer is None:
+                writer = RotatingPcapWriter(out_prefix, linktype=linktype, snaplen=snaplen or MAX_SNAPLEN)
+            counters["records"] += 1
+            keep = run_bpf(programs[linktype], mm, data, caplen, wirelen)
+            if not keep:
+                counters["filtered"] += 1
+                continue
+            counters["accepted"] += 1
+            writer.write(ts, mm[data:data + min(caplen, keep)], wirelen)
+    if writer is None:
+        writer = RotatingPcapWriter(out_prefix, snaplen=snaplen or MAX_SNAPLEN)
+    counters["pcap_files"] = writer.close()
+    return counters
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: capture_filter.py <in.pcap> <out.pcap> [filter expression] [-s snaplen]")
+        sys.exit(1)
+    args = sys.argv[1:]
+    snaplen = 0
+    if "-s" in args:
+        i = args.index("-s")
+        snaplen = int(args[i + 1])
+        del args[i:i + 2]
+    in_path, out_path = args[0], args[1]
+    expr = " ".join(args[2:])
+    result = filter_pcap(in_path, os.path.splitext(out_path)[0], expr, snaplen)
+    print(f"[✓] {result['accepted']} of {result['records']} packets kept "
+          f"({result['filtered']} filtered) -> {result['pcap_files'][0]}")
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+import argparse
+import multiprocessing
+import socket
+import threading
+import time
+from collections import deque
+
+from capture_filter import open_raw_socket, kernel_stats
+from parallel_analyzer import ShardStats
+from pcap_reader import decode_ipv4, LINKTYPE_ETHERNET
+
+POLICIES = ("drop_newest", "drop_oldest", "block")
+DEFAULT_QUEUE_SIZE = 65536
+BATCH_SIZE = 256
+RECV_BUFFER = 65535
+SOCKET_RCVBUF = 16 * 1024 * 1024
+
+
+class BoundedFrameQueue:
+    # Bounded FIFO between the capture thread and the workers. When full,
+    # "drop_newest" discards the incoming frame, "drop_oldest" evicts the
+    # head, "block" makes the capture thread wait (the kernel ring then
+    # absorbs the backlog and reports its own drops).
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE, policy="drop_oldest"):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown queue policy {policy!r}, expected one of {POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.enqueued = 0
+        self.dropped = 0
+        self.high_water = 0
+        self.blocked_seconds = 0.0
+        self.closed = False
+
+    def put(self, item):
+        with self.cond:
+            items = self.items
+            if len(items) >= self.maxsize:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                if self.policy == "drop_oldest":
+                    items.popleft()
+                    self.dropped += 1
+                else:
+                    start = time.perf_counter()
+                    while len(items) >= self.maxsize and not self.closed:
+                        self.cond.wait(0.1)
+                    self.blocked_seconds += time.perf_counter() - start
+            items.append(item)
+            self.enqueued += 1
+            if len(items) > self.high_water:
+                self.high_water = len(items)
+            self.cond.notify()
+            return True
+
+    def get_batch(self, max_items=BATCH_SIZE, timeout=0.1):
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            items = self.items
+            batch = [items.popleft() for _ in range(min(max_items, len(items)))]
+            if batch and self.policy == "block":
+                self.cond.notify_all()
+            return batch
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def drained(self):
+        with self.cond:
+            return self.closed and not self.items
+
+    def metrics(self):
+        return {
+            "queue_size": self.maxsize,
+            "queue_policy": self.policy,
+            "enqueued": self.enqueued,
+            "queue_dropped": self.dropped,
+            "queue_high_water": self.high_water,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
+
+
+def aggregate_frames(stats, batch):
+    for ts, frame, wirelen in batch:
+        fields = decode_ipv4(frame, 0, len(frame), LINKTYPE_ETHERNET)
+        if fields is not None:
+            src, dst, proto, sport, dport, flags = fields
+            stats.add_packet(int(ts), src, dst, proto, dport)
+
+
+def _process_worker(inbox, outbox):
+    stats = ShardStats()
+    while True:
+        batch = inbox.get()
+        if batch is None:
+            break
+        aggregate_frames(stats, batch)
+    outbox.put(stats)
+
+
+class CapturePipeline:
+    # The capture thread only does recv + timestamp + enqueue. Workers
+    # decode and aggregate into mergeable ShardStats. In "thread" mode each
+    # frame is also handed to sink(ts, frame, wirelen, fields), one batch
+    # at a time in the order batches left the queue, so pcap/feature
+    # writers, the detector and the flow table still see time order with
+    # several workers. "process" mode ships batches to worker processes
+    # for aggregation only.
+    def __init__(self, iface, bpf_filter="ip", snaplen=0, queue_size=DEFAULT_QUEUE_SIZE,
+                 policy="drop_oldest", workers=1, worker_mode="thread", sink=None):
+        if worker_mode not in ("thread", "process"):
+            raise ValueError("worker_mode must be 'thread' or 'process'")
+        self.iface = iface
+        self.bpf_filter = bpf_filter
+        self.snaplen = snaplen
+        self.queue = BoundedFrameQueue(queue_size, policy)
+        self.workers = max(1, workers)
+        self.worker_mode = worker_mode
+        self.sink = sink
+        self.take_lock = threading.Lock()
+        self.turn = threading.Condition()
+        self.taken = 0
+        self.next_turn = 0
+        self.captured = 0
+        self.processed = 0
+        self.stop_event = threading.Event()
+        self.sock = None
+        self.kernel_lock = threading.Lock()
+        self.kernel_packets = 0
+        self.kernel_drops = 0
+
+    def kernel_counters(self):
+        # Running (packets, drops) totals; the kernel resets on each read,
+        # so every read goes through here. None before the socket opens.
+        with self.kernel_lock:
+            if self.sock is None:
+                return None
+            if self.sock.fileno() >= 0:
+                packets, drops = kernel_stats(self.sock)
+                self.kernel_packets += packets
+                self.kernel_drops += drops
+            return self.kernel_packets, self.kernel_drops
+
+    def _capture_loop(self, sock, deadline):
+        buf = bytearray(self.snaplen or RECV_BUFFER)
+        view = memoryview(buf)
+        recv_into = sock.recv_into
+        put = self.queue.put
+        while not self.stop_event.is_set() and time.time() < deadline:
+            try:
+                wirelen = recv_into(buf, len(buf), socket.MSG_TRUNC)
+            except socket.timeout:
+                continue
+            ts = time.time()
+            self.captured += 1
+            put((ts, bytes(view[:min(wirelen, len(buf))]), wirelen))
+        self.queue.close()
+
+    def _thread_worker(self, results):
+        stats = ShardStats()
+        sink = self.sink
+        while not self.queue.drained():
+            # Batches are numbered as they leave the queue; decoding runs
+            # in parallel, the sink takes them strictly in that order.
+            with self.take_lock:
+                batch = self.queue.get_batch()
+                turn = self.taken
+                if batch:
+                    self.taken += 1
+            if not batch:
+                continue
+            decoded = []
+            for ts, frame, wirelen in batch:
+                fields = decode_ipv4(frame, 0, len(frame), LINKTYPE_ETHERNET)
+                if fields is not None:
+                    src, dst, proto, sport, dport, flags = fields
+                    stats.add_packet(int(ts), src, dst, proto, dport)
+                decoded.append(fields)
+            with self.turn:
+                while self.next_turn != turn:
+                    self.turn.wait()
+                try:
+                    if sink is not None:
+                        for (ts, frame, wirelen), fields in zip(batch, decoded):
+                            sink(ts, frame, wirelen, fields)
+                    self.processed += len(batch)
+                finally:
+                    self.next_turn += 1
+                    self.turn.notify_all()
+        results.append(stats)
+
+    def _forward_loop(self, inboxes):
+        index = 0
+        while not self.queue.drained():
+            batch = self.queue.get_batch()
+            if batch:
+                inboxes[index % len(inboxes)].put(batch)
+                self.processed += len(batch)
+                index += 1
+        for inbox in inboxes:
+            inbox.put(None)
+
+    def run(self, duration):
+        sock = open_raw_socket(self.iface, self.bpf_filter, self.snaplen)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+        sock.settimeout(0.2)
+        kernel_stats(sock)
+        self.sock = sock
+        start = time.time()
+        results = []
+        processes = []
+        if self.worker_mode == "thread":
+            workers = [threading.Thread(target=self._thread_worker, args=(results,))
+                       for _ in range(self.workers)]
+        else:
+            outbox = multiprocessing.Queue()
+            inboxes = [multiprocessing.Queue() for _ in range(self.workers)]
+            processes = [multiprocessing.Process(target=_process_worker, args=(inbox, outbox))
+                         for inbox in inboxes]
+            for p in processes:
+                p.start()
+            workers = [threading.Thread(target=self._forward_loop, args=(inboxes,))]
+        for w in workers:
+            w.start()
+        capture = threading.Thread(target=self._capture_loop, args=(sock, start + duration))
+        capture.start()
+        try:
+            capture.join()
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            capture.join()
+        kernel_packets, kernel_drops = self.kernel_counters()
+        with self.kernel_lock:
+            sock.close()
+        for w in workers:
+            w.join()
+        if processes:
+            results = [outbox.get() for _ in processes]
+            for p in processes:
+                p.join()
+        merged = ShardStats()
+        for stats in results:
+            merged.merge(stats)
+        elapsed = time.time() - start
+        metrics = {
+            "worker_mode": self.worker_mode,
+            "workers": self.workers,
+            "captured": self.captured,
+            "processed": self.processed,
+            "kernel_packets": kernel_packets,
+            "kernel_dropped": kernel_drops,
+            "capture_pps": round(self.captured / elapsed, 1) if elapsed else 0.0,
+        }
+        metrics.update(self.queue.metrics())
+        return merged, metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture with a bounded queue between capture and processing")
+    parser.add_argument("--iface", default="lo")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--filter", default="ip")
+    parser.add_argument("--snaplen", type=int, default=0)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--policy", choices=POLICIES, default="drop_oldest")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    args = parser.parse_args()
+
+    pipeline = CapturePipeline(args.iface, args.filter, args.snaplen, args.queue_size,
+                               args.policy, args.workers, args.mode)
+    stats, metrics = pipeline.run(args.duration)
+    result = stats.to_stats()
+    print(f"[✓] {result['total_packets']} IP packets (TCP {result['tcp_packets']}, "
+          f"UDP {result['udp_packets']}, ICMP {result['icmp_packets']})")
+    print(f"[✓] captured {metrics['captured']}, queue dropped {metrics['queue_dropped']}, "
+          f"high water {metrics['queue_high_water']}/{metrics['queue_size']}, "
+          f"kernel dropped {metrics['kernel_dropped']}")
@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pcap_stream import RotatingPcapWriter, DEFAULT_SNAPLEN
+from capture_filter import open_capture_socket, CaptureCounters
+from capture_pipeline import CapturePipeline
+from packet_ring import RingCapture
+from pcap_reader import ip_to_str, iter_records, decode_ipv4, PROTO_TCP
+from parallel_analyzer import ShardStats
+from feature_store import FeatureWriter, merge_features
+from capture_catalog import register_run, KINDS
+from flow_table import FlowTable, FlowWriter
+from sketches import TrafficSketch, HyperLogLog
+from detector import SlidingWindowDetector, print_alert
+from segmentation import segment_capture
+from timeseries import packets_per_second
+from convergence import ConvergenceMonitor
+from metrics import Registry, Exporter, PREFIX, METRICS_DIR, SNAPSHOT_INTERVAL
+from scapy.all import AsyncSniffer, IP, TCP, UDP, ICMP, wrpcap
+
+BACKENDS = ("sniff", "pipeline", "ring")
+SESSION_MODES = ("thread", "process")
+TOP_PORTS = 20
+# Capture-script constant -> CaptureSession keyword. baseline_capture and
+# attack_simulator each define these; session_options() reads them.
+SESSION_SETTINGS = {
+    "CAPTURE_BACKEND": "backend",
+    "CAPTURE_FILTER": "bpf_filter",
+    "SNAPLEN": "snaplen",
+    "STREAM_TO_DISK": "stream_to_disk",
+    "ROTATE_MAX_BYTES": "rotate_max_bytes",
+    "ROTATE_MAX_SECONDS": "rotate_max_seconds",
+    "RING_SIZE": "ring_size",
+    "WRITE_FEATURES": "write_features",
+    "SKETCH_MODE": "sketch_mode",
+    "SKETCH_TOP_K": "sketch_top_k",
+    "RUN_DETECTOR": "run_detector",
+    "TRACK_FLOWS": "track_flows",
+    "FLOW_CAPACITY": "flow_capacity",
+    "PIPELINE_WORKERS": "pipeline_workers",
+    "QUEUE_SIZE": "queue_size",
+    "QUEUE_POLICY": "queue_policy",
+    "INSTRUMENT": "instrument",
+    "METRICS_INTERVAL": "metrics_interval",
+}
+
+
+def get_interface():
+    result = subprocess.run(['ip', 'route'], capture_output=True, text=True)
+    for line in result.stdout.split('\n'):
+        if 'default' in line:
+            parts = line.split()
+            if 'dev' in parts:
+                return parts[parts.index('dev') + 1]
+    return "wlan0"
+
+
+def new_stats():
+    return {
+        "start_time": "",
+        "end_time": "",
+        "total_packets": 0,
+        "tcp_packets": 0,
+        "udp_packets": 0,
+        "icmp_packets": 0,
+        "unique_src_ips": [],
+        "unique_dst_ips": [],
+        "port_frequency": {},
+        "packets_per_second": []
+    }
+
+
+def session_options(config, **extra):
+    # CaptureSession keywords from a config module's constants; the ones it
+    # doesn't define keep the session defaults.
+    options = {arg: getattr(config, name) for name, arg in SESSION_SETTINGS.items() if hasattr(config, name)}
+    options.update(extra)
+    return options
+
+
+def print_backend_metrics(metrics):
+    if "queue_dropped" in metrics:
+        print(f"[*] Queue: {metrics['queue_dropped']} dropped, high water "
+              f"{metrics['queue_high_water']}/{metrics['queue_size']}")
+    if "kernel_packets" in metrics:
+        print(f"[*] Kernel: {metrics['kernel_packets']} packets, {metrics['kernel_dropped']} dropped")
+    else:
+        print(f"[*] Offline: {metrics['captured']} frames from {metrics['pcap_files']} pcap file(s), "
+              f"{metrics['capture_pps']:,} pkt/s")
+
+
+class CaptureSession:
+    # One capture on one interface, with all of its state (stats, writers,
+    # detector, flow table) on the instance. start() captures in the
+    # background, stop() ends it early, finish() waits, writes the stats
+    # JSON and returns its path. Sessions share nothing, so several can run
+    # side by side in one process.
+    def __init__(self, kind, interface, output_dir, backend="sniff", bpf_filter="ip", snaplen=0,
+                 stream_to_disk=True, rotate_max_bytes=100 * 1024 * 1024, rotate_max_seconds=0,
+                 ring_size=1000, write_features=True, sketch_mode=False, sketch_top_k=64,
+                 run_detector=True, track_flows=True, flow_capacity=200000, pipeline_workers=1,
+                 queue_size=65536, queue_policy="drop_oldest", adaptive=None, tag=None,
+                 instrument=True, metrics_interval=SNAPSHOT_INTERVAL):
+        if kind not in KINDS:
+            raise ValueError(f"unknown run kind {kind!r}, expected one of {KINDS}")
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown capture backend {backend!r}, expected one of {BACKENDS}")
+        self.kind = kind
+        self.interface = interface
+        self.output_dir = output_dir
+        self.backend = backend
+        self.bpf_filter = bpf_filter
+        self.snaplen = snaplen
+        self.stream_to_disk = stream_to_disk
+        self.rotate_max_bytes = rotate_max_bytes
+        self.rotate_max_seconds = rotate_max_seconds
+        self.write_features = write_features
+        self.sketch_mode = sketch_mode
+        self.sketch_top_k = sketch_top_k
+        self.run_detector = run_detector
+        self.track_flows = track_flows
+        self.flow_capacity = flow_capacity
+        self.pipeline_workers = pipeline_workers
+        self.queue_size = queue_size
+        self.queue_policy = queue_policy
+        self.adaptive = adaptive
+        self.tag = tag
+        self.instrument = instrument
+        self.metrics_interval = metrics_interval
+        self.stats = new_stats()
+        self.captured_packets = deque(maxlen=ring_size if stream_to_disk else None)
+        self.pcap_writer = None
+        self.feature_writer = None
+        self.traffic_sketch = None
+        self.detector = None
+        self.flow_table = None
+        self.monitor = None
+        self.stop_reason = None
+        self.seen_src = set()
+        self.seen_dst = set()
+        self.per_second = {}
+        self.timestamp = None
+        self.deadline = None
+        self._capture = None
+        self._thread = None
+        self._result = []
+        self._socket = None
+        self._counters = None
+        self._sniffer = None
+        self._watcher = None
+        self._ended = threading.Event()
+        self._handler = self.packet_handler
+        self._sink = self.frame_sink
+        self.metrics = None
+        self._exporter = None
+        self._started = None
+
+    def path(self, name, suffix=""):
+        # e.g. ../captures/baseline/baseline_stats_20250101_120000[_eth1].json
+        stamp = f"{self.timestamp}_{self.tag}" if self.tag else self.timestamp
+        return f"{self.output_dir}/{self.kind}{name}_{stamp}{suffix}"
+
+    def packet_handler(self, pkt):
+        if not pkt.haslayer(IP):
+            return
+        stats = self.stats
+        stats["total_packets"] += 1
+        if self.snaplen:
+            # The kernel truncated the frame and scapy doesn't keep the
+            # original length; rebuild it from the IP total length (link
+            # header + ip.len) so pcap records, features and flows keep
+            # the wire size. Ethernet padding of short frames is the one
+            # part not recoverable, hence the max.
+            ip = pkt[IP]
+            pkt.wirelen = max(len(pkt), len(pkt) - len(ip) + ip.len)
+        self.captured_packets.append(pkt)
+        if self.pcap_writer is not None:
+            self.pcap_writer.write_packet(pkt)
+        if self.feature_writer is not None:
+            self.feature_writer.append_packet(pkt)
+        if self.detector is not None:
+            self.detector.observe_packet(pkt)
+        if self.flow_table is not None:
+            self.flow_table.add_packet(pkt)
+        if self.monitor is not None:
+            self.monitor.observe_packet(pkt)
+        second = int(pkt.time)
+        self.per_second[second] = self.per_second.get(second, 0) + 1
+        if self.traffic_sketch is not None:
+            self.traffic_sketch.add_ips(pkt[IP].src, pkt[IP].dst)
+        else:
+            self.seen_src.add(pkt[IP].src)
+            self.seen_dst.add(pkt[IP].dst)
+        if pkt.haslayer(TCP):
+            stats["tcp_packets"] += 1
+            port = pkt[TCP].dport
+            if self.traffic_sketch is not None:
+                self.traffic_sketch.add_port(port)
+            else:
+                stats["port_frequency"][port] = stats["port_frequency"].get(port, 0) + 1
+        elif pkt.haslayer(UDP):
+            stats["udp_packets"] += 1
+        elif pkt.haslayer(ICMP):
+            stats["icmp_packets"] += 1
+
+    def frame_sink(self, ts, frame, wirelen, fields):
+        # Counterpart of packet_handler's side outputs for the pipeline and
+        # ring backends, which do the counting themselves.
+        if fields is None:
+            return
+        if self.pcap_writer is not None:
+            self.pcap_writer.write(ts, frame, wirelen)
+        src, dst, proto, sport, dport, flags = fields
+        if self.feature_writer is not None:
+            self.feature_writer.append(ts, wirelen, src, dst, proto, sport, dport, flags)
+        if self.detector is not None:
+            self.detector.observe(ts, src, proto, dport, flags)
+        if self.flow_table is not None:
+            self.flow_table.add(ts, wirelen, src, dst, proto, sport, dport, flags)
+        if self.monitor is not None:
+            self.monitor.observe(ts, proto, dport)
+        if self.traffic_sketch is not None:
+            self.traffic_sketch.add_ips(ip_to_str(src), ip_to_str(dst))
+            if proto == PROTO_TCP:
+                self.traffic_sketch.add_port(dport)
+
+    def open_backend(self):
+        if self.backend == "ring":
+            return RingCapture(self.interface, self.bpf_filter, self.snaplen, sink=self._sink)
+        return CapturePipeline(self.interface, self.bpf_filter, self.snaplen, self.queue_size,
+                               self.queue_policy, self.pipeline_workers, sink=self._sink)
+
+    def open_outputs(self, write_pcap=True):
+        if self.timestamp is not None:
+            raise RuntimeError("capture session already started")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.stats["interface"] = self.interface
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if write_pcap:
+            self.pcap_writer = RotatingPcapWriter(
+                self.path(""),
+                max_bytes=self.rotate_max_bytes,
+                max_seconds=self.rotate_max_seconds,
+                snaplen=self.snaplen or DEFAULT_SNAPLEN
+            )
+        if self.sketch_mode:
+            self.traffic_sketch = TrafficSketch(self.sketch_top_k)
+        if self.run_detector:
+            self.detector = SlidingWindowDetector(on_alert=print_alert)
+        if self.track_flows:
+            self.flow_table = FlowTable(self.flow_capacity, writer=FlowWriter(self.path("_flows")))
+        if self.write_features:
+            self.feature_writer = FeatureWriter(self.path("_features", ".npy"))
+
+    def start(self, duration):
+        self.open_outputs(self.stream_to_disk or self.backend != "sniff")
+        self.stats["start_time"] = datetime.now().isoformat()
+        if self.adaptive is not None:
+            # duration becomes the upper bound; the watcher may stop sooner.
+            self.monitor = ConvergenceMonitor(**self.adaptive)
+            duration = self.monitor.max_seconds
+            self.monitor.begin()
+        self.deadline = time.time() + duration
+        self._started = time.time()
+        if self.instrument:
+            self.install_metrics()
+        if self.backend != "sniff":
+            self._capture = self.open_backend()
+            self._thread = threading.Thread(target=lambda: self._result.extend(self._capture.run(duration)),
+                                            daemon=True)
+            self._thread.start()
+        else:
+            self._socket = open_capture_socket(self.interface, self.bpf_filter, self.snaplen)
+            self._counters = CaptureCounters(self.interface, self._socket)
+            self._sniffer = AsyncSniffer(opened_socket=self._socket, prn=self._handler, store=False)
+            self._sniffer.start()
+        if self.monitor is not None:
+            self._watcher = threading.Thread(target=self._watch, daemon=True)
+            self._watcher.start()
+        if self.metrics is not None:
+            self._exporter = Exporter(self.metrics, f"{METRICS_DIR}/{self.kind}_{self.interface}",
+                                      self.metrics_interval).start()
+        return self
+
+    def install_metrics(self):
+        # Sampled latency of the per-packet handler plus gauges read only at
+        # export time (kernel counters, queue depth, alerts), so the capture
+        # path itself gains one wrapper call per packet and nothing else.
+        m = self.metrics = Registry(kind=self.kind, interface=self.interface, backend=self.backend)
+        if self.backend == "sniff":
+            self._handler = m.sampled(f"{PREFIX}handler_latency_seconds", self.packet_handler,
+                                      "Sampled time per call of the per-packet handler.", handler="packet_handler")
+            m.gauge(f"{PREFIX}ip_packets_total", lambda: self.stats["total_packets"],
+                    "IPv4 packets counted by the handler.", kind="counter")
+        else:
+            self._sink = m.sampled(f"{PREFIX}handler_latency_seconds", self.frame_sink,
+                                   "Sampled time per call of the per-packet handler.", handler="frame_sink")
+
+        def kernel():
+            if self._counters is not None:
+                return self._counters.poll()
+            if self._capture is not None:
+                return self._capture.kernel_counters()
+            return None
+
+        m.gauge(f"{PREFIX}kernel_packets_total", lambda: (kernel() or (None, None))[0],
+                "Packets the kernel passed to the capture socket, drops included.", kind="counter")
+        m.gauge(f"{PREFIX}kernel_dropped_total", lambda: (kernel() or (None, None))[1],
+                "Packets the kernel dropped because the capture socket was full.", kind="counter")
+        if self.backend == "pipeline":
+            queue = lambda: self._capture.queue if self._capture is not None else None
+            m.gauge(f"{PREFIX}queue_depth", lambda: len(queue().items) if queue() else None,
+                    "Frames waiting between the capture thread and the workers.")
+            m.gauge(f"{PREFIX}queue_high_water", lambda: queue().high_water if queue() else None,
+                    "Deepest the frame queue has been.")
+            m.gauge(f"{PREFIX}queue_dropped_total", lambda: queue().dropped if queue() else None,
+                    "Frames dropped by the queue policy.", kind="counter")
+        if self.run_detector:
+            m.gauge(f"{PREFIX}alerts_total", lambda: self.detector.alerts_total if self.detector else None,
+                    "Detector alerts raised so far.", kind="counter")
+
+    def stop_metrics(self):
+        # Final export; a compact copy goes into the stats JSON.
+        snapshot = self._exporter.stop()
+        self._exporter = None
+        values = {name: samples[0]["value"] for name, samples in snapshot["metrics"].items() if len(samples) == 1}
+        return {
+            "prometheus_file": f"{METRICS_DIR}/{self.kind}_{self.interface}.prom",
+            "snapshot_file": f"{METRICS_DIR}/{self.kind}_{self.interface}.json",
+            "handler_latency": snapshot["histograms"].get(f"{PREFIX}handler_latency_seconds", [None])[0],
+            "overhead_ratio": values.get(f"{PREFIX}instrumentation_overhead_ratio"),
+            "kernel_packets": values.get(f"{PREFIX}kernel_packets_total"),
+            "kernel_dropped": values.get(f"{PREFIX}kernel_dropped_total"),
+            "stages": self.metrics.stages(),
+            "peak_resident_memory_bytes": values.get(f"{PREFIX}peak_resident_memory_bytes"),
+        }
+
+    def ingest(self, paths):
+        # Offline counterpart of start() plus the capture itself: stored
+        # pcaps go through the ring backend's decode -> ShardStats ->
+        # frame_sink path, so every side output comes out as it would live.
+        # The input files stand in for the session's pcap; call finish().
+        paths = [paths] if isinstance(paths, str) else list(paths)
+        self.open_outputs(write_pcap=False)
+        self.backend = "offline"
+        self.stats["pcap_files"] = paths
+        shard = ShardStats()
+        add = shard.add_packet
+        sink = self.frame_sink
+        frames = 0
+        first = last = None
+        start = time.perf_counter()
+        for path in paths:
+            for ts, caplen, wirelen, data, mm, linktype in iter_records(path):
+                frames += 1
+                if first is None:
+                    first = ts
+                last = ts
+                fields = decode_ipv4(mm, data, caplen, linktype)
+                if fields is not None:
+                    src, dst, proto, sport, dport, flags = fields
+                    add(int(ts), src, dst, proto, dport)
+                    # No pcap writer offline, so the frame bytes aren't needed.
+                    sink(ts, None, wirelen, fields)
+        elapsed = time.perf_counter() - start
+        if first is not None:
+            self.stats["start_time"] = datetime.fromtimestamp(first).isoformat()
+            self.stats["end_time"] = datetime.fromtimestamp(last).isoformat()
+        self._result = [shard, {
+            "captured": frames,
+            "pcap_files": len(paths),
+            "ingest_seconds": round(elapsed, 3),
+            "capture_pps": round(frames / elapsed, 1) if elapsed else 0.0,
+        }]
+        return self
+
+    def _watch(self):
+        while not self._ended.wait(1.0):
+            reason = self.monitor.check()
+            if reason is not None:
+                self.stop_reason = reason
+                if reason == "converged":
+                    print(f"[✓] {self.interface}: statistics converged after "
+                          f"{self.monitor.last['elapsed']:.0f}s, stopping")
+                self.stop()
+                return
+
+    def stop(self):
+        # Ends the capture before its duration is up; finish() still has
+        # to be called for the results.
+        if self._sniffer is not None and self._sniffer.running:
+            self._sniffer.stop(join=False)
+        if self._capture is not None:
+            self._capture.stop_event.set()
+
+    def wait(self):
+        # Blocks until the capture ends: at its deadline, or earlier if
+        # stop() was called.
+        if self._sniffer is not None:
+            self._sniffer.join(timeout=max(self.deadline - time.time(), 0))
+            self.stop()
+            self._sniffer.join()
+        if self._thread is not None:
+            self._thread.join()
+        self._ended.set()
+
+    def finish(self, register=True):
+        self.wait()
+        finalise = time.perf_counter()
+        if self.metrics is not None:
+            self.metrics.record_stage("capture", time.time() - self._started)
+        stats = self.stats
+        stats["end_time"] = stats["end_time"] or datetime.now().isoformat()
+        if self.monitor is not None:
+            if self.stop_reason is None:
+                self.monitor.check()
+            stats["adaptive"] = self.monitor.summary(self.stop_reason or "max_duration")
+        if self.backend != "sniff":
+            shard, stats[self.backend] = self._result
+            stats.update(shard.to_stats())
+            print_backend_metrics(stats[self.backend])
+            per_second = shard.per_second
+        else:
+            stats["capture_counters"] = self._counters.finish(stats["total_packets"])
+            self._socket.close()
+            per_second = self.per_second
+        # Binned over the whole capture window from packet timestamps, so
+        # idle seconds at either end and the last partial second show up.
+        start, end = (datetime.fromisoformat(stats[key]).timestamp() if stats[key] else None
+                      for key in ("start_time", "end_time"))
+        stats["packets_per_second"] = packets_per_second(list(per_second), start, end, list(per_second.values()))
+        if self.traffic_sketch is not None:
+            del stats["unique_src_ips"], stats["unique_dst_ips"]
+            stats.update(self.traffic_sketch.summary(TOP_PORTS))
+        elif self.backend == "sniff":
+            stats["unique_src_ips"] = list(self.seen_src)
+            stats["unique_dst_ips"] = list(self.seen_dst)
+            top_ports = dict(sorted(stats["port_frequency"].items(), key=lambda x: x[1], reverse=True)[:TOP_PORTS])
+            stats["port_frequency"] = top_ports
+        if self.pcap_writer is not None:
+            stats["pcap_files"] = self.pcap_writer.close()
+            self.pcap_writer = None
+        elif not stats.get("pcap_files"):
+            wrpcap(self.path("", ".pcap"), list(self.captured_packets), snaplen=self.snaplen or DEFAULT_SNAPLEN)
+            stats["pcap_files"] = [self.path("", ".pcap")]
+        if self.feature_writer is not None:
+            stats["features_file"] = self.feature_writer.close()
+            self.feature_writer = None
+            if stats.get("attacks_performed"):
+                stats["segments"] = segment_capture(stats)
+        if self.detector is not None:
+            stats["detection"] = self.detector.summary()
+            self.detector = None
+        if self.flow_table is not None:
+            stats["flows"] = self.flow_table.close()
+            self.flow_table = None
+        if self.metrics is not None:
+            self.metrics.record_stage("finalise", time.perf_counter() - finalise)
+            stats["instrumentation"] = self.stop_metrics()
+        json_file = self.path("_stats", ".json")
+        with open(json_file, 'w') as f:
+            json.dump(stats, f, indent=2)
+        if register:
+            register_run(json_file, self.kind, stats)
+        label = f" on {self.interface}" if self.tag else ""
+        print(f"\n[✓] Done{label}! Total packets: {stats['total_packets']}")
+        print(f"[✓] Saved: {stats['pcap_files'][0]}")
+        if len(stats["pcap_files"]) > 1:
+            print(f"[✓] Rotated into {len(stats['pcap_files'])} pcap files")
+        print(f"[✓] Saved: {json_file}")
+        latency = (stats.get("instrumentation") or {}).get("handler_latency")
+        if latency and latency["count"]:
+            info = stats["instrumentation"]
+            mark = "[!]" if latency["over_budget"] else "[*]"
+            print(f"{mark} Handler p50 {latency['p50'] * 1e6:.1f} us, p99 {latency['p99'] * 1e6:.1f} us "
+                  f"(1 in {latency['sample_every']} sampled, overhead {info['overhead_ratio'] or 0:.2%}); "
+                  f"metrics: {info['prometheus_file']}")
+        return json_file
+
+    def run(self, duration):
+        self.start(duration)
+        try:
+            self.wait()
+        except KeyboardInterrupt:
+            self.stop_reason = "interrupted"
+            self.stop()
+        return self.finish()
+
+
+def _run_session(kind, interface, output_dir, duration, options):
+    return CaptureSession(kind, interface, output_dir, **options).run(duration)
+
+
+def start_sessions(kind, interfaces, output_dir, duration, **options):
+    # Started thread-mode sessions, one per interface. Files are tagged with
+    # the interface name when there is more than one.
+    tagged = len(interfaces) > 1
+    return [CaptureSession(kind, iface, output_dir, tag=iface if tagged else None, **options).start(duration)
+            for iface in interfaces]
+
+
+def run_sessions(kind, interfaces, output_dir, duration, mode="thread", **options):
+    # Captures on every interface at once and returns the per-session stats
+    # JSON paths. "process" mode gives each interface its own interpreter,
+    # for links busy enough that one GIL can't keep up with all of them.
+    if mode not in SESSION_MODES:
+        raise ValueError(f"mode must be one of {SESSION_MODES}")
+    if mode == "process" and len(interfaces) > 1:
+        with ProcessPoolExecutor(len(interfaces)) as pool:
+            futures = [pool.submit(_run_session, kind, iface, output_dir, duration, dict(options, tag=iface))
+                       for iface in interfaces]
+            return [future.result() for future in futures]
+    sessions = start_sessions(kind, interfaces, output_dir, duration, **options)
+    try:
+        for session in sessions:
+            session.wait()
+    except KeyboardInterrupt:
+        for session in sessions:
+            session.stop_reason = "interrupted"
+            session.stop()
+    return [session.finish() for session in sessions]
+
+
+def merge_unique_counts(stats_list, exact_src, exact_dst):
+    # Distinct source/destination counts over several sessions. Sketch-mode
+    # sessions carry their HLL registers, which merge into one estimate;
+    # exact sessions list every address, so the union is already exact.
+    sketches = [s.get("sketch") or {} for s in stats_list]
+    if not any(sketches):
+        return {"unique_src_count": exact_src, "unique_dst_count": exact_dst}
+    precisions = {sk.get("hll_precision") for sk in sketches}
+    if all(sk.get("src_registers") for sk in sketches) and len(precisions) == 1:
+        p = precisions.pop()
+        result = {"sketch": {key: value for key, value in sketches[0].items() if not key.endswith("_registers")}}
+        for side in ("src", "dst"):
+            hll = HyperLogLog.load(sketches[0][f"{side}_registers"], p)
+            for sk in sketches[1:]:
+                hll.merge(HyperLogLog.load(sk[f"{side}_registers"], p))
+            result[f"unique_{side}_count"] = hll.count()
+            result["sketch"][f"{side}_registers"] = hll.dump()
+        return result
+    # Registers missing (older stats): the sum over sessions is an upper
+    # bound, since an address seen on two interfaces counts twice.
+    return {
+        "unique_src_count": sum(s.get("unique_src_count", len(s.get("unique_src_ips", []))) for s in stats_list),
+        "unique_dst_count": sum(s.get("unique_dst_count", len(s.get("unique_dst_ips", []))) for s in stats_list),
+        "unique_counts_upper_bound": True,
+    }
+
+
+def merge_stats(stats_list, top_n=TOP_PORTS):
+    # One summary over several sessions' stats dicts. Per-second counts are
+    # aligned on each session's start time; port counts are summed from the
+    # sessions' (already top-N) tables, so they are exact for ports that
+    # made every session's top N.
+    merged = new_stats()
+    starts = [datetime.fromisoformat(s["start_time"]) for s in stats_list]
+    merged["start_time"] = min(starts).isoformat()
+    merged["end_time"] = max(s["end_time"] for s in stats_list)
+    merged["interfaces"] = [s.get("interface") for s in stats_list]
+    src, dst, ports, per_second = set(), set(), {}, []
+    for s, started in zip(stats_list, starts):
+        for key in ("total_packets", "tcp_packets", "udp_packets", "icmp_packets"):
+            merged[key] += s[key]
+        src.update(s.get("unique_src_ips", []))
+        dst.update(s.get("unique_dst_ips", []))
+        for port, count in s.get("port_frequency", {}).items():
+            ports[int(port)] = ports.get(int(port), 0) + count
+        # Each session's first bin is its start time's whole second.
+        offset = int(started.timestamp() // 1 - min(starts).timestamp() // 1)
+        counts = s.get("packets_per_second", [])
+        per_second.extend([0] * (offset + len(counts) - len(per_second)))
+        for i, count in enumerate(counts):
+            per_second[offset + i] += count
+    merged["unique_src_ips"] = sorted(src)
+    merged["unique_dst_ips"] = sorted(dst)
+    merged.update(merge_unique_counts(stats_list, len(src), len(dst)))
+    if any(s.get("sketch") for s in stats_list):
+        # Sketch sessions keep no address lists, so a union would be partial.
+        del merged["unique_src_ips"], merged["unique_dst_ips"]
+    talkers = {}
+    for s in stats_list:
+        for ip, count in (s.get("top_talkers") or {}).items():
+            talkers[ip] = talkers.get(ip, 0) + count
+    if talkers:
+        merged["top_talkers"] = dict(sorted(talkers.items(), key=lambda x: (-x[1], x[0]))[:top_n])
+    merged["port_frequency"] = dict(sorted(ports.items(), key=lambda x: (-x[1], x[0]))[:top_n])
+    merged["packets_per_second"] = per_second
+    merged["per_interface"] = {
+        s.get("interface"): {key: s[key] for key in ("total_packets", "tcp_packets", "udp_packets", "icmp_packets")}
+        for s in stats_list
+    }
+    merged["features_files"] = [s["features_file"] for s in stats_list if s.get("features_file")]
+    return merged
+
+
+def write_summary(kind, json_files, output_dir):
+    # Merged view of a multi-interface run. Named *_summary_* so the
+    # catalog's *_stats_* backfill doesn't count its packets twice.
+    stats_list = []
+    for json_file in json_files:
+        with open(json_file) as f:
+            stats_list.append(json.load(f))
+    merged = merge_stats(stats_list)
+    merged["sessions"] = list(json_files)
+    stem = f"{output_dir}/{kind}_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    summary_file = f"{stem}.json"
+    if merged["features_files"] and len(merged["features_files"]) == len(stats_list):
+        # Window deviation and segmentation read a single features_file.
+        merged["features_file"] = merge_features(merged["features_files"], f"{stem}_features.npy")
+    with open(summary_file, 'w') as f:
+        json.dump(merged, f, indent=2)
+    # Each session points at the merged view, which is what analysis loads
+    # for this run (the catalog keeps the per-interface rows for rollups).
+    for json_file, stats in zip(json_files, stats_list):
+        stats["summary_file"] = os.path.abspath(summary_file)
+        with open(json_file, 'w') as f:
+            json.dump(stats, f, indent=2)
+    print(f"\n[✓] {len(json_files)} interfaces, {merged['total_packets']} packets in total")
+    for iface, counts in merged["per_interface"].items():
+        print(f"    {iface:<10} {counts['total_packets']:>9} packets")
+    print(f"[✓] Saved: {summary_file}")
+    return summary_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture on one or more interfaces at once")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("-i", "--iface", action="append", help="repeat for several interfaces (default: route)")
+    parser.add_argument("-d", "--duration", type=float, default=60)
+    parser.add_argument("-o", "--output-dir")
+    parser.add_argument("--backend", choices=BACKENDS, default="sniff")
+    parser.add_argument("--mode", choices=SESSION_MODES, default="thread")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or f"../captures/{args.kind}"
+    json_files = run_sessions(args.kind, args.iface or [get_interface()], output_dir, args.duration,
+                              args.mode, backend=args.backend)
+    if len(json_files) > 1:
+        write_summary(args.kind, json_files, output_dir)
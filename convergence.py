@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from pcap_reader import PROTO_TCP, PROTO_UDP, PROTO_ICMP
+from scapy.all import IP, TCP, UDP
+
+PROTOCOL_COLUMNS = {"total": 0, "tcp": 1, "udp": 2, "icmp": 3}
+COLUMN_OF = {PROTO_TCP: 1, PROTO_UDP: 2, PROTO_ICMP: 3}
+NUM_BATCHES = 10
+# Two-sided Student t quantiles for NUM_BATCHES - 1 degrees of freedom.
+T_QUANTILES = {0.9: 1.833, 0.95: 2.262, 0.99: 3.250}
+# Rates this close to zero count as converged however noisy they are, so a
+# protocol that never shows up doesn't keep the capture running.
+RATE_FLOOR = 0.1
+# A protocol carrying less than this share of the traffic is held to the
+# tolerance of that share of the total rate rather than of its own tiny
+# mean, or a trickle of ICMP would decide the capture length.
+MINOR_SHARE = 0.1
+STABILITY_WINDOW = 10
+# Port stability is judged on the top ports (what the baseline keeps) plus
+# an "other" bucket; over all ports a long random tail is pure noise.
+PORT_TOP_N = 20
+MIN_SECONDS = 20
+MAX_SECONDS = 600
+
+
+class ConvergenceMonitor:
+    # Decides when a baseline has seen enough traffic. Rates: batch-means
+    # confidence interval on the per-second count of each protocol (batch
+    # means because traffic is bursty and neighbouring seconds correlate),
+    # converged when the half-width is within tolerance of the mean. Ports:
+    # total variation distance between the top destination ports now and
+    # STABILITY_WINDOW seconds ago. observe() is called from the
+    # capture thread, check() from a watcher; only whole seconds are read.
+    def __init__(self, tolerance=0.1, port_tolerance=0.05, confidence=0.95,
+                 min_seconds=MIN_SECONDS, max_seconds=MAX_SECONDS, stability_window=STABILITY_WINDOW):
+        if confidence not in T_QUANTILES:
+            raise ValueError(f"confidence must be one of {sorted(T_QUANTILES)}")
+        if not 0 < min_seconds <= max_seconds:
+            raise ValueError("need 0 < min_seconds <= max_seconds")
+        self.tolerance = tolerance
+        self.port_tolerance = port_tolerance
+        self.confidence = confidence
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.stability_window = stability_window
+        self.start = None
+        self.seconds = {}
+        self.ports = {}
+        self.snapshots = deque()
+        self.checks = 0
+        self.last = None
+
+    def begin(self, now=None):
+        self.start = now if now is not None else time.time()
+
+    def observe(self, ts, proto, dport=0):
+        second = int(ts)
+        row = self.seconds.get(second)
+        if row is None:
+            row = self.seconds[second] = [0, 0, 0, 0]
+        row[0] += 1
+        column = COLUMN_OF.get(proto)
+        if column is not None:
+            row[column] += 1
+            if column != 3:
+                self.ports[dport] = self.ports.get(dport, 0) + 1
+
+    def observe_packet(self, pkt):
+        dport = 0
+        if pkt.haslayer(TCP):
+            dport = pkt[TCP].dport
+        elif pkt.haslayer(UDP):
+            dport = pkt[UDP].dport
+        self.observe(float(pkt.time), pkt[IP].proto, dport)
+
+    def counts(self, now):
+        # (seconds, 4) per-second counts for every completed second.
+        first, last = int(self.start) + 1, int(now)
+        empty = (0, 0, 0, 0)
+        return np.array([self.seconds.get(s, empty) for s in range(first, last)], dtype=np.float64).reshape(-1, 4)
+
+    def rate_intervals(self, counts):
+        batch = len(counts) // NUM_BATCHES
+        if batch == 0:
+            return None
+        means = counts[len(counts) - batch * NUM_BATCHES:].reshape(NUM_BATCHES, batch, 4).mean(axis=1)
+        half_width = T_QUANTILES[self.confidence] * means.std(axis=0, ddof=1) / math.sqrt(NUM_BATCHES)
+        mean = counts.mean(axis=0)
+        allowed = np.maximum(self.tolerance * np.maximum(mean, MINOR_SHARE * mean[0]), RATE_FLOOR)
+        return {
+            name: {
+                "mean_pps": round(float(mean[c]), 3),
+                "half_width": round(float(half_width[c]), 3),
+                "relative": round(float(half_width[c] / mean[c]), 4) if mean[c] else None,
+                "converged": bool(half_width[c] <= allowed[c]),
+            }
+            for name, c in PROTOCOL_COLUMNS.items()
+        }
+
+    def port_distance(self, now):
+        # None until there is a snapshot at least stability_window old.
+        ports = self.ports.copy()
+        self.snapshots.append((now, ports))
+        while len(self.snapshots) > 1 and self.snapshots[1][0] <= now - self.stability_window:
+            self.snapshots.popleft()
+        then, old = self.snapshots[0]
+        if then > now - self.stability_window:
+            return None
+        total_new, total_old = sum(ports.values()), sum(old.values())
+        if not total_new:
+            return 0.0
+        if not total_old:
+            return 1.0
+        counts = np.fromiter(ports.values(), dtype=np.float64, count=len(ports))
+        top = np.argsort(-counts, kind="stable")[:PORT_TOP_N]
+        keys = np.fromiter(ports, dtype=np.int64, count=len(ports))[top].tolist()
+        new = counts[top] / total_new
+        before = np.array([old.get(k, 0) for k in keys], dtype=np.float64) / total_old
+        other = abs(float(before.sum() - new.sum()))
+        return round(0.5 * (float(np.abs(new - before).sum()) + other), 5)
+
+    def check(self, now=None):
+        # "converged", "max_duration" or None (keep going).
+        now = now if now is not None else time.time()
+        elapsed = now - self.start
+        self.checks += 1
+        rates = self.rate_intervals(self.counts(now))
+        distance = self.port_distance(now)
+        converged = (rates is not None and all(r["converged"] for r in rates.values())
+                     and distance is not None and distance <= self.port_tolerance)
+        self.last = {"elapsed": elapsed, "rates": rates, "port_distance": distance, "converged": converged}
+        if converged and elapsed >= self.min_seconds:
+            return "converged"
+        if elapsed >= self.max_seconds:
+            return "max_duration"
+        return None
+
+    def summary(self, stop_reason):
+        last = self.last or {}
+        return {
+            "stop_reason": stop_reason,
+            "converged": bool(last.get("converged")),
+            "elapsed_seconds": round(last.get("elapsed", 0.0), 2),
+            "confidence": self.confidence,
+            "rate_tolerance": self.tolerance,
+            "port_tolerance": self.port_tolerance,
+            "min_seconds": self.min_seconds,
+            "max_seconds": self.max_seconds,
+            "rate_intervals": last.get("rates"),
+            "port_distance": last.get("port_distance"),
+            "checks": self.checks,
+        }
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from pcap_reader import ip_to_str, PROTO_TCP, PROTO_UDP, PROTO_ICMP, TCP_SYN, TCP_ACK
+
+# SOC rules from the report findings.
+PORT_SCAN_PORTS = 50
+PORT_SCAN_WINDOW = 10.0
+SYN_ACK_RATIO = 10.0
+SYN_MIN_COUNT = 20
+SYN_WINDOW = 5.0
+ICMP_RATE = 20
+ICMP_WINDOW = 1.0
+
+IDLE_TIMEOUT = 30.0
+MAX_SOURCES = 100000
+ALERT_COOLDOWN = 10.0
+# Most recent alerts kept in full; older ones only count in alert_counts.
+MAX_ALERTS = 1000
+
+
+class _SourceState:
+    __slots__ = ("last_seen", "port_events", "port_counts", "syn_events",
+                 "syns", "acks", "icmp_events", "cooldown")
+
+    def __init__(self):
+        self.last_seen = 0.0
+        self.port_events = deque()
+        self.port_counts = {}
+        self.syn_events = deque()
+        self.syns = 0
+        self.acks = 0
+        self.icmp_events = deque()
+        self.cooldown = {}
+
+
+class SlidingWindowDetector:
+    # Per-source sliding windows. Every event is appended once and expired
+    # once, so updates are O(1) amortized. Sources idle for IDLE_TIMEOUT are
+    # dropped and at most MAX_SOURCES are kept (least recently seen first).
+    # Alerts: the last max_alerts in full plus per-rule totals.
+    def __init__(self, on_alert=None, idle_timeout=IDLE_TIMEOUT, max_sources=MAX_SOURCES, max_alerts=MAX_ALERTS):
+        self.on_alert = on_alert
+        self.idle_timeout = idle_timeout
+        self.max_sources = max_sources
+        self.sources = OrderedDict()
+        self.alerts = deque(maxlen=max_alerts)
+        self.alert_counts = {}
+        self.alerts_total = 0
+        self.packets = 0
+        self.expired_sources = 0
+        self._next_sweep = 0.0
+
+    def observe(self, ts, src, proto, dport=0, flags=0):
+        self.packets += 1
+        sources = self.sources
+        state = sources.get(src)
+        if state is None:
+            state = sources[src] = _SourceState()
+            if len(sources) > self.max_sources:
+                sources.popitem(last=False)
+                self.expired_sources += 1
+        else:
+            sources.move_to_end(src)
+        state.last_seen = ts
+        if ts >= self._next_sweep:
+            self._sweep(ts)
+
+        if proto == PROTO_TCP or proto == PROTO_UDP:
+            self._observe_port(ts, src, state, dport)
+            if proto == PROTO_TCP:
+                self._observe_tcp(ts, src, state, flags)
+        elif proto == PROTO_ICMP:
+            self._observe_icmp(ts, src, state)
+
+    def _observe_port(self, ts, src, state, dport):
+        events = state.port_events
+        counts = state.port_counts
+        events.append((ts, dport))
+        counts[dport] = counts.get(dport, 0) + 1
+        horizon = ts - PORT_SCAN_WINDOW
+        while events[0][0] <= horizon:
+            _, old = events.popleft()
+            remaining = counts[old] - 1
+            if remaining:
+                counts[old] = remaining
+            else:
+                del counts[old]
+        if len(counts) > PORT_SCAN_PORTS:
+            self._alert(ts, src, state, "port_scan", len(counts), PORT_SCAN_PORTS,
+                        f"{len(counts)} unique destination ports in {PORT_SCAN_WINDOW:g}s")
+
+    def _observe_tcp(self, ts, src, state, flags):
+        is_syn = flags & TCP_SYN and not flags & TCP_ACK
+        is_ack = flags & TCP_ACK
+        if not (is_syn or is_ack):
+            return
+        events = state.syn_events
+        events.append((ts, bool(is_syn)))
+        if is_syn:
+            state.syns += 1
+        else:
+            state.acks += 1
+        horizon = ts - SYN_WINDOW
+        while events[0][0] <= horizon:
+            _, was_syn = events.popleft()
+            if was_syn:
+                state.syns -= 1
+            else:
+                state.acks -= 1
+        if is_syn and state.syns >= SYN_MIN_COUNT and state.syns > SYN_ACK_RATIO * max(state.acks, 1):
+            self._alert(ts, src, state, "syn_flood", state.syns, SYN_ACK_RATIO,
+                        f"{state.syns} SYN vs {state.acks} ACK in {SYN_WINDOW:g}s")
+
+    def _observe_icmp(self, ts, src, state):
+        events = state.icmp_events
+        events.append(ts)
+        horizon = ts - ICMP_WINDOW
+        while events[0] <= horizon:
+            events.popleft()
+        if len(events) > ICMP_RATE:
+            self._alert(ts, src, state, "icmp_flood", len(events), ICMP_RATE,
+                        f"{len(events)} ICMP packets in {ICMP_WINDOW:g}s")
+
+    def _alert(self, ts, src, state, rule, value, threshold, detail):
+        if ts < state.cooldown.get(rule, 0.0):
+            return
+        state.cooldown[rule] = ts + ALERT_COOLDOWN
+        alert = {
+            "time": datetime.fromtimestamp(ts).isoformat(),
+            "ts": ts,
+            "rule": rule,
+            "source": ip_to_str(src) if isinstance(src, int) else src,
+            "value": value,
+            "threshold": threshold,
+            "detail": detail,
+        }
+        self.alerts.append(alert)
+        self.alert_counts[rule] = self.alert_counts.get(rule, 0) + 1
+        self.alerts_total += 1
+        if self.on_alert is not None:
+            self.on_alert(alert)
+
+    def _sweep(self, now):
+        horizon = now - self.idle_timeout
+        sources = self.sources
+        while sources:
+            src, state = next(iter(sources.items()))
+            if state.last_seen > horizon:
+                break
+            del sources[src]
+            self.expired_sources += 1
+        self._next_sweep = now + 1.0
+
+    def observe_packet(self, pkt):
+        from scapy.all import IP, TCP, UDP
+        ip = pkt[IP]
+        dport = flags = 0
+        if pkt.haslayer(TCP):
+            dport, flags = pkt[TCP].dport, int(pkt[TCP].flags)
+        elif pkt.haslayer(UDP):
+            dport = pkt[UDP].dport
+        self.observe(float(pkt.time), ip.src, ip.proto, dport, flags)
+
+    def summary(self):
+        return {
+            "alerts": list(self.alerts),
+            "alert_counts": dict(self.alert_counts),
+            "alerts_total": self.alerts_total,
+            "alerts_dropped": self.alerts_total - len(self.alerts),
+            "tracked_sources": len(self.sources),
+            "expired_sources": self.expired_sources,
+        }
+
+
+def print_alert(alert):
+    print(f"[!] ALERT {alert['rule'].upper()} from {alert['source']} — {alert['detail']} at {alert['time'][11:19]}")
+
+
+def detect_pcap(paths, on_alert=None):
+    from pcap_reader import iter_packets
+    if isinstance(paths, str):
+        paths = [paths]
+    detector = SlidingWindowDetector(on_alert=on_alert)
+    for path in paths:
+        for ts, wirelen, src, dst, proto, sport, dport, flags in iter_packets(path):
+            detector.observe(ts, src, proto, dport, flags)
+    return detector
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("usage: detector.py <capture.pcap> [more.pcap ...]")
+        sys.exit(1)
+    result = detect_pcap(sys.argv[1:], on_alert=print_alert)
+    print(f"[✓] {result.packets} packets, {result.alerts_total} alerts")
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import math
+import os
+from datetime import datetime
+
+import numpy as np
+
+from feature_store import load_features
+from pcap_reader import PROTO_TCP, PROTO_UDP, PROTO_ICMP
+from segmentation import attack_windows, segment_masks, BACKGROUND
+
+WINDOW_SECONDS = 10.0
+PORT_CATEGORIES = 32
+SMOOTHING = 0.5
+Z_THRESHOLD = 3.0
+TOP_WINDOWS = 10
+# Windows the capture covers for less than this share of WINDOW_SECONDS
+# (the tail of an adaptive or scenario capture) are left out; the rest
+# have their packet counts scaled to a full window.
+MIN_COVERAGE = 0.5
+# z-scores divide by max(std, SIGMA_RELATIVE * |mean| + SIGMA_ABSOLUTE):
+# a metric that never moved in the baseline still gets a finite scale.
+SIGMA_RELATIVE = 0.05
+SIGMA_ABSOLUTE = 0.01
+PROTO_CATEGORIES = (PROTO_TCP, PROTO_UDP, PROTO_ICMP)
+METRICS = (
+    "packets", "tcp", "udp", "icmp",
+    "src_entropy", "dst_entropy", "dport_entropy",
+    "port_kl", "port_chi2", "proto_kl", "proto_chi2",
+)
+
+
+def _start(stats, features):
+    if stats.get("start_time"):
+        start = datetime.fromisoformat(stats["start_time"]).timestamp()
+        return min(start, float(features["ts"].min())) if len(features) else start
+    return float(features["ts"].min()) if len(features) else 0.0
+
+
+def _end(stats, features):
+    end = float(features["ts"].max()) if len(features) else None
+    if stats.get("end_time"):
+        stated = datetime.fromisoformat(stats["end_time"]).timestamp()
+        end = stated if end is None else max(end, stated)
+    return end
+
+
+def window_index(ts, start, window, end=None):
+    # (index per packet, number of windows). Empty windows in between
+    # count, and so do those up to end when it is given.
+    index = np.floor((np.asarray(ts, dtype=np.float64) - start) / window).astype(np.int64)
+    n = int(index.max()) + 1 if len(index) else 1
+    if end is not None:
+        n = max(n, int(math.ceil((end - start) / window)))
+    return index, max(n, 1)
+
+
+def coverage(start, end, window, n):
+    # Share of each window inside [start, end]; all 1 without an end.
+    if end is None:
+        return np.ones(n)
+    return np.clip((end - start - np.arange(n) * window) / window, 0.0, 1.0)
+
+
+def entropy_by_window(win, values, n):
+    # Shannon entropy (bits) of values within each window, from one unique
+    # over (window, value) pairs. Windows without packets get 0.
+    if len(win) == 0:
+        return np.zeros(n)
+    pairs, counts = np.unique(win.astype(np.int64) << 32 | values.astype(np.int64), return_counts=True)
+    w = pairs >> 32
+    totals = np.bincount(w, weights=counts, minlength=n)
+    p = counts / totals[w]
+    return -np.bincount(w, weights=p * np.log2(p), minlength=n)
+
+
+def category_counts(win, categories, n, k):
+    return np.bincount(win * k + categories, minlength=n * k).reshape(n, k)
+
+
+def divergences(counts, q):
+    # KL(window || baseline) in bits and Pearson chi-square against the
+    # baseline proportions, per row. Windows with no packets score 0.
+    k = counts.shape[1]
+    n_w = counts.sum(axis=1, keepdims=True).astype(np.float64)
+    p = (counts + SMOOTHING) / (n_w + SMOOTHING * k)
+    kl = (p * np.log2(p / q)).sum(axis=1)
+    expected = n_w * q
+    chi2 = ((counts - expected) ** 2 / np.where(expected > 0, expected, 1)).sum(axis=1)
+    empty = n_w[:, 0] == 0
+    return np.where(empty, 0.0, kl), np.where(empty, 0.0, chi2)
+
+
+def smoothed(counts):
+    counts = np.asarray(counts, dtype=np.float64) + SMOOTHING
+    return counts / counts.sum()
+
+
+def port_categories(dport, keys):
+    # Index into keys for the baseline's top ports, len(keys) for the rest.
+    if len(keys) == 0:
+        return np.zeros(len(dport), dtype=np.int64)
+    pos = np.clip(np.searchsorted(keys, dport), 0, len(keys) - 1)
+    return np.where(keys[pos] == dport, pos, len(keys))
+
+
+def proto_categories(proto):
+    cats = np.full(len(proto), len(PROTO_CATEGORIES), dtype=np.int64)
+    for i, number in enumerate(PROTO_CATEGORIES):
+        cats[proto == number] = i
+    return cats
+
+
+class Reference:
+    # What windows are compared against: the baseline's top destination
+    # ports and protocol mix (smoothed), plus each metric's mean/std over
+    # the baseline's own windows.
+    def __init__(self, features, start, window=WINDOW_SECONDS, end=None):
+        proto = np.asarray(features["proto"])
+        dport = np.asarray(features["dport"], dtype=np.int64)
+        l4 = (proto == PROTO_TCP) | (proto == PROTO_UDP)
+        ports, counts = np.unique(dport[l4], return_counts=True)
+        top = np.argsort(-counts, kind="stable")[:PORT_CATEGORIES]
+        self.port_keys = np.sort(ports[top])
+        self.port_q = smoothed(np.bincount(port_categories(dport[l4], self.port_keys),
+                                           minlength=len(self.port_keys) + 1))
+        self.proto_q = smoothed(np.bincount(proto_categories(proto), minlength=len(PROTO_CATEGORIES) + 1))
+        self.window = window
+        metrics = window_metrics(features, start, self, window, end)
+        full = metrics["coverage"] >= MIN_COVERAGE
+        if not full.any():
+            full[:] = True
+        metrics = {m: metrics[m][full] for m in METRICS}
+        self.windows = int(full.sum())
+        self.mean = {m: float(metrics[m].mean()) for m in METRICS}
+        self.std = {m: float(metrics[m].std(ddof=1)) if self.windows > 1 else 0.0 for m in METRICS}
+        # Never tighter than the metric's null distribution, so a short
+        # baseline with few windows can't make ordinary noise look
+        # anomalous: Poisson for counts, chi-square(k-1) for chi2.
+        for m in ("packets", "tcp", "udp", "icmp"):
+            self.std[m] = max(self.std[m], math.sqrt(self.mean[m]))
+        for m, df in (("port_chi2", len(self.port_keys)), ("proto_chi2", len(PROTO_CATEGORIES))):
+            self.mean[m] = max(self.mean[m], float(df))
+            self.std[m] = max(self.std[m], math.sqrt(2 * df))
+
+    def sigma(self, metric):
+        return max(self.std[metric], SIGMA_RELATIVE * abs(self.mean[metric]) + SIGMA_ABSOLUTE)
+
+
+def window_metrics(features, start, reference, window=WINDOW_SECONDS, end=None):
+    # Every metric for every window of one capture, as arrays of length
+    # n_windows, plus each window's coverage. Count metrics are per full
+    # window. No Python loop over windows or packets.
+    ts = np.asarray(features["ts"], dtype=np.float64)
+    win, n = window_index(ts, start, window, end)
+    keep = win >= 0
+    win = win[keep]
+    proto = np.asarray(features["proto"])[keep]
+    dport = np.asarray(features["dport"], dtype=np.int64)[keep]
+    l4 = (proto == PROTO_TCP) | (proto == PROTO_UDP)
+    metrics = {
+        "packets": np.bincount(win, minlength=n).astype(np.float64),
+        "tcp": np.bincount(win[proto == PROTO_TCP], minlength=n).astype(np.float64),
+        "udp": np.bincount(win[proto == PROTO_UDP], minlength=n).astype(np.float64),
+        "icmp": np.bincount(win[proto == PROTO_ICMP], minlength=n).astype(np.float64),
+        "src_entropy": entropy_by_window(win, np.asarray(features["src"])[keep], n),
+        "dst_entropy": entropy_by_window(win, np.asarray(features["dst"])[keep], n),
+        "dport_entropy": entropy_by_window(win[l4], dport[l4], n),
+    }
+    k = len(reference.port_keys) + 1
+    ports = category_counts(win[l4], port_categories(dport[l4], reference.port_keys), n, k)
+    metrics["port_kl"], metrics["port_chi2"] = divergences(ports, reference.port_q)
+    protos = category_counts(win, proto_categories(proto), n, len(PROTO_CATEGORIES) + 1)
+    metrics["proto_kl"], metrics["proto_chi2"] = divergences(protos, reference.proto_q)
+    metrics["coverage"] = coverage(start, end, window, n)
+    scale = 1.0 / np.maximum(metrics["coverage"], MIN_COVERAGE)
+    for m in ("packets", "tcp", "udp", "icmp"):
+        metrics[m] = metrics[m] * scale
+    return metrics
+
+
+def zscores(metrics, reference):
+    return {m: (metrics[m] - reference.mean[m]) / reference.sigma(m) for m in METRICS}
+
+
+def window_deviation(baseline, attack, window=WINDOW_SECONDS, top_n=TOP_WINDOWS, z_threshold=Z_THRESHOLD):
+    # Ranked windows of the attack capture by how far their worst metric
+    # sits from the baseline's windows. None without both feature sidecars.
+    paths = [s.get("features_file") if s else None for s in (baseline, attack)]
+    if not all(p and os.path.exists(p) for p in paths):
+        return None
+    base_features, attack_features = load_features(paths[0]), load_features(paths[1])
+    if not len(base_features) or not len(attack_features):
+        return None
+    reference = Reference(base_features, _start(baseline, base_features), window, _end(baseline, base_features))
+    start = _start(attack, attack_features)
+    metrics = window_metrics(attack_features, start, reference, window, _end(attack, attack_features))
+    z = zscores(metrics, reference)
+    matrix = np.abs(np.vstack([z[m] for m in METRICS]))
+    # Windows mostly outside the capture aren't scored.
+    matrix[:, metrics["coverage"] < MIN_COVERAGE] = 0.0
+    score = matrix.max(axis=0)
+    worst = matrix.argmax(axis=0)
+    scored = np.flatnonzero(metrics["coverage"] >= MIN_COVERAGE)
+    order = scored[np.argsort(-score[scored], kind="stable")][:top_n]
+
+    labels = np.full(len(score), BACKGROUND, dtype=object)
+    if attack.get("attacks_performed"):
+        attacks, starts, ends = attack_windows(attack["attacks_performed"])
+        middle = start + (np.arange(len(score)) + 0.5) * window
+        masks = segment_masks(middle, starts, ends)
+        names = [a.get("type", "attack") for a in attacks]
+        for i in np.flatnonzero(~masks[-1]):
+            # Overlapping attacks share the window: "syn_flood+icmp_flood".
+            labels[i] = "+".join(name for name, inside in zip(names, masks[:-1, i]) if inside)
+
+    ranked = []
+    for i in order:
+        top_metrics = np.argsort(-matrix[:, i], kind="stable")[:3]
+        ranked.append({
+            "window": int(i),
+            "offset_s": round(float(i * window), 3),
+            "start_time": datetime.fromtimestamp(start + i * window).isoformat(),
+            "label": labels[i],
+            "packets": int(metrics["packets"][i]),
+            "score": round(float(score[i]), 2),
+            "worst_metric": METRICS[worst[i]],
+            "top": {METRICS[m]: {"value": round(float(metrics[METRICS[m]][i]), 4),
+                                 "baseline_mean": round(reference.mean[METRICS[m]], 4),
+                                 "z": round(float(z[METRICS[m]][i]), 2)} for m in top_metrics},
+        })
+    return {
+        "window_seconds": window,
+        "baseline_windows": reference.windows,
+        "attack_windows": len(scored),
+        "z_threshold": z_threshold,
+        "anomalous_windows": int(np.count_nonzero(score > z_threshold)),
+        "baseline_top_ports": reference.port_keys.tolist(),
+        "ranked_windows": ranked,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank attack-capture windows by deviation from the baseline")
+    parser.add_argument("baseline_json")
+    parser.add_argument("attack_json")
+    parser.add_argument("-w", "--window", type=float, default=WINDOW_SECONDS)
+    parser.add_argument("-n", "--top", type=int, default=TOP_WINDOWS)
+    args = parser.parse_args()
+
+    with open(args.baseline_json) as f:
+        baseline = json.load(f)
+    with open(args.attack_json) as f:
+        attack = json.load(f)
+    result = window_deviation(baseline, attack, args.window, args.top)
+    if result is None:
+        print("[!] Both stats JSONs need a features_file")
+    else:
+        print(f"[✓] {result['anomalous_windows']}/{result['attack_windows']} windows of {args.window}s "
+              f"beyond {Z_THRESHOLD}σ (baseline: {result['baseline_windows']} windows)")
+        for w in result["ranked_windows"]:
+            print(f"    +{w['offset_s']:>7}s  {w['label']:<16} score {w['score']:>9}  "
+                  f"{w['worst_metric']:<14} {w['packets']:>8} pkts")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+import os
+import socket
+import struct
+import sys
+
+import numpy as np
+
+from pcap_reader import iter_records, decode_ipv4, ip_to_str, PROTO_TCP, PROTO_UDP, PROTO_ICMP
+
+# One row per IPv4 packet, packed (26 bytes) so rows can be appended with
+# struct and read back with np.load(mmap_mode="r") without conversion.
+FEATURE_DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("src", "<u4"),
+    ("dst", "<u4"),
+    ("proto", "u1"),
+    ("sport", "<u2"),
+    ("dport", "<u2"),
+    ("flags", "u1"),
+    ("length", "<u4"),
+])
+_ROW = struct.Struct("<dIIBHHBI")
+NPY_HEADER_LEN = 256
+FLUSH_BYTES = 1 << 20
+
+
+def npy_header(rows, dtype=FEATURE_DTYPE):
+    descr = np.lib.format.dtype_to_descr(np.dtype(dtype))
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (descr, rows)
+    header = header.ljust(NPY_HEADER_LEN - 10 - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class FeatureWriter:
+    # Streams feature rows into a .npy file. The header is a fixed-size
+    # placeholder rewritten with the final row count on close().
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._buf = bytearray()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fh = open(path, "wb")
+        self._fh.write(npy_header(0))
+
+    def append(self, ts, length, src, dst, proto, sport, dport, flags):
+        self._buf += _ROW.pack(ts, src, dst, proto, sport, dport, flags, length)
+        self.rows += 1
+        if len(self._buf) >= FLUSH_BYTES:
+            self.flush()
+
+    def append_packet(self, pkt):
+        # Non-first fragments get proto 0, as pcap_reader.decode_ipv4 gives
+        # them, so live and offline feature tables count them alike.
+        from scapy.all import IP, TCP, UDP
+        ip = pkt[IP]
+        sport = dport = flags = 0
+        if pkt.haslayer(TCP):
+            tcp = pkt[TCP]
+            sport, dport, flags = tcp.sport, tcp.dport, int(tcp.flags)
+        elif pkt.haslayer(UDP):
+            sport, dport = pkt[UDP].sport, pkt[UDP].dport
+        self.append(
+            float(pkt.time),
+            getattr(pkt, "wirelen", None) or len(pkt) - len(ip) + ip.len,
+            struct.unpack("!I", socket.inet_aton(ip.src))[0],
+            struct.unpack("!I", socket.inet_aton(ip.dst))[0],
+            0 if ip.frag else ip.proto, sport, dport, flags
+        )
+
+    def flush(self):
+        if self._buf:
+            self._fh.write(self._buf)
+            self._buf = bytearray()
+
+    def close(self):
+        if self._fh is None:
+            return self.path
+        self.flush()
+        self._fh.seek(0)
+        self._fh.write(npy_header(self.rows))
+        self._fh.close()
+        self._fh = None
+        return self.path
+
+
+def features_from_pcap(paths, out_path=None):
+    if isinstance(paths, str):
+        paths = [paths]
+    if out_path is None:
+        out_path = os.path.splitext(paths[0])[0] + "_features.npy"
+    writer = FeatureWriter(out_path)
+    for path in paths:
+        for ts, caplen, wirelen, data, mm, linktype in iter_records(path):
+            fields = decode_ipv4(mm, data, caplen, linktype)
+            if fields is not None:
+                src, dst, proto, sport, dport, flags = fields
+                writer.append(ts, wirelen, src, dst, proto, sport, dport, flags)
+    return writer.close()
+
+
+def load_features(path, mmap=True):
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+def merge_features(paths, out_path):
+    # One sidecar for several concurrent captures, rows in time order.
+    features = np.concatenate([load_features(path) for path in paths])
+    features = features[np.argsort(features["ts"], kind="stable")]
+    np.save(out_path, features)
+    return out_path
+
+
+def port_frequency(features, top_n=None):
+    dports = features["dport"][features["proto"] == PROTO_TCP]
+    ports, counts = np.unique(dports, return_counts=True)
+    order = np.argsort(-counts, kind="stable")
+    if top_n is not None:
+        order = order[:top_n]
+    return {int(ports[i]): int(counts[i]) for i in order}
+
+
+def stats_from_features(features, top_n=20, ip_lists=True):
+    # ip_lists=False leaves out unique_*_ips (the counts stay), for runs
+    # whose output is meant to stay sketch-sized.
+    # timeseries imports this module, hence the late import.
+    from timeseries import packets_per_second
+    proto = features["proto"]
+    src = np.unique(features["src"])
+    dst = np.unique(features["dst"])
+    stats = {
+        "total_packets": int(len(features)),
+        "tcp_packets": int(np.count_nonzero(proto == PROTO_TCP)),
+        "udp_packets": int(np.count_nonzero(proto == PROTO_UDP)),
+        "icmp_packets": int(np.count_nonzero(proto == PROTO_ICMP)),
+        "unique_src_count": int(len(src)),
+        "unique_dst_count": int(len(dst)),
+        "port_frequency": port_frequency(features, top_n),
+        "packets_per_second": packets_per_second(features["ts"]),
+    }
+    if ip_lists:
+        stats["unique_src_ips"] = [ip_to_str(int(a)) for a in src]
+        stats["unique_dst_ips"] = [ip_to_str(int(a)) for a in dst]
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: feature_store.py <capture.pcap> [more.pcap ...]")
+        sys.exit(1)
+    out = features_from_pcap(sys.argv[1:])
+    print(f"[✓] Saved: {out} ({len(load_features(out))} rows)")
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import socket
+import struct
+from array import array
+
+import numpy as np
+
+from feature_store import npy_header
+from pcap_reader import iter_packets, ip_to_str, TCP_SYN, TCP_ACK
+
+IDLE_TIMEOUT = 15.0
+ACTIVE_TIMEOUT = 1800.0
+DEFAULT_CAPACITY = 1_000_000
+SWEEP_INTERVAL = 1.0
+EVICT_FRACTION = 0.01
+
+# (column, numpy dtype, array typecode). The key columns come first.
+FLOW_COLUMNS = (
+    ("src", "<u4", "I"),
+    ("dst", "<u4", "I"),
+    ("sport", "<u2", "H"),
+    ("dport", "<u2", "H"),
+    ("proto", "u1", "B"),
+    ("first_seen", "<f8", "d"),
+    ("last_seen", "<f8", "d"),
+    ("packets", "<u4", "I"),
+    ("bytes", "<u8", "Q"),
+    ("flags", "u1", "B"),
+)
+END_REASONS = {"idle": 0, "active": 1, "evicted": 2, "end": 3}
+
+
+def flow_key(src, dst, sport, dport, proto):
+    return (src << 72) | (dst << 40) | (sport << 24) | (dport << 8) | proto
+
+
+class FlowWriter:
+    # Columnar export: one .npy per column in a directory, appended batch
+    # by batch; headers carry a placeholder row count until close().
+    def __init__(self, directory):
+        self.directory = directory
+        self.rows = 0
+        os.makedirs(directory, exist_ok=True)
+        self.columns = [(name, dtype) for name, dtype, _ in FLOW_COLUMNS] + [("end_reason", "u1")]
+        self._files = {}
+        for name, dtype in self.columns:
+            fh = open(os.path.join(directory, f"{name}.npy"), "wb")
+            fh.write(npy_header(0, dtype))
+            self._files[name] = fh
+
+    def write_batch(self, batch):
+        for name, dtype in self.columns:
+            self._files[name].write(np.ascontiguousarray(batch[name], dtype=dtype).tobytes())
+        self.rows += len(batch["end_reason"])
+
+    def close(self):
+        for name, dtype in self.columns:
+            fh = self._files[name]
+            fh.seek(0)
+            fh.write(npy_header(self.rows, dtype))
+            fh.close()
+        self._files = {}
+        return self.directory
+
+
+def load_flows(directory, mmap=True):
+    flows = {}
+    for name in os.listdir(directory):
+        if name.endswith(".npy"):
+            flows[name[:-4]] = np.load(os.path.join(directory, name), mmap_mode="r" if mmap else None)
+    return flows
+
+
+class FlowTable:
+    # Flows keyed by 5-tuple in preallocated column arrays: a dict maps the
+    # packed key to a slot, so a packet costs one lookup and a few scalar
+    # stores. Memory is bounded by capacity; when it is full the least
+    # recently seen EVICT_FRACTION of flows is exported early. Expiry sweeps
+    # run on numpy views over the same buffers.
+    def __init__(self, capacity=DEFAULT_CAPACITY, idle_timeout=IDLE_TIMEOUT,
+                 active_timeout=ACTIVE_TIMEOUT, writer=None, sweep_interval=SWEEP_INTERVAL):
+        self.capacity = capacity
+        self.idle_timeout = idle_timeout
+        self.active_timeout = active_timeout
+        self.writer = writer
+        self.sweep_interval = sweep_interval
+        self.cols = {name: array(code, bytes(np.dtype(dtype).itemsize * capacity))
+                     for name, dtype, code in FLOW_COLUMNS}
+        self.views = {name: np.frombuffer(self.cols[name], dtype=dtype)
+                      for name, dtype, _ in FLOW_COLUMNS}
+        self.index = {}
+        self.free = list(range(capacity - 1, -1, -1))
+        self.next_sweep = None
+        self.exported = 0
+        self.exported_by_reason = dict.fromkeys(END_REASONS, 0)
+        self.half_open_exported = 0
+
+    def add(self, ts, length, src, dst, proto, sport=0, dport=0, flags=0):
+        key = (src << 72) | (dst << 40) | (sport << 24) | (dport << 8) | proto
+        cols = self.cols
+        slot = self.index.get(key)
+        if slot is None:
+            if not self.free:
+                self._make_room(ts)
+            slot = self.free.pop()
+            self.index[key] = slot
+            cols["src"][slot] = src
+            cols["dst"][slot] = dst
+            cols["sport"][slot] = sport
+            cols["dport"][slot] = dport
+            cols["proto"][slot] = proto
+            cols["first_seen"][slot] = ts
+            cols["bytes"][slot] = 0
+            cols["flags"][slot] = 0
+        cols["last_seen"][slot] = ts
+        cols["packets"][slot] += 1
+        cols["bytes"][slot] += length
+        cols["flags"][slot] |= flags
+        if self.next_sweep is None:
+            self.next_sweep = ts + self.sweep_interval
+        elif ts >= self.next_sweep:
+            self.sweep(ts)
+
+    def add_packet(self, pkt):
+        from scapy.all import IP, TCP, UDP
+        ip = pkt[IP]
+        sport = dport = flags = 0
+        if pkt.haslayer(TCP):
+            tcp = pkt[TCP]
+            sport, dport, flags = tcp.sport, tcp.dport, int(tcp.flags)
+        elif pkt.haslayer(UDP):
+            sport, dport = pkt[UDP].sport, pkt[UDP].dport
+        self.add(float(pkt.time), getattr(pkt, "wirelen", None) or len(pkt),
+                 struct.unpack("!I", socket.inet_aton(ip.src))[0],
+                 struct.unpack("!I", socket.inet_aton(ip.dst))[0],
+                 ip.proto, sport, dport, flags)
+
+    def _occupied(self):
+        return self.views["packets"] > 0
+
+    def sweep(self, now):
+        v = self.views
+        occupied = self._occupied()
+        idle = occupied & (now - v["last_seen"] > self.idle_timeout)
+        active = occupied & ~idle & (now - v["first_seen"] > self.active_timeout)
+        self._export(np.flatnonzero(idle), "idle")
+        self._export(np.flatnonzero(active), "active")
+        self.next_sweep = now + self.sweep_interval
+
+    def _make_room(self, now):
+        self.sweep(now)
+        if self.free:
+            return
+        count = max(1, int(self.capacity * EVICT_FRACTION))
+        slots = np.argpartition(self.views["last_seen"], count - 1)[:count]
+        self._export(slots, "evicted")
+
+    def _export(self, slots, reason):
+        if len(slots) == 0:
+            return
+        v = self.views
+        batch = {name: v[name][slots].copy() for name, _, _ in FLOW_COLUMNS}
+        batch["end_reason"] = np.full(len(slots), END_REASONS[reason], dtype=np.uint8)
+        if self.writer is not None:
+            self.writer.write_batch(batch)
+        self.half_open_exported += int(np.count_nonzero(
+            (batch["flags"] & (TCP_SYN | TCP_ACK)) == TCP_SYN))
+        index = self.index
+        for src, dst, sport, dport, proto in zip(batch["src"].tolist(), batch["dst"].tolist(),
+                                                 batch["sport"].tolist(), batch["dport"].tolist(),
+                                                 batch["proto"].tolist()):
+            del index[flow_key(src, dst, sport, dport, proto)]
+        v["packets"][slots] = 0
+        self.free.extend(slots.tolist())
+        self.exported += len(slots)
+        self.exported_by_reason[reason] += len(slots)
+
+    def active_flows(self):
+        return len(self.index)
+
+    def memory_bytes(self):
+        return sum(c.itemsize * len(c) for c in self.cols.values())
+
+    def close(self):
+        # Exports every remaining flow with reason "end".
+        self._export(np.flatnonzero(self._occupied()), "end")
+        if self.writer is not None:
+            self.writer.close()
+        return self.summary()
+
+    def summary(self):
+        return {
+            "flows_dir": self.writer.directory if self.writer is not None else None,
+            "exported_flows": self.exported,
+            "exported_by_reason": dict(self.exported_by_reason),
+            "active_flows": self.active_flows(),
+            "half_open_flows": self.half_open_exported,
+            "capacity": self.capacity,
+            "column_bytes": self.memory_bytes(),
+            "idle_timeout": self.idle_timeout,
+            "active_timeout": self.active_timeout,
+        }
+
+
+def flows_from_pcap(paths, out_dir, capacity=DEFAULT_CAPACITY):
+    if isinstance(paths, str):
+        paths = [paths]
+    table = FlowTable(capacity, writer=FlowWriter(out_dir))
+    add = table.add
+    for path in paths:
+        for ts, wirelen, src, dst, proto, sport, dport, flags in iter_packets(path):
+            add(ts, wirelen, src, dst, proto, sport, dport, flags)
+    return table.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate pcap packets into 5-tuple flows (columnar export)")
+    parser.add_argument("pcaps", nargs="+")
+    parser.add_argument("-o", "--output", help="flow directory (default: <first pcap>_flows)")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY)
+    args = parser.parse_args()
+
+    out_dir = args.output or os.path.splitext(args.pcaps[0])[0] + "_flows"
+    summary = flows_from_pcap(args.pcaps, out_dir, args.capacity)
+    print(f"[✓] {summary['exported_flows']} flows ({summary['half_open_flows']} half-open SYN-only) -> {out_dir}")
+    flows = load_flows(out_dir)
+    if len(flows["packets"]):
+        order = np.argsort(-flows["packets"].astype(np.int64))[:10]
+        for i in order:
+            print(f"    {ip_to_str(int(flows['src'][i]))}:{flows['sport'][i]} -> "
+                  f"{ip_to_str(int(flows['dst'][i]))}:{flows['dport'][i]} proto {flows['proto'][i]}  "
+                  f"{flows['packets'][i]} pkts {flows['bytes'][i]} bytes")
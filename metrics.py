@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+import argparse
+import bisect
+import contextlib
+import json
+import os
+import resource
+import threading
+import time
+
+PREFIX = "netbaseline_"
+METRICS_DIR = "../captures/metrics"
+SNAPSHOT_INTERVAL = 10.0
+# Handler latency: one call in SAMPLE_EVERY is timed. Almost all of the
+# wrapper's cost is the ~100-250 ns every call pays, not the timing of
+# the sampled ones, so sampling less often wouldn't lower it; the cost is
+# measured and reported instead, and flagged past OVERHEAD_BUDGET of the
+# handler's mean time.
+SAMPLE_EVERY = 64
+OVERHEAD_BUDGET = 0.02
+CALIBRATION_CALLS = 20000
+# 1 us to 1 s, six buckets per decade.
+LATENCY_BUCKETS = tuple(float(f"{m}e{e}") for e in range(-6, 0) for m in (1, 1.5, 2, 3, 5, 7)) + (1.0,)
+PERCENTILES = (50, 90, 99)
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def resident_bytes():
+    # Current RSS from /proc (Linux); the peak when that isn't available.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return peak_resident_bytes()
+
+
+def peak_resident_bytes():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Histogram:
+    # Fixed buckets, Prometheus style (each bucket counts values <= le).
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, p):
+        # Linear interpolation inside the bucket holding the p-th value.
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = self.buckets[i - 1] if i else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": self.sum / self.count if self.count else None,
+            **{f"p{p}": self.percentile(p) for p in PERCENTILES},
+        }
+
+
+class SampledTimer:
+    # Wraps a per-packet function; wrap() returns the function to install.
+    # Unsampled calls cost one increment and one comparison on top of the
+    # call itself; every `every`-th call is timed into the histogram.
+    # calibrate() measures what the wrapper adds per call (amortised over
+    # the sampled ones), so overhead() can report it against the handler's
+    # measured mean.
+    def __init__(self, every=SAMPLE_EVERY, budget=OVERHEAD_BUDGET):
+        self.every = every
+        self.budget = budget
+        self.histogram = Histogram()
+        self.cost = None
+        self.calls = lambda: 0
+
+    def wrap(self, fn):
+        perf = time.perf_counter
+        n = 0
+        due = self.every
+
+        def timed(*args):
+            nonlocal n, due
+            n += 1
+            if n < due:
+                return fn(*args)
+            start = perf()
+            result = fn(*args)
+            self.histogram.observe(perf() - start)
+            due = n + self.every
+            return result
+
+        self.calls = lambda: n
+        return timed
+
+    def calibrate(self, calls=CALIBRATION_CALLS):
+        def noop(*args):
+            return None
+        probe = SampledTimer(self.every)
+        timed = probe.wrap(noop)
+        perf = time.perf_counter
+        start = perf()
+        for _ in range(calls):
+            noop(None)
+        bare = perf() - start
+        start = perf()
+        for _ in range(calls):
+            timed(None)
+        wrapped = perf() - start
+        self.cost = max(wrapped - bare, 0.0) / calls
+        return self.cost
+
+    def overhead(self):
+        # Wrapper cost per call over the mean handler time.
+        mean = self.histogram.sum / self.histogram.count if self.histogram.count else None
+        if self.cost is None or not mean:
+            return None
+        return self.cost / mean
+
+    def over_budget(self):
+        ratio = self.overhead()
+        return ratio is not None and ratio > self.budget
+
+
+class Registry:
+    # Counters and gauges keyed by (name, labels). Gauges may be callables,
+    # read at export time, so the hot path never touches the registry;
+    # const_labels go on every sample (kind, interface, ...).
+    def __init__(self, **const_labels):
+        self.const_labels = const_labels
+        self.help = {}
+        self.types = {}
+        self.values = {}
+        self.timers = {}
+        self.lock = threading.Lock()
+        self.created = time.time()
+
+    def _declare(self, name, kind, help_text):
+        self.types.setdefault(name, kind)
+        if help_text:
+            self.help.setdefault(name, help_text)
+
+    def inc(self, name, value=1, help_text="", **labels):
+        self._declare(name, "counter", help_text)
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def gauge(self, name, value, help_text="", kind="gauge", **labels):
+        # value: a number or a zero-argument callable. kind="counter" for
+        # totals kept elsewhere (kernel counters, packet counts).
+        self._declare(name, kind, help_text)
+        with self.lock:
+            self.values[(name, tuple(sorted(labels.items())))] = value
+
+    def sampled(self, name, fn, help_text="", **labels):
+        # Installs a SampledTimer around fn; returns the wrapped function.
+        timer = SampledTimer()
+        timer.calibrate()
+        self._declare(name, "histogram", help_text)
+        self.timers[(name, tuple(sorted(labels.items())))] = timer
+        return timer.wrap(fn)
+
+    def record_stage(self, name, seconds):
+        self.gauge(f"{PREFIX}stage_seconds", round(seconds, 6), "Duration of the last run of each stage.", stage=name)
+        self.inc(f"{PREFIX}stage_runs_total", 1, "Completed runs of each stage.", stage=name)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        # Wall time of one pipeline stage: last duration and run count.
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    def stages(self):
+        with self.lock:
+            return {dict(labels)["stage"]: value for (name, labels), value in self.values.items()
+                    if name == f"{PREFIX}stage_seconds"}
+
+    def _samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        samples = []
+        for (name, labels), value in items:
+            if callable(value):
+                try:
+                    value = value()
+                except (OSError, ValueError):
+                    continue
+            if value is not None:
+                samples.append((name, dict(labels), value))
+        samples.append((f"{PREFIX}resident_memory_bytes", {}, resident_bytes()))
+        samples.append((f"{PREFIX}peak_resident_memory_bytes", {}, peak_resident_bytes()))
+        samples.append((f"{PREFIX}uptime_seconds", {}, round(time.time() - self.created, 3)))
+        for (name, labels), timer in self.timers.items():
+            samples.append((f"{PREFIX}handler_calls_total", dict(labels), timer.calls()))
+            samples.append((f"{PREFIX}handler_sample_every", dict(labels), timer.every))
+            overhead = timer.overhead()
+            if overhead is not None:
+                samples.append((f"{PREFIX}instrumentation_overhead_ratio", dict(labels, timer=name),
+                                round(overhead, 5)))
+        return samples
+
+    def snapshot(self):
+        snapshot = {"timestamp": time.time(), "labels": self.const_labels, "metrics": {}, "histograms": {}}
+        for name, labels, value in self._samples():
+            snapshot["metrics"].setdefault(name, []).append({"labels": labels, "value": value})
+        for (name, labels), timer in self.timers.items():
+            entry = {"labels": dict(labels), **timer.histogram.summary(),
+                     "sample_every": timer.every, "wrapper_cost_s": timer.cost,
+                     "overhead_ratio": timer.overhead(), "over_budget": timer.over_budget()}
+            snapshot["histograms"].setdefault(name, []).append(entry)
+        return snapshot
+
+    def _label_text(self, labels):
+        merged = {**self.const_labels, **labels}
+        if not merged:
+            return ""
+        return "{" + ",".join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in merged.items()) + "}"
+
+    def prometheus(self):
+        # Text exposition format, for node_exporter's textfile collector.
+        lines = []
+        declared = set()
+
+        def header(name, kind):
+            if name not in declared:
+                declared.add(name)
+                if self.help.get(name):
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for name, labels, value in self._samples():
+            header(name, self.types.get(name, "counter" if name.endswith("_total") else "gauge"))
+            lines.append(f"{name}{self._label_text(labels)} {value}")
+        for (name, labels), timer in self.timers.items():
+            header(name, "histogram")
+            h = timer.histogram
+            cumulative = 0
+            for le, count in zip(h.buckets + ("+Inf",), h.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._label_text(dict(labels, le=le))} {cumulative}")
+            lines.append(f"{name}_sum{self._label_text(dict(labels))} {h.sum}")
+            lines.append(f"{name}_count{self._label_text(dict(labels))} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, prefix):
+        # prefix.prom and prefix.json, each replaced atomically so a
+        # collector never reads half a file. Returns the snapshot.
+        start = time.perf_counter()
+        os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+        snapshot = self.snapshot()
+        for suffix, text in ((".prom", self.prometheus()), (".json", json.dumps(snapshot, indent=2, default=str))):
+            tmp = f"{prefix}{suffix}.tmp"
+            with open(tmp, "w") as f:
+                f.write(text)
+            os.replace(tmp, prefix + suffix)
+        self.gauge(f"{PREFIX}export_seconds", round(time.perf_counter() - start, 6),
+                   "Time the last metrics export took.")
+        return snapshot
+
+
+class Exporter:
+    # Writes a registry every interval seconds from a daemon thread;
+    # stop() writes one last time and returns that snapshot.
+    def __init__(self, registry, prefix, interval=SNAPSHOT_INTERVAL):
+        self.registry = registry
+        self.prefix = prefix
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            export(self.registry, self.prefix)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.registry.write(self.prefix)
+
+
+def export(registry, prefix):
+    # A failed metrics write is reported, never fatal to the run it measures.
+    try:
+        return registry.write(prefix)
+    except OSError as e:
+        print(f"[!] Metrics export failed: {e}")
+        return None
+
+
+# Process-wide registry for analysis and reporting stages; capture
+# sessions keep their own, labelled by kind and interface. Entry points
+# (traffic_analyzer, report_generator, run_all) export it when done.
+REGISTRY = Registry(component="analysis")
+ANALYSIS_PREFIX = f"{METRICS_DIR}/analysis"
+
+
+def stage(name):
+    return REGISTRY.stage(name)
+
+
+def export_analysis():
+    return export(REGISTRY, ANALYSIS_PREFIX)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the per-call cost of the sampled handler timer")
+    parser.add_argument("--work-us", type=float, default=10.0, help="simulated handler time per call")
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    def handler(_):
+        end = time.perf_counter() + args.work_us / 1e6
+        while time.perf_counter() < end:
+            pass
+
+    timer = SampledTimer()
+    cost = timer.calibrate()
+    timed = timer.wrap(handler)
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        timed(None)
+    elapsed = time.perf_counter() - start
+    s = timer.histogram.summary()
+    print(f"[✓] Wrapper cost {cost * 1e9:.0f} ns/call, handler mean {s['mean'] * 1e6:.2f} us "
+          f"-> overhead {timer.overhead():.2%} (budget {OVERHEAD_BUDGET:.0%})")
+    print(f"    {timer.calls()} calls in {elapsed:.2f}s, {s['count']} sampled (1 in {timer.every}), "
+          f"p50 {s['p50'] * 1e6:.1f} us, p99 {s['p99'] * 1e6:.1f} us")
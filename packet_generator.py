@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+import argparse
+import errno
+import os
+import socket
+import struct
+import time
+
+KINDS = ("syn", "udp", "icmp")
+PROTO = {"syn": socket.IPPROTO_TCP, "udp": socket.IPPROTO_UDP, "icmp": socket.IPPROTO_ICMP}
+IP_HEADER_LEN = 20
+
+
+def checksum(data):
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
+
+
+def patch_checksum(csum, old, new):
+    # RFC 1624 incremental update: HC' = ~(~HC + ~m + m')
+    total = (~csum & 0xffff) + (~old & 0xffff) + new
+    total = (total & 0xffff) + (total >> 16)
+    total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
+
+
+def source_for(target):
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        probe.connect((target, 9))
+        return probe.getsockname()[0]
+    finally:
+        probe.close()
+
+
+def build_template(kind, src, dst, payload=b""):
+    # Returns (packet, l4_offset, checksum_offset). Ports are patched per
+    # packet; the kernel fills in the IP checksum for IP_HDRINCL sockets.
+    saddr = socket.inet_aton(src)
+    daddr = socket.inet_aton(dst)
+    if kind == "syn":
+        l4 = struct.pack("!HHIIBBHHH", 1024, 80, 0, 0, 0x50, 0x02, 64240, 0, 0) + payload
+        csum_off = 16
+    elif kind == "udp":
+        l4 = struct.pack("!HHHH", 1024, 53, 8 + len(payload), 0) + payload
+        csum_off = 6
+    else:
+        l4 = struct.pack("!BBHHH", 8, 0, 0, os.getpid() & 0xffff, 0) + payload
+        csum_off = 2
+    proto = PROTO[kind]
+    if kind == "icmp":
+        csum = checksum(l4)
+    else:
+        pseudo = saddr + daddr + struct.pack("!BBH", 0, proto, len(l4))
+        csum = checksum(pseudo + l4)
+    l4 = l4[:csum_off] + struct.pack("!H", csum) + l4[csum_off + 2:]
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, IP_HEADER_LEN + len(l4), 0, 0, 64, proto, 0, saddr, daddr)
+    return bytearray(ip + l4), IP_HEADER_LEN, IP_HEADER_LEN + csum_off
+
+
+class PacketGenerator:
+    # One raw socket, one pre-built packet; per packet only the random
+    # source/destination ports (or the ICMP sequence) and the L4 checksum
+    # are rewritten in place. rate=0 sends as fast as possible. stop: an
+    # optional Event checked once per burst that ends the run early.
+    def __init__(self, target, kind="syn", rate=0, duration=None, count=None, burst=64,
+                 sport_range=(1024, 65535), dport_range=(1, 65535), payload=b"", stop=None):
+        if kind not in KINDS:
+            raise ValueError(f"unknown packet kind {kind!r}, expected one of {KINDS}")
+        if duration is None and count is None:
+            raise ValueError("need a duration or a packet count")
+        self.target = target
+        self.kind = kind
+        self.rate = rate
+        self.duration = duration
+        self.count = count
+        self.burst = max(1, burst)
+        self.sport_range = sport_range
+        self.dport_range = dport_range
+        self.stop = stop
+        self.src = source_for(target)
+        self.packet, self.l4, self.csum_off = build_template(kind, self.src, target, payload)
+
+    def _random_words(self, n, low, high):
+        span = high - low + 1
+        return [low + w % span for w in struct.unpack(f"!{n}H", os.urandom(2 * n))]
+
+    def run(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_RAW)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+        packet = self.packet
+        l4 = self.l4
+        csum_off = self.csum_off
+        word = struct.Struct("!H")
+        dest = (self.target, 0)
+        sendto = sock.sendto
+        sent = errors = 0
+        seq = 0
+        stop = self.stop
+        wait = stop.wait if stop is not None else time.sleep
+        stopped = False
+        start = time.perf_counter()
+        deadline = start + self.duration if self.duration else None
+        try:
+            while True:
+                if stop is not None and stop.is_set():
+                    stopped = True
+                    break
+                # count bounds attempts, not successes: a socket stuck on
+                # ENOBUFS must not keep a count-only run going forever.
+                attempts = sent + errors
+                if self.count is not None and attempts >= self.count:
+                    break
+                now = time.perf_counter()
+                if deadline is not None and now >= deadline:
+                    break
+                if self.rate:
+                    due = start + attempts / self.rate
+                    if due > now:
+                        wait(due - now)
+                n = self.burst if self.count is None else min(self.burst, self.count - attempts)
+                if self.kind == "icmp":
+                    fields = [((seq + i) & 0xffff,) for i in range(n)]
+                    positions = (l4 + 6,)
+                else:
+                    sports = self._random_words(n, *self.sport_range)
+                    dports = self._random_words(n, *self.dport_range)
+                    fields = zip(sports, dports)
+                    positions = (l4, l4 + 2)
+                for values in fields:
+                    csum = word.unpack_from(packet, csum_off)[0]
+                    for pos, value in zip(positions, values):
+                        csum = patch_checksum(csum, word.unpack_from(packet, pos)[0], value)
+                        word.pack_into(packet, pos, value)
+                    word.pack_into(packet, csum_off, csum)
+                    try:
+                        sendto(packet, dest)
+                        sent += 1
+                    except OSError as e:
+                        if e.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                            raise
+                        errors += 1
+                seq += n
+        finally:
+            sock.close()
+        elapsed = time.perf_counter() - start
+        return {
+            "kind": self.kind,
+            "target": self.target,
+            "packets_sent": sent,
+            "send_errors": errors,
+            "duration_s": round(elapsed, 3),
+            "target_pps": self.rate,
+            "achieved_pps": round(sent / elapsed, 1) if elapsed else 0.0,
+            "burst": self.burst,
+            "stopped": stopped,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="High-rate raw packet generator for load-testing capture and detection")
+    parser.add_argument("--kind", choices=KINDS, default="syn")
+    parser.add_argument("--target", default="127.0.0.1")
+    parser.add_argument("--rate", type=float, default=0, help="packets per second (0 = unthrottled)")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--count", type=int)
+    parser.add_argument("--burst", type=int, default=64)
+    args = parser.parse_args()
+    report = PacketGenerator(args.target, args.kind, args.rate, args.duration, args.count, args.burst).run()
+    print(f"[✓] Sent {report['packets_sent']} {report['kind']} packets in {report['duration_s']}s "
+          f"-> {report['achieved_pps']:,} pkt/s (target {report['target_pps'] or 'max'}, errors {report['send_errors']})")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import json
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pcap_reader import (open_pcap, decode_ipv4, ip_to_str, GLOBAL_HEADER_LEN,
+                         RECORD_HEADER_LEN, PROTO_TCP, PROTO_UDP, PROTO_ICMP)
+
+MIN_SHARD_BYTES = 8 * 1024 * 1024
+SHARDS_PER_WORKER = 4
+SYNC_CHAIN = 8
+SYNC_SCAN_BYTES = 1024 * 1024
+MAX_RECORD_LEN = 262144
+
+
+class ShardStats:
+    __slots__ = ("total", "tcp", "udp", "icmp", "ports", "src", "dst", "per_second")
+
+    def __init__(self):
+        self.total = 0
+        self.tcp = 0
+        self.udp = 0
+        self.icmp = 0
+        self.ports = {}
+        self.src = set()
+        self.dst = set()
+        self.per_second = {}
+
+    def add_packet(self, second, src, dst, proto, dport):
+        self.total += 1
+        self.per_second[second] = self.per_second.get(second, 0) + 1
+        self.src.add(src)
+        self.dst.add(dst)
+        if proto == PROTO_TCP:
+            self.tcp += 1
+            self.ports[dport] = self.ports.get(dport, 0) + 1
+        elif proto == PROTO_UDP:
+            self.udp += 1
+        elif proto == PROTO_ICMP:
+            self.icmp += 1
+
+    def merge(self, other):
+        self.total += other.total
+        self.tcp += other.tcp
+        self.udp += other.udp
+        self.icmp += other.icmp
+        for port, count in other.ports.items():
+            self.ports[port] = self.ports.get(port, 0) + count
+        self.src |= other.src
+        self.dst |= other.dst
+        for second, count in other.per_second.items():
+            self.per_second[second] = self.per_second.get(second, 0) + count
+        return self
+
+    def to_stats(self, top_n=20):
+        # Deterministic ordering so a merged result compares equal to a
+        # serial one. Per-second counts run from the first packet's second to
+        # the last one's, empty seconds included.
+        top_ports = sorted(self.ports.items(), key=lambda x: (-x[1], x[0]))[:top_n]
+        seconds = range(min(self.per_second), max(self.per_second) + 1) if self.per_second else ()
+        return {
+            "total_packets": self.total,
+            "tcp_packets": self.tcp,
+            "udp_packets": self.udp,
+            "icmp_packets": self.icmp,
+            "unique_src_ips": [ip_to_str(a) for a in sorted(self.src)],
+            "unique_dst_ips": [ip_to_str(a) for a in sorted(self.dst)],
+            "port_frequency": dict(top_ports),
+            "packets_per_second": [self.per_second.get(s, 0) for s in seconds],
+        }
+
+
+def _plausible_chain(mm, offset, record, ts_divisor, snaplen, first_sec):
+    size = len(mm)
+    for _ in range(SYNC_CHAIN):
+        if offset == size:
+            return True
+        if offset + RECORD_HEADER_LEN > size:
+            return False
+        sec, frac, caplen, wirelen = record.unpack_from(mm, offset)
+        if (frac >= ts_divisor or caplen > snaplen or caplen > wirelen
+                or wirelen > MAX_RECORD_LEN or abs(sec - first_sec) > 366 * 86400):
+            return False
+        offset += RECORD_HEADER_LEN + caplen
+    return True
+
+
+def find_record_boundary(mm, pos, endian, ts_divisor):
+    # Heuristic resync: first offset >= pos that starts a chain of plausible
+    # record headers. analyze_shards() checks every guess against the real
+    # end offset of the preceding shard, so a wrong guess cannot leak into
+    # the result.
+    if pos <= GLOBAL_HEADER_LEN:
+        return GLOBAL_HEADER_LEN
+    record = struct.Struct(endian + "IIII")
+    snaplen = struct.unpack_from(endian + "I", mm, 16)[0] or MAX_RECORD_LEN
+    first_sec = record.unpack_from(mm, GLOBAL_HEADER_LEN)[0] if len(mm) >= GLOBAL_HEADER_LEN + RECORD_HEADER_LEN else 0
+    limit = min(len(mm), pos + SYNC_SCAN_BYTES)
+    for candidate in range(pos, limit):
+        if _plausible_chain(mm, candidate, record, ts_divisor, snaplen, first_sec):
+            return candidate
+    return None
+
+
+def process_shard(path, start_hint, end_hint, exact_start=None):
+    # Aggregates every record whose header starts in [start, end_hint).
+    # Returns (stats, start, stop) where stop is the first record offset
+    # at or past end_hint, i.e. where the next shard must begin.
+    mm, endian, ts_divisor, linktype = open_pcap(path)
+    stats = ShardStats()
+    try:
+        start = exact_start if exact_start is not None else find_record_boundary(mm, start_hint, endian, ts_divisor)
+        if start is None:
+            return stats, None, None
+        record = struct.Struct(endian + "IIII")
+        size = len(mm)
+        end = min(end_hint, size)
+        offset = start
+        ports = stats.ports
+        src = stats.src
+        dst = stats.dst
+        per_second = stats.per_second
+        while offset < end and offset + RECORD_HEADER_LEN <= size:
+            sec, frac, caplen, wirelen = record.unpack_from(mm, offset)
+            data = offset + RECORD_HEADER_LEN
+            if data + caplen > size:
+                offset = size
+                break
+            offset = data + caplen
+            fields = decode_ipv4(mm, data, caplen, linktype)
+            if fields is None:
+                continue
+            src_ip, dst_ip, proto, sport, dport, flags = fields
+            stats.total += 1
+            per_second[sec] = per_second.get(sec, 0) + 1
+            src.add(src_ip)
+            dst.add(dst_ip)
+            if proto == PROTO_TCP:
+                stats.tcp += 1
+                ports[dport] = ports.get(dport, 0) + 1
+            elif proto == PROTO_UDP:
+                stats.udp += 1
+            elif proto == PROTO_ICMP:
+                stats.icmp += 1
+        return stats, start, offset
+    finally:
+        mm.close()
+
+
+def expand_paths(paths):
+    if isinstance(paths, str):
+        paths = [paths]
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded.extend(sorted(glob.glob(os.path.join(path, "*.pcap"))))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def plan_shards(paths, workers):
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    target = max(MIN_SHARD_BYTES, total_bytes // max(1, workers * SHARDS_PER_WORKER))
+    shards = []
+    for path in paths:
+        size = os.path.getsize(path)
+        bounds = list(range(GLOBAL_HEADER_LEN, size, target)) or [GLOBAL_HEADER_LEN]
+        bounds.append(size)
+        for start, end in zip(bounds, bounds[1:]):
+            shards.append((path, start, end))
+    return shards
+
+
+def analyze_shards(paths, workers=None):
+    paths = expand_paths(paths)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        shards = [(path, GLOBAL_HEADER_LEN, os.path.getsize(path)) for path in paths]
+        results = [process_shard(*shard) for shard in shards]
+    else:
+        shards = plan_shards(paths, workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(process_shard, *zip(*shards)))
+    merged = ShardStats()
+    prev_path, prev_stop = None, None
+    for (path, start_hint, end_hint), (stats, start, stop) in zip(shards, results):
+        expected = GLOBAL_HEADER_LEN if path != prev_path else prev_stop
+        if start != expected:
+            # Resync guessed wrong; redo this shard from the known boundary.
+            stats, start, stop = process_shard(path, start_hint, end_hint, exact_start=expected)
+        merged.merge(stats)
+        prev_path, prev_stop = path, stop
+    return merged
+
+
+def analyze_parallel(paths, workers=None, top_n=20):
+    paths = expand_paths(paths)
+    result = analyze_shards(paths, workers).to_stats(top_n)
+    result["pcap_files"] = paths
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded multi-core analysis of a pcap or a directory of rotated pcaps")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("-o", "--output")
+    parser.add_argument("--verify", action="store_true", help="also run serially and compare results")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = analyze_parallel(args.paths, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"[✓] {result['total_packets']} packets with {args.workers} workers in {elapsed:.2f}s "
+          f"({result['total_packets'] / elapsed:,.0f} pkt/s)")
+    if args.verify:
+        start = time.perf_counter()
+        serial = analyze_parallel(args.paths, 1)
+        serial_elapsed = time.perf_counter() - start
+        print(f"[✓] Serial run in {serial_elapsed:.2f}s — speedup {serial_elapsed / elapsed:.1f}x")
+        print("[✓] Results identical" if serial == result else "[!] Results differ from serial run")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"[✓] Saved: {args.output}")
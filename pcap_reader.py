@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+import json
+import mmap
+import os
+import socket
+import struct
+import sys
+from datetime import datetime
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+LINKTYPE_IPV4 = 228
+
+ETH_P_IP = 0x0800
+VLAN_TPIDS = (0x8100, 0x88a8, 0x9100)
+
+PROTO_ICMP = 1
+PROTO_TCP = 6
+PROTO_UDP = 17
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_PSH = 0x08
+TCP_ACK = 0x10
+
+GLOBAL_HEADER_LEN = 24
+RECORD_HEADER_LEN = 16
+
+_U16 = struct.Struct("!H")
+_U32_LE = struct.Struct("<I")
+_U32_BE = struct.Struct(">I")
+_IPV4 = struct.Struct("!B5xHxB2xII")
+_PORTS = struct.Struct("!HH")
+
+
+class PcapFormatError(ValueError):
+    pass
+
+
+def open_pcap(path):
+    # Returns (mmap, endian, ts_divisor, linktype). Caller closes the mmap.
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < GLOBAL_HEADER_LEN:
+            raise PcapFormatError(f"{path}: too short for a pcap header")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic = _U32_LE.unpack_from(mm, 0)[0]
+    if magic in (0xa1b2c3d4, 0xa1b23c4d):
+        endian = "<"
+    elif magic in (0xd4c3b2a1, 0x4d3cb2a1):
+        endian = ">"
+        magic = _U32_BE.unpack_from(mm, 0)[0]
+    else:
+        mm.close()
+        raise PcapFormatError(f"{path}: not a libpcap file (pcapng is not supported)")
+    ts_divisor = 1_000_000_000 if magic == 0xa1b23c4d else 1_000_000
+    linktype = struct.unpack_from(endian + "I", mm, 20)[0] & 0x0fffffff
+    return mm, endian, ts_divisor, linktype
+
+
+def iter_records(path, start=GLOBAL_HEADER_LEN, end=None):
+    # Yields (ts, caplen, wirelen, data_offset, mm, linktype) per record,
+    # reading only the 16-byte record headers.
+    mm, endian, ts_divisor, linktype = open_pcap(path)
+    record = struct.Struct(endian + "IIII")
+    size = len(mm)
+    if end is None or end > size:
+        end = size
+    offset = start
+    try:
+        while offset + RECORD_HEADER_LEN <= end:
+            sec, frac, caplen, wirelen = record.unpack_from(mm, offset)
+            data = offset + RECORD_HEADER_LEN
+            if data + caplen > size:
+                break
+            yield sec + frac / ts_divisor, caplen, wirelen, data, mm, linktype
+            offset = data + caplen
+    finally:
+        mm.close()
+
+
+def ip_offset(buf, off, caplen, linktype):
+    # Offset of the IPv4 header inside the frame, or -1 for anything else.
+    if linktype == LINKTYPE_ETHERNET:
+        if caplen < 14:
+            return -1
+        pos = off + 12
+        ethertype = _U16.unpack_from(buf, pos)[0]
+        while ethertype in VLAN_TPIDS and pos + 6 <= off + caplen:
+            pos += 4
+            ethertype = _U16.unpack_from(buf, pos)[0]
+        return pos + 2 if ethertype == ETH_P_IP else -1
+    if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        return off if caplen and buf[off] >> 4 == 4 else -1
+    if linktype == LINKTYPE_LINUX_SLL:
+        if caplen < 16:
+            return -1
+        return off + 16 if _U16.unpack_from(buf, off + 14)[0] == ETH_P_IP else -1
+    if linktype == LINKTYPE_LINUX_SLL2:
+        if caplen < 20:
+            return -1
+        return off + 20 if _U16.unpack_from(buf, off)[0] == ETH_P_IP else -1
+    if linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        if caplen < 4:
+            return -1
+        family = _U32_LE.unpack_from(buf, off)[0]
+        if family > 0xffff:
+            family = _U32_BE.unpack_from(buf, off)[0]
+        return off + 4 if family == socket.AF_INET else -1
+    return -1
+
+
+def decode_ipv4(buf, off, caplen, linktype):
+    # Returns (src, dst, proto, sport, dport, tcp_flags) with addresses as
+    # uint32, or None for non-IPv4 frames. Ports/flags are 0 when absent.
+    # Non-first fragments carry no transport header, so like scapy they are
+    # not dissected: proto is reported as 0 and they count as plain IP.
+    ip = ip_offset(buf, off, caplen, linktype)
+    end = off + caplen
+    if ip < 0 or ip + 20 > end:
+        return None
+    vihl, frag, proto, src, dst = _IPV4.unpack_from(buf, ip)
+    if vihl >> 4 != 4:
+        return None
+    if frag & 0x1fff:
+        return src, dst, 0, 0, 0, 0
+    l4 = ip + (vihl & 0x0f) * 4
+    sport = dport = flags = 0
+    if proto in (PROTO_TCP, PROTO_UDP) and l4 + 4 <= end:
+        sport, dport = _PORTS.unpack_from(buf, l4)
+        if proto == PROTO_TCP and l4 + 14 <= end:
+            flags = buf[l4 + 13]
+    return src, dst, proto, sport, dport, flags
+
+
+def iter_packets(path):
+    # Yields (ts, wirelen, src, dst, proto, sport, dport, tcp_flags) for
+    # every IPv4 packet without building scapy objects.
+    for ts, caplen, wirelen, data, mm, linktype in iter_records(path):
+        fields = decode_ipv4(mm, data, caplen, linktype)
+        if fields is not None:
+            yield (ts, wirelen) + fields
+
+
+def ip_to_str(addr):
+    return socket.inet_ntoa(addr.to_bytes(4, "big"))
+
+
+def analyze_pcap(paths, bpf_filter="", snaplen=0):
+    # Builds the same stats dict as baseline_capture.run_capture from one or
+    # more pcap files. packets_per_second counts packets per whole second of
+    # their timestamps, from the first packet's second to the last one's,
+    # empty seconds included.
+    # bpf_filter/snaplen take the same syntax as the live capture options.
+    if isinstance(paths, str):
+        paths = [paths]
+    programs = {}
+    if bpf_filter or snaplen:
+        from capture_filter import compile_bpf, run_bpf
+    total = tcp = udp = icmp = 0
+    seen_src = set()
+    seen_dst = set()
+    port_frequency = {}
+    per_second = {}
+    first_ts = last_ts = None
+    for path in paths:
+        for ts, caplen, wirelen, data, mm, linktype in iter_records(path):
+            if bpf_filter or snaplen:
+                if linktype not in programs:
+                    programs[linktype] = compile_bpf(bpf_filter, snaplen, linktype)
+                keep = run_bpf(programs[linktype], mm, data, caplen, wirelen)
+                if not keep:
+                    continue
+                caplen = min(caplen, keep)
+            fields = decode_ipv4(mm, data, caplen, linktype)
+            if fields is None:
+                continue
+            src, dst, proto, sport, dport, flags = fields
+            total += 1
+            second = int(ts)
+            per_second[second] = per_second.get(second, 0) + 1
+            seen_src.add(src)
+            seen_dst.add(dst)
+            if proto == PROTO_TCP:
+                tcp += 1
+                port_frequency[dport] = port_frequency.get(dport, 0) + 1
+            elif proto == PROTO_UDP:
+                udp += 1
+            elif proto == PROTO_ICMP:
+                icmp += 1
+            if first_ts is None:
+                first_ts = ts
+            last_ts = ts
+    top_ports = dict(sorted(port_frequency.items(), key=lambda x: x[1], reverse=True)[:20])
+    seconds = range(min(per_second), max(per_second) + 1) if per_second else ()
+    return {
+        "start_time": _iso(first_ts),
+        "end_time": _iso(last_ts),
+        "total_packets": total,
+        "tcp_packets": tcp,
+        "udp_packets": udp,
+        "icmp_packets": icmp,
+        "unique_src_ips": [ip_to_str(a) for a in seen_src],
+        "unique_dst_ips": [ip_to_str(a) for a in seen_dst],
+        "port_frequency": top_ports,
+        "packets_per_second": [per_second.get(s, 0) for s in seconds],
+        "pcap_files": list(paths)
+    }
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts).isoformat() if ts is not None else ""
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: pcap_reader.py <capture.pcap> [more.pcap ...] [-o stats.json] [-f 'bpf filter'] [-s snaplen]")
+        sys.exit(1)
+    args = sys.argv[1:]
+    options = {"-o": None, "-f": "", "-s": 0}
+    for flag in options:
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    out = options["-o"]
+    result = analyze_pcap(args, options["-f"], int(options["-s"]))
+    print(f"[✓] Total packets: {result['total_packets']} "
+          f"(TCP {result['tcp_packets']}, UDP {result['udp_packets']}, ICMP {result['icmp_packets']})")
+    if out:
+        with open(out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"[✓] Saved: {out}")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+import argparse
+import errno
+import socket
+import struct
+import time
+from array import array
+
+import numpy as np
+
+from pcap_reader import iter_records, ip_offset, LINKTYPE_ETHERNET, ETH_P_IP
+
+# Frames from non-Ethernet captures (raw IP, SLL, BSD loopback) get this
+# header: locally administered MACs, IPv4 ethertype.
+FAKE_ETH_HEADER = bytes.fromhex("020000000002" "020000000001") + struct.pack("!H", ETH_P_IP)
+# Below this much time ahead of schedule we send instead of sleeping;
+# time.sleep can't reliably wait for less.
+MIN_SLEEP = 0.0001
+SKEW_PERCENTILES = (50, 90, 99)
+
+
+def replay_frames(paths):
+    # Yields (capture ts, Ethernet frame, truncated) across one or more
+    # pcaps, in file order (rotated captures are already in time order).
+    for path in paths:
+        for ts, caplen, wirelen, data, mm, linktype in iter_records(path):
+            if linktype == LINKTYPE_ETHERNET:
+                frame = mm[data:data + caplen]
+            else:
+                ip = ip_offset(mm, data, caplen, linktype)
+                if ip < 0:
+                    continue
+                frame = FAKE_ETH_HEADER + mm[ip:data + caplen]
+            yield ts, frame, caplen < wirelen
+
+
+class PcapReplayer:
+    # Re-injects stored pcaps through an AF_PACKET socket on iface (lo or
+    # one end of a veth pair), so capture and detection see them as live
+    # traffic. Pacing: speed=1 keeps the original gaps, speed=N divides
+    # them by N, speed=0 sends as fast as possible, pps=N ignores capture
+    # timing and sends N packets per second. Packets that fall behind
+    # schedule go out immediately, and how late they were is the skew.
+    # On lo a packet socket sees each injected frame twice (outgoing and
+    # looped back); a veth pair gives one copy on the far end. stop: an
+    # optional Event that ends the replay early.
+    def __init__(self, paths, iface="lo", speed=1.0, pps=None, loops=1, stop=None):
+        if isinstance(paths, str):
+            paths = [paths]
+        if speed < 0 or (pps is not None and pps <= 0):
+            raise ValueError("speed must be >= 0 and pps > 0")
+        self.paths = list(paths)
+        self.iface = iface
+        self.speed = speed
+        self.pps = pps
+        self.loops = max(1, loops)
+        self.stop = stop
+
+    def mode(self):
+        if self.pps:
+            return "fixed_pps"
+        if self.speed == 0:
+            return "max"
+        return "original" if self.speed == 1 else "multiplier"
+
+    def run(self):
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW)
+        sock.bind((self.iface, 0))
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+        send = sock.send
+        perf = time.perf_counter
+        stop = self.stop
+        sleep = stop.wait if stop is not None else time.sleep
+        stopped = False
+        lateness = array("d")
+        late = lateness.append
+        sent = errors = truncated = sent_bytes = 0
+        last_ts = None
+        loop_offset = 0.0
+        index = 0
+        start = perf()
+        try:
+            for _ in range(self.loops):
+                loop_first = None
+                loop_packets = 0
+                for ts, frame, cut in replay_frames(self.paths):
+                    if stop is not None and index % 256 == 0 and stop.is_set():
+                        stopped = True
+                        break
+                    if loop_first is None:
+                        loop_first = ts
+                    # Capture time on one continuous axis across loops.
+                    capture_t = loop_offset + ts - loop_first
+                    last_ts = capture_t
+                    if self.pps:
+                        due = start + index / self.pps
+                    elif self.speed:
+                        due = start + capture_t / self.speed
+                    else:
+                        due = None
+                    index += 1
+                    loop_packets += 1
+                    if due is not None:
+                        ahead = due - perf()
+                        if ahead > MIN_SLEEP and sleep(ahead):
+                            stopped = True
+                            break
+                    try:
+                        send(frame)
+                    except OSError as e:
+                        if e.errno not in (errno.ENOBUFS, errno.EAGAIN, errno.EMSGSIZE):
+                            raise
+                        errors += 1
+                        continue
+                    if due is not None:
+                        late(perf() - due)
+                    sent += 1
+                    sent_bytes += len(frame)
+                    truncated += cut
+                if stopped:
+                    break
+                if loop_first is not None:
+                    # Next loop starts one mean gap after this one ends.
+                    loop_offset = last_ts + (last_ts - loop_offset) / max(loop_packets - 1, 1)
+        finally:
+            sock.close()
+        elapsed = perf() - start
+        report = self.report(sent, errors, truncated, sent_bytes, elapsed, last_ts or 0.0, lateness)
+        report["stopped"] = stopped
+        return report
+
+    def report(self, sent, errors, truncated, sent_bytes, elapsed, capture_span, lateness):
+        if self.pps:
+            target_pps = self.pps
+        elif self.speed and capture_span:
+            target_pps = (sent + errors) / (capture_span / self.speed)
+        else:
+            target_pps = 0
+        skew = np.frombuffer(lateness, dtype=np.float64) * 1000 if len(lateness) else np.zeros(0)
+        return {
+            "mode": self.mode(),
+            "interface": self.iface,
+            "pcap_files": self.paths,
+            "loops": self.loops,
+            "speed": self.speed,
+            "packets_sent": sent,
+            "send_errors": errors,
+            "truncated_frames": truncated,
+            "bytes_sent": sent_bytes,
+            "duration_s": round(elapsed, 3),
+            "capture_span_s": round(capture_span, 3),
+            "target_pps": round(target_pps, 1),
+            "achieved_pps": round(sent / elapsed, 1) if elapsed else 0.0,
+            "achieved_mbps": round(sent_bytes * 8 / elapsed / 1e6, 2) if elapsed else 0.0,
+            # Wall-clock span over the intended span: 1.0 is perfect pacing.
+            "timing_ratio": round(elapsed / (capture_span / self.speed), 4)
+            if self.speed and not self.pps and capture_span else None,
+            "skew_ms": {
+                "mean": round(float(skew.mean()), 3),
+                **{f"p{p}": round(float(np.percentile(skew, p)), 3) for p in SKEW_PERCENTILES},
+                "max": round(float(skew.max()), 3),
+            } if len(skew) else None,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay stored pcaps onto an interface at a controlled rate")
+    parser.add_argument("pcap", nargs="+")
+    parser.add_argument("--iface", default="lo")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--speed", type=float, default=1.0, help="multiplier on original timing (0 = as fast as possible)")
+    pacing.add_argument("--pps", type=float, help="fixed packets per second, ignoring capture timing")
+    parser.add_argument("--loops", type=int, default=1)
+    args = parser.parse_args()
+
+    r = PcapReplayer(args.pcap, args.iface, args.speed, args.pps, args.loops).run()
+    print(f"[✓] Replayed {r['packets_sent']} packets on {r['interface']} in {r['duration_s']}s "
+          f"({r['mode']}) -> {r['achieved_pps']:,} pkt/s, {r['achieved_mbps']} Mbit/s")
+    print(f"    target {r['target_pps'] or 'max'} pkt/s, errors {r['send_errors']}, truncated {r['truncated_frames']}")
+    if r["skew_ms"]:
+        s = r["skew_ms"]
+        print(f"    skew ms: mean {s['mean']}, p50 {s['p50']}, p99 {s['p99']}, max {s['max']}"
+              + (f", timing ratio {r['timing_ratio']}" if r["timing_ratio"] else ""))
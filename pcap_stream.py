@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import os
+import struct
+
+PCAP_MAGIC = 0xa1b2c3d4
+LINKTYPE_ETHERNET = 1
+DEFAULT_SNAPLEN = 65535
+
+GLOBAL_HEADER = struct.Struct("<IHHiIII")
+RECORD_HEADER = struct.Struct("<IIII")
+
+
+class RotatingPcapWriter:
+    # Writes packets to disk as they arrive. A new file is started once the
+    # current one reaches max_bytes or spans max_seconds (0 disables either).
+    # First file is "<prefix>.pcap", rotated ones "<prefix>_001.pcap", ...
+    def __init__(self, prefix, max_bytes=0, max_seconds=0,
+                 linktype=LINKTYPE_ETHERNET, snaplen=DEFAULT_SNAPLEN):
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.linktype = linktype
+        self.snaplen = snaplen
+        self.files = []
+        self.packets_written = 0
+        self.bytes_written = 0
+        self._fh = None
+        self._file_bytes = 0
+        self._file_packets = 0
+        self._file_start = None
+
+    def _open_next(self):
+        self._close_current()
+        index = len(self.files)
+        path = f"{self.prefix}.pcap" if index == 0 else f"{self.prefix}_{index:03d}.pcap"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fh = open(path, "wb", buffering=1 << 20)
+        header = GLOBAL_HEADER.pack(PCAP_MAGIC, 2, 4, 0, 0, self.snaplen, self.linktype)
+        self._fh.write(header)
+        self.files.append(path)
+        self._file_bytes = len(header)
+        self._file_packets = 0
+        self._file_start = None
+
+    def _close_current(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _needs_rotation(self, ts, record_len):
+        if self._fh is None:
+            return True
+        if self._file_packets == 0:
+            return False
+        if self.max_bytes and self._file_bytes + record_len > self.max_bytes:
+            return True
+        if self.max_seconds and ts - self._file_start >= self.max_seconds:
+            return True
+        return False
+
+    def write(self, ts, data, wirelen=None):
+        caplen = min(len(data), self.snaplen)
+        record_len = RECORD_HEADER.size + caplen
+        if self._needs_rotation(ts, record_len):
+            self._open_next()
+        if self._file_start is None:
+            self._file_start = ts
+        sec = int(ts)
+        usec = int(round((ts - sec) * 1_000_000))
+        if usec >= 1_000_000:
+            sec += 1
+            usec -= 1_000_000
+        self._fh.write(RECORD_HEADER.pack(sec, usec, caplen, wirelen or len(data)))
+        self._fh.write(data[:caplen])
+        self._file_bytes += record_len
+        self._file_packets += 1
+        self.packets_written += 1
+        self.bytes_written += record_len
+
+    def write_packet(self, pkt):
+        data = bytes(pkt)
+        self.write(float(pkt.time), data, getattr(pkt, "wirelen", None) or len(data))
+
+    def flush(self):
+        if self._fh is not None:
+            self._fh.flush()
+
+    def close(self):
+        if self._fh is None and not self.files:
+            self._open_next()
+        self._close_current()
+        return self.files
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
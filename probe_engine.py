@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import errno
+import random
+import resource
+import socket
+import struct
+import time
+
+from packet_generator import build_template, patch_checksum, source_for
+
+DEFAULT_CONCURRENCY = 500
+CONNECT_TIMEOUT = 1.0
+BANNER_TIMEOUT = 1.0
+BANNER_BYTES = 256
+HTTP_PORTS = {80, 443, 8000, 8080, 8443}
+HTTP_PROBE = b"HEAD / HTTP/1.0\r\n\r\n"
+# Raw-socket back-off when the send buffer is full (ENOBUFS/EAGAIN):
+# doubles from SEND_BACKOFF up to MAX_SEND_BACKOFF, SEND_RETRIES tries a port.
+SEND_BACKOFF = 0.001
+MAX_SEND_BACKOFF = 0.1
+SEND_RETRIES = 10
+
+
+def parse_ports(spec):
+    ports = []
+    for part in str(spec).split(","):
+        if "-" in part:
+            low, high = part.split("-")
+            ports.extend(range(int(low), int(high) + 1))
+        elif part:
+            ports.append(int(part))
+    return ports
+
+
+def raise_fd_limit(wanted):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < wanted:
+        new_soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+        soft = new_soft
+    return soft
+
+
+async def _recv(loop, sock, timeout):
+    try:
+        return await asyncio.wait_for(loop.sock_recv(sock, BANNER_BYTES), timeout)
+    except (asyncio.TimeoutError, OSError):
+        return b""
+
+
+async def probe_port(host, port, timeout=CONNECT_TIMEOUT, banner_timeout=BANNER_TIMEOUT, read_banner=True):
+    # Plain non-blocking sockets rather than asyncio streams: most ports are
+    # closed, and skipping the StreamReader/Writer setup keeps a full
+    # 1-65535 sweep CPU-light.
+    loop = asyncio.get_running_loop()
+    result = {"port": port, "state": "filtered", "latency_ms": None, "banner": ""}
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    start = loop.time()
+    try:
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (host, port)), timeout)
+        except asyncio.TimeoutError:
+            return result
+        except ConnectionRefusedError:
+            result["state"] = "closed"
+            result["latency_ms"] = round((loop.time() - start) * 1000, 2)
+            return result
+        except OSError as e:
+            result["state"] = "closed" if e.errno == errno.ECONNRESET else "error"
+            return result
+        if sock.getsockname() == sock.getpeername():
+            # TCP simultaneous open onto our own ephemeral port, not a listener.
+            result["state"] = "closed"
+            return result
+        result["state"] = "open"
+        result["latency_ms"] = round((loop.time() - start) * 1000, 2)
+        if read_banner:
+            data = await _recv(loop, sock, banner_timeout)
+            if not data and port in HTTP_PORTS:
+                try:
+                    await loop.sock_sendall(sock, HTTP_PROBE)
+                    data = await _recv(loop, sock, banner_timeout)
+                except OSError:
+                    pass
+            result["banner"] = data.decode("utf-8", "replace").strip()
+        return result
+    finally:
+        sock.close()
+
+
+async def connect_scan(host, ports, concurrency=DEFAULT_CONCURRENCY, timeout=CONNECT_TIMEOUT,
+                       banner_timeout=BANNER_TIMEOUT, read_banner=True):
+    # A fixed pool of worker coroutines pulls ports from a shared iterator,
+    # so concurrency is bounded without one task per port.
+    raise_fd_limit(concurrency + 64)
+    results = {}
+    pending = iter(ports)
+
+    async def worker():
+        for port in pending:
+            results[port] = await probe_port(host, port, timeout, banner_timeout, read_banner)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(ports))))))
+    return [results[p] for p in ports]
+
+
+async def syn_scan(host, ports, rate=20000, timeout=CONNECT_TIMEOUT):
+    # Half-open scan: SYNs go out on a raw socket from one source port and a
+    # raw TCP socket collects SYN-ACK (open) / RST (closed). Needs root.
+    loop = asyncio.get_running_loop()
+    src = source_for(host)
+    sport = random.randint(40000, 60000)
+    packet, l4, csum_off = build_template("syn", src, host)
+    word = struct.Struct("!H")
+    csum = patch_checksum(word.unpack_from(packet, csum_off)[0], word.unpack_from(packet, l4)[0], sport)
+    word.pack_into(packet, l4, sport)
+    word.pack_into(packet, csum_off, csum)
+
+    sender = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_RAW)
+    listener = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+    listener.setblocking(False)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    target = socket.inet_aton(host)
+    sent_at = {}
+    results = {}
+    unsent = set()
+
+    def on_readable():
+        while True:
+            try:
+                data = listener.recv(65535)
+            except BlockingIOError:
+                return
+            ihl = (data[0] & 0x0f) * 4
+            if data[12:16] != target or len(data) < ihl + 14:
+                continue
+            rsport, rdport = struct.unpack_from("!HH", data, ihl)
+            flags = data[ihl + 13]
+            if rdport != sport or rsport not in sent_at or rsport in results:
+                continue
+            state = "open" if flags & 0x12 == 0x12 else "closed" if flags & 0x04 else None
+            if state:
+                results[rsport] = (state, round((time.perf_counter() - sent_at[rsport]) * 1000, 2))
+
+    loop.add_reader(listener.fileno(), on_readable)
+    try:
+        start = time.perf_counter()
+        for i, port in enumerate(ports):
+            due = start + i / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            csum = patch_checksum(word.unpack_from(packet, csum_off)[0], word.unpack_from(packet, l4 + 2)[0], port)
+            word.pack_into(packet, l4 + 2, port)
+            word.pack_into(packet, csum_off, csum)
+            backoff = SEND_BACKOFF
+            for _ in range(SEND_RETRIES):
+                sent_at[port] = time.perf_counter()
+                try:
+                    sender.sendto(packet, (host, 0))
+                    break
+                except OSError as e:
+                    if e.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                        raise
+                await asyncio.sleep(backoff)
+                # Push the schedule back too, or the backlog goes out as one burst.
+                start += backoff
+                backoff = min(backoff * 2, MAX_SEND_BACKOFF)
+            else:
+                unsent.add(port)
+        await asyncio.sleep(timeout)
+    finally:
+        loop.remove_reader(listener.fileno())
+        sender.close()
+        listener.close()
+    for port in unsent - set(results):
+        results[port] = ("error", None)
+    return [
+        {"port": p, "state": results.get(p, ("filtered", None))[0],
+         "latency_ms": results.get(p, (None, None))[1], "banner": ""}
+        for p in ports
+    ]
+
+
+async def probe(host, ports, mode="connect", concurrency=DEFAULT_CONCURRENCY,
+                timeout=CONNECT_TIMEOUT, banner_timeout=BANNER_TIMEOUT, syn_rate=20000):
+    # SYN mode finds open ports first, then reads banners from those only.
+    if mode == "syn":
+        results = await syn_scan(host, ports, syn_rate, timeout)
+        open_ports = [r["port"] for r in results if r["state"] == "open"]
+        banners = {r["port"]: r for r in await connect_scan(host, open_ports, concurrency, timeout, banner_timeout)}
+        for r in results:
+            if r["port"] in banners:
+                r["banner"] = banners[r["port"]]["banner"]
+        return results
+    return await connect_scan(host, ports, concurrency, timeout, banner_timeout)
+
+
+def run_probe(host, ports, **kwargs):
+    start = time.perf_counter()
+    results = asyncio.run(probe(host, ports, **kwargs))
+    return results, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent asyncio port probe and banner grab")
+    parser.add_argument("--target", default="127.0.0.1")
+    parser.add_argument("--ports", default="1-65535")
+    parser.add_argument("--mode", choices=("connect", "syn"), default="connect")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=CONNECT_TIMEOUT)
+    args = parser.parse_args()
+
+    ports = parse_ports(args.ports)
+    results, elapsed = run_probe(args.target, ports, mode=args.mode,
+                                 concurrency=args.concurrency, timeout=args.timeout)
+    open_ports = [r for r in results if r["state"] == "open"]
+    print(f"[✓] Probed {len(ports)} ports on {args.target} in {elapsed:.2f}s — {len(open_ports)} open")
+    for r in open_ports:
+        print(f"    {r['port']:>5}  {r['latency_ms']} ms  {r['banner'][:60]!r}")
@@ -2,22 +2,29 @@
 import json
 import os
 import base64
+import time
 from datetime import datetime
 import sys
 sys.path.insert(0, "/home/kali/network-baseline-attack-detection/scripts")
 from traffic_analyzer import run_analysis
+import metrics
+
+REPORT_PATH = "../reports/final_report.html"
 
 def img_to_base64(path):
     with open(path, 'rb') as f:
         return base64.b64encode(f.read()).decode('utf-8')
 
-def generate_report():
-    print("\n[*] Running analysis pipeline...")
-    results = run_analysis()
+def generate_report(results=None, report_path=REPORT_PATH):
+    # results: a run_analysis() dict; the latest catalog runs when omitted.
+    if results is None:
+        print("\n[*] Running analysis pipeline...")
+        results = run_analysis()
     if not results:
         print("[!] No results to report.")
         return
 
+    render_start = time.perf_counter()
     baseline = results["baseline"]
     attack = results["attack"]
     dev = results["deviation"]
@@ -30,9 +37,36 @@ def generate_report():
         "Packets Per Second Timeline"
     ]
     chart_imgs = []
-    for chart_path, title in zip(charts, chart_titles):
-        b64 = img_to_base64(chart_path)
-        chart_imgs.append((title, b64))
+    if "chart_png" in results:
+        for png, title in zip(results["chart_png"], chart_titles):
+            chart_imgs.append((title, base64.b64encode(png).decode('utf-8')))
+    else:
+        for chart_path, title in zip(charts, chart_titles):
+            chart_imgs.append((title, img_to_base64(chart_path)))
+
+    model_html = ""
+    for protocol, check in results.get("model_check", {}).items():
+        if check["zscore"] is None:
+            continue
+        badge = "badge-red" if check["anomalous"] else "badge-green"
+        label = "Anomalous" if check["anomalous"] else "Normal"
+        model_html += f"""
+        <tr>
+            <td>{protocol.upper()}</td>
+            <td>{check['rate']}</td>
+            <td>{check['baseline_mean']} &plusmn; {check['baseline_std']}</td>
+            <td>{check['zscore']}</td>
+            <td><span class="{badge}">{label}</span></td>
+        </tr>"""
+    model_section = ""
+    if model_html:
+        model_section = f"""<div class="section">
+<h2>Rolling Baseline Check (3&sigma;)</h2>
+<table>
+<tr><th>Protocol</th><th>Attack PPS</th><th>Baseline PPS (mean &plusmn; std)</th><th>Z-Score</th><th>Status</th></tr>
+{model_html}
+</table>
+</div>"""
 
     attacks_html = ""
     for a in attack.get("attacks_performed", []):
@@ -44,6 +78,54 @@ def generate_report():
             <td>{a.get('start_time','N/A')[:19].replace('T',' ')}</td>
         </tr>"""
 
+    windows_html = ""
+    windows = results.get("windows")
+    for rank, w in enumerate((windows or {}).get("ranked_windows", []), 1):
+        badge = "badge-red" if w["score"] > windows["z_threshold"] else "badge-green"
+        top = ", ".join(f"{name.replace('_', ' ')} z={m['z']}" for name, m in w["top"].items())
+        windows_html += f"""
+        <tr>
+            <td>{rank}</td>
+            <td>+{w['offset_s']:g}s</td>
+            <td>{w['label'].replace('_',' ').title()}</td>
+            <td>{w['packets']}</td>
+            <td><span class="{badge}">{w['score']}</span></td>
+            <td>{top}</td>
+        </tr>"""
+    windows_section = ""
+    if windows_html:
+        windows_section = f"""<div class="section">
+<h2>Ranked Anomalous Windows ({windows['window_seconds']:g}s)</h2>
+<p style="color:#aaa;margin-bottom:15px;">{windows['anomalous_windows']} of {windows['attack_windows']} windows beyond {windows['z_threshold']}&sigma; of the baseline's {windows['baseline_windows']} windows, on packet/protocol rates, src/dst/port entropy and port/protocol KL and chi-square divergence.</p>
+<table>
+<tr><th>#</th><th>Offset</th><th>During</th><th>Packets</th><th>Score (max |z|)</th><th>Top Deviations</th></tr>
+{windows_html}
+</table>
+</div>"""
+
+    segments_html = ""
+    for s in results.get("segments") or []:
+        badge = "badge-green" if s["type"] == "between_attacks" else "badge-red"
+        ports = ", ".join(str(p) for p in list(s["top_dst_ports"])[:5]) or "-"
+        segments_html += f"""
+        <tr>
+            <td><span class="{badge}">{s['type'].replace('_',' ').title()}</span></td>
+            <td>{s['packets']}</td>
+            <td>{s['tcp_packets']} / {s['udp_packets']} / {s['icmp_packets']}</td>
+            <td>{s['peak_pps']}</td>
+            <td>{s['mean_pps']}</td>
+            <td>{s['unique_dst_ports']} ({ports})</td>
+        </tr>"""
+    segments_section = ""
+    if segments_html:
+        segments_section = f"""<div class="section">
+<h2>Per-Attack Breakdown</h2>
+<table>
+<tr><th>Segment</th><th>Packets</th><th>TCP / UDP / ICMP</th><th>Peak PPS</th><th>Mean PPS</th><th>Dst Ports (top)</th></tr>
+{segments_html}
+</table>
+</div>"""
+
     html = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -101,7 +183,7 @@ footer{{text-align:center;padding:30px;color:#555;border-top:1px solid #2d3561;m
 <div class="stat-card"><div class="value" style="color:#2196f3">{baseline['tcp_packets']}</div><div class="label">TCP Packets</div></div>
 <div class="stat-card"><div class="value" style="color:#4caf50">{baseline['udp_packets']}</div><div class="label">UDP Packets</div></div>
 <div class="stat-card"><div class="value" style="color:#ff9800">{baseline['icmp_packets']}</div><div class="label">ICMP Packets</div></div>
-<div class="stat-card"><div class="value">{len(baseline['unique_src_ips'])}</div><div class="label">Unique Source IPs</div></div>
+<div class="stat-card"><div class="value">{baseline.get('unique_src_count', len(baseline['unique_src_ips']))}</div><div class="label">Unique Source IPs</div></div>
 </div>
 </div>
 
@@ -112,7 +194,7 @@ footer{{text-align:center;padding:30px;color:#555;border-top:1px solid #2d3561;m
 <div class="stat-card"><div class="value" style="color:#f44336">{attack['tcp_packets']}</div><div class="label">TCP Packets</div></div>
 <div class="stat-card"><div class="value" style="color:#f44336">{attack['udp_packets']}</div><div class="label">UDP Packets</div></div>
 <div class="stat-card"><div class="value" style="color:#f44336">{attack['icmp_packets']}</div><div class="label">ICMP Packets</div></div>
-<div class="stat-card"><div class="value" style="color:#f44336">{len(attack['unique_src_ips'])}</div><div class="label">Unique Source IPs</div></div>
+<div class="stat-card"><div class="value" style="color:#f44336">{attack.get('unique_src_count', len(attack['unique_src_ips']))}</div><div class="label">Unique Source IPs</div></div>
 </div>
 <br>
 <table>
@@ -120,6 +202,7 @@ footer{{text-align:center;padding:30px;color:#555;border-top:1px solid #2d3561;m
 {attacks_html}
 </table>
 </div>
+{segments_section}
 
 <div class="section">
 <h2>Behavioral Deviation Analysis</h2>
@@ -132,6 +215,8 @@ footer{{text-align:center;padding:30px;color:#555;border-top:1px solid #2d3561;m
 </div>
 </div>
 
+{model_section}
+{windows_section}
 <div class="section">
 <h2>Visual Analysis</h2>
 <div class="chart-grid">
@@ -176,10 +261,11 @@ footer{{text-align:center;padding:30px;color:#555;border-top:1px solid #2d3561;m
 </body>
 </html>"""
 
-    os.makedirs("../reports", exist_ok=True)
-    report_path = "../reports/final_report.html"
-    with open(report_path, 'w') as f:
-        f.write(html)
+    metrics.REGISTRY.record_stage("report_render", time.perf_counter() - render_start)
+    with metrics.stage("report_write"):
+        os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+        with open(report_path, 'w') as f:
+            f.write(html)
 
     print(f"\n[✓] Report saved: {report_path}")
     print("[✓] Open final_report.html in any browser!")
@@ -187,3 +273,4 @@ footer{{text-align:center;padding:30px;color:#555;border-top:1px solid #2d3561;m
 
 if __name__ == "__main__":
     generate_report()
+    metrics.export_analysis()
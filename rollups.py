@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+
+import numpy as np
+
+from capture_catalog import connect, CATALOG_PATH
+from timeseries import series_for_capture
+
+ROLLUP_RESOLUTIONS = (60, 3600)
+MAX_TREND_BUCKETS = 50000
+COUNT_COLUMNS = ("packets", "tcp", "udp", "icmp", "bytes")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    interface TEXT NOT NULL,
+    bucket_ts INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    packets INTEGER NOT NULL,
+    tcp INTEGER NOT NULL,
+    udp INTEGER NOT NULL,
+    icmp INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    PRIMARY KEY (resolution, kind, interface, bucket_ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rolled_up_runs (json_path TEXT PRIMARY KEY);
+"""
+
+_ADD = """
+INSERT INTO rollups (resolution, kind, interface, bucket_ts, seconds, packets, tcp, udp, icmp, bytes)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, kind, interface, bucket_ts) DO UPDATE SET
+    seconds = seconds + excluded.seconds, packets = packets + excluded.packets,
+    tcp = tcp + excluded.tcp, udp = udp + excluded.udp,
+    icmp = icmp + excluded.icmp, bytes = bytes + excluded.bytes
+"""
+
+
+def _minute_counts(run, stats):
+    # (minute bucket starts, {column: counts}) for one run, from the feature
+    # sidecar when present, else from the per-second list (totals only).
+    series = series_for_capture(stats, 60.0)
+    if series is not None:
+        buckets = series["start"] + 60 * np.arange(len(series["total"]))
+        return buckets, {"packets": series["total"], "tcp": series["tcp"], "udp": series["udp"],
+                         "icmp": series["icmp"], "bytes": series["bytes"]}
+    pps = np.asarray(stats.get("packets_per_second", []), dtype=np.int64)
+    if run["start_ts"] is None or len(pps) == 0:
+        return np.empty(0), {}
+    seconds = run["start_ts"] + np.arange(len(pps))
+    buckets, index = np.unique(np.floor(seconds / 60) * 60, return_inverse=True)
+    zeros = np.zeros(len(buckets), dtype=np.int64)
+    return buckets, {"packets": np.bincount(index, weights=pps, minlength=len(buckets)),
+                     "tcp": zeros, "udp": zeros, "icmp": zeros, "bytes": zeros}
+
+
+def run_rollups(run):
+    # {resolution: rows} ready for _ADD. "seconds" is how much of each bucket
+    # the run covered, so rates stay right for buckets a run only touches.
+    with open(run["json_path"]) as f:
+        stats = json.load(f)
+    minutes, counts = _minute_counts(run, stats)
+    if len(minutes) == 0:
+        return {}
+    start = run["start_ts"] if run["start_ts"] is not None else float(minutes[0])
+    end = run["end_ts"] if run["end_ts"] is not None else float(minutes[-1]) + 60
+    rows = {}
+    for resolution in ROLLUP_RESOLUTIONS:
+        buckets, index = np.unique(np.floor(minutes / resolution) * resolution, return_inverse=True)
+        covered = np.clip(np.minimum(end, buckets + resolution) - np.maximum(start, buckets), 0, resolution)
+        summed = [np.bincount(index, weights=counts[c], minlength=len(buckets)) for c in COUNT_COLUMNS]
+        rows[resolution] = [
+            (resolution, run["kind"], run["interface"] or "", int(b), float(s)) + tuple(int(v[i]) for v in summed)
+            for i, (b, s) in enumerate(zip(buckets, covered))
+        ]
+    return rows
+
+
+def update_rollups(path=CATALOG_PATH):
+    # Folds every catalogued run not yet rolled up into the 1 min / 1 h
+    # tables. Each run is added exactly once, in its own transaction.
+    conn = connect(path)
+    conn.executescript(SCHEMA)
+    pending = conn.execute(
+        "SELECT runs.* FROM runs LEFT JOIN rolled_up_runs USING (json_path) "
+        "WHERE rolled_up_runs.json_path IS NULL ORDER BY start_ts"
+    ).fetchall()
+    done = 0
+    for run in pending:
+        try:
+            rows = run_rollups(run) if os.path.exists(run["json_path"]) else {}
+        except (OSError, ValueError) as e:
+            print(f"[!] Skipping rollup for {run['json_path']}: {e}")
+            continue
+        with conn:
+            for resolution_rows in rows.values():
+                conn.executemany(_ADD, resolution_rows)
+            conn.execute("INSERT INTO rolled_up_runs (json_path) VALUES (?)", (run["json_path"],))
+        done += 1
+    conn.close()
+    return done
+
+
+def pick_resolution(since, until):
+    for resolution in ROLLUP_RESOLUTIONS:
+        if (until - since) / resolution <= MAX_TREND_BUCKETS:
+            return resolution
+    return ROLLUP_RESOLUTIONS[-1]
+
+
+def trend_series(kind, since, until, interface=None, resolution=None, path=CATALOG_PATH):
+    # Buckets that have data in [since, until): bucket start, covered
+    # seconds and counts, summed over interfaces unless one is given.
+    # Interfaces are captured side by side, so covered time is the longest
+    # any of them covered, not their sum; packets/seconds is then the
+    # combined rate.
+    resolution = resolution or pick_resolution(since, until)
+    sql = ("SELECT bucket_ts, MAX(seconds), SUM(packets), SUM(tcp), SUM(udp), SUM(icmp), SUM(bytes) "
+           "FROM rollups WHERE resolution = ? AND kind = ? AND bucket_ts >= ? AND bucket_ts < ?")
+    params = [resolution, kind, int(since // resolution * resolution), until]
+    if interface is not None:
+        sql += " AND interface = ?"
+        params.append(interface)
+    sql += " GROUP BY bucket_ts ORDER BY bucket_ts"
+    conn = connect(path)
+    conn.executescript(SCHEMA)
+    try:
+        rows = np.array(conn.execute(sql, params).fetchall(), dtype=np.float64).reshape(-1, 7)
+    finally:
+        conn.close()
+    return {
+        "resolution": resolution,
+        "bucket_ts": rows[:, 0],
+        "seconds": rows[:, 1],
+        **{name: rows[:, i + 2] for i, name in enumerate(COUNT_COLUMNS)},
+    }
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else CATALOG_PATH
+    print(f"[✓] Rolled up {update_rollups(path)} new runs into {path}")
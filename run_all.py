@@ -44,7 +44,9 @@ print("\n" + "="*55)
 print("  PHASE 3: REPORT GENERATION")
 print("="*55)
 from report_generator import generate_report
+from metrics import export_analysis
 report_path = generate_report()
+export_analysis()
 
 print("""
 ╔══════════════════════════════════════════════════════╗
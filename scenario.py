@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing.managers import SyncManager
+from datetime import datetime
+
+from attack_simulator import (
+    attack_port_scan, attack_syn_flood, attack_icmp_flood, attack_udp_flood,
+    attack_banner_grab, attack_replay, session_options, OUTPUT_DIR, TARGET_IP, FLOOD_BURST,
+)
+from capture_session import start_sessions, write_summary, get_interface
+from packet_generator import PacketGenerator, KINDS as GENERATOR_KINDS
+from rollups import update_rollups
+
+WORKER_MODES = ("thread", "process")
+WORKER_MODE = "thread"
+# Capture before the first attack and after the last one, so the windows
+# have quiet traffic on both sides.
+LEAD_IN = 2.0
+TAIL = 3.0
+# Upper bound on the capture; it normally ends as soon as the scenario does.
+MAX_SECONDS = 3600
+# Process workers are spawned and imported before t=0 so the first
+# attacks don't start late by an interpreter start-up.
+WARMUP_SECONDS = 0.2
+FLOODS = {"syn_flood": attack_syn_flood, "icmp_flood": attack_icmp_flood, "udp_flood": attack_udp_flood}
+TYPES = ("port_scan", "banner_grab", "pcap_replay", "background") + tuple(FLOODS)
+EXAMPLE_SCENARIO = {
+    "name": "overlapping_floods",
+    "max_workers": 4,
+    "attacks": [
+        {"type": "background", "start": 0, "duration": 40, "kind": "udp", "rate": 50},
+        {"type": "port_scan", "start": 3, "ports": "1-1000"},
+        {"type": "syn_flood", "start": 10, "duration": 5, "rate": 2000},
+        {"type": "icmp_flood", "start": 12, "duration": 5, "rate": 500},
+        {"type": "udp_flood", "start": 22, "duration": 5, "rate": 1000},
+        {"type": "banner_grab", "start": 30},
+    ],
+}
+
+
+def load_scenario(path):
+    # JSON, or YAML when the file says so and PyYAML is installed.
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("YAML scenarios need PyYAML (pip install pyyaml); JSON ones don't")
+            scenario = yaml.safe_load(f)
+        else:
+            scenario = json.load(f)
+    return validate_scenario(scenario)
+
+
+def validate_scenario(scenario):
+    # Checks every entry up front, so a typo fails before capture starts
+    # rather than halfway through the run. Returns entries sorted by start.
+    attacks = scenario.get("attacks") if isinstance(scenario, dict) else None
+    if not attacks:
+        raise ValueError("scenario needs a non-empty 'attacks' list")
+    for i, entry in enumerate(attacks):
+        kind = entry.get("type")
+        if kind not in TYPES:
+            raise ValueError(f"attack {i}: unknown type {kind!r}, expected one of {TYPES}")
+        if not isinstance(entry.get("start"), (int, float)) or entry["start"] < 0:
+            raise ValueError(f"attack {i} ({kind}): 'start' must be an offset in seconds >= 0")
+        if kind in FLOODS or kind == "background":
+            if entry.get("duration") is None and entry.get("count") is None and not entry.get("pcap"):
+                raise ValueError(f"attack {i} ({kind}): needs a duration or a count")
+        if kind == "background" and not entry.get("pcap") and entry.get("kind", "udp") not in GENERATOR_KINDS:
+            raise ValueError(f"attack {i}: background kind must be one of {GENERATOR_KINDS}")
+        if kind == "pcap_replay" and not entry.get("pcap"):
+            raise ValueError(f"attack {i}: pcap_replay needs 'pcap'")
+    scenario = dict(scenario)
+    scenario["attacks"] = sorted(attacks, key=lambda e: e["start"])
+    if int(scenario.get("max_workers") or len(attacks)) < 1:
+        raise ValueError("max_workers must be >= 1")
+    return scenario
+
+
+def _pcaps(entry):
+    return [entry["pcap"]] if isinstance(entry["pcap"], str) else list(entry["pcap"])
+
+
+def run_background(entry, stop=None):
+    # Steady traffic the attacks sit on top of: a replayed capture, or the
+    # generator at a low rate. Kept out of the ground truth.
+    if entry.get("pcap"):
+        record = attack_replay(_pcaps(entry), entry.get("speed", 1.0), entry.get("pps"), stop=stop)
+    else:
+        start = datetime.now().isoformat()
+        result = PacketGenerator(TARGET_IP, entry.get("kind", "udp"), rate=entry.get("rate", 0),
+                                 duration=entry.get("duration"), count=entry.get("count"),
+                                 burst=entry.get("burst", FLOOD_BURST), stop=stop).run()
+        record = {"target": TARGET_IP, **result, "start_time": start, "end_time": datetime.now().isoformat()}
+    record["type"] = "background"
+    return record
+
+
+def run_entry(entry, stop=None):
+    # stop reaches the generator and replayer entries; a port scan or
+    # banner grab is short and runs to completion.
+    kind = entry["type"]
+    if kind in FLOODS:
+        return FLOODS[kind](entry.get("count"), entry.get("rate", 0), entry.get("duration"), stop)
+    if kind == "port_scan":
+        return attack_port_scan(entry.get("ports", "1-1000"))
+    if kind == "banner_grab":
+        return attack_banner_grab(entry.get("ports"), entry.get("mode", "connect"))
+    if kind == "pcap_replay":
+        return attack_replay(_pcaps(entry), entry.get("speed", 1.0), entry.get("pps"),
+                             entry.get("iface", "lo"), stop)
+    return run_background(entry, stop)
+
+
+def run_at(entry, due, stop):
+    # Worker body: sleep until the entry's wall-clock start, run it, and
+    # note how late it actually began. Nothing runs once stop is set.
+    delay = due - time.time()
+    if (delay > 0 and stop.wait(delay)) or stop.is_set():
+        return None
+    began = time.time()
+    record = run_entry(entry, stop)
+    record["name"] = entry.get("name", entry["type"])
+    record["scheduled_start"] = datetime.fromtimestamp(due).isoformat()
+    record["start_lag_ms"] = round((began - due) * 1000, 2)
+    return record
+
+
+def open_pool(mode, workers):
+    # (pool, stop event shared with its workers, manager or None). Setting
+    # the event ends running floods and replays and skips pending entries.
+    if mode not in WORKER_MODES:
+        raise ValueError(f"worker mode must be one of {WORKER_MODES}")
+    if mode == "thread":
+        return ThreadPoolExecutor(workers), threading.Event(), None
+    # forkserver: the capture threads are already running, and forking
+    # a process mid-capture could copy a held lock into the child.
+    # Ctrl-C reaches the whole process group; the workers and the manager
+    # holding the event ignore it and stop when the main process says so.
+    context = multiprocessing.get_context("forkserver")
+    manager = SyncManager(ctx=context)
+    manager.start(signal.signal, (signal.SIGINT, signal.SIG_IGN))
+    pool = ProcessPoolExecutor(workers, mp_context=context, initializer=signal.signal,
+                               initargs=(signal.SIGINT, signal.SIG_IGN))
+    list(pool.map(time.sleep, [WARMUP_SECONDS] * workers))
+    return pool, manager.Event(), manager
+
+
+def ground_truth(records, t0):
+    truth = []
+    for r in records:
+        start = datetime.fromisoformat(r["start_time"]).timestamp()
+        end = datetime.fromisoformat(r["end_time"]).timestamp()
+        truth.append({
+            "name": r["name"],
+            "type": r["type"],
+            "start_time": r["start_time"],
+            "end_time": r["end_time"],
+            "start_offset_s": round(start - t0, 3),
+            "end_offset_s": round(end - t0, 3),
+            "duration_s": round(end - start, 3),
+            "start_lag_ms": r["start_lag_ms"],
+        })
+    return truth
+
+
+def play(scenario, pool, t0, stop):
+    # Submits every entry at once in start order; each worker sleeps until
+    # its own start. With FIFO hand-out an entry only waits on a slot held
+    # by one that started before it, so max_workers caps concurrency
+    # without reordering anything.
+    futures = [pool.submit(run_at, entry, t0 + entry["start"], stop) for entry in scenario["attacks"]]
+    records = []
+    for entry, future in zip(scenario["attacks"], futures):
+        try:
+            record = future.result()
+        except Exception as e:
+            print(f"  [!] {entry.get('name', entry['type'])} failed: {e}")
+            continue
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def run_scenario(scenario, interfaces=None, worker_mode=WORKER_MODE, lead_in=LEAD_IN, tail=TAIL,
+                 max_seconds=MAX_SECONDS):
+    # Captures for exactly as long as the scenario runs (plus lead-in and
+    # tail) and writes each attack's real start/end into the stats JSON.
+    if isinstance(scenario, str):
+        source, scenario = scenario, load_scenario(scenario)
+    else:
+        source, scenario = None, validate_scenario(scenario)
+    interfaces = interfaces or [get_interface()]
+    workers = int(scenario.get("max_workers") or len(scenario["attacks"]))
+    name = scenario.get("name", "scenario")
+    print(f"\n[*] Scenario {name}: {len(scenario['attacks'])} entries, up to {workers} at once "
+          f"({worker_mode} workers) — target: localhost (SAFE)")
+
+    pool, stop, manager = open_pool(worker_mode, workers)
+    sessions = start_sessions("attack", interfaces, OUTPUT_DIR, max_seconds, **session_options())
+    t0 = None
+    try:
+        time.sleep(lead_in)
+        t0 = time.time()
+        records = play(scenario, pool, t0, stop)
+        completed = time.time()
+        print(f"\n[*] Scenario finished after {completed - t0:.1f}s, capturing {tail:g}s more...")
+        time.sleep(tail)
+    except KeyboardInterrupt:
+        print("\n[!] Interrupted, stopping attacks and capture")
+        records, completed = [], time.time()
+        for session in sessions:
+            session.stop_reason = "interrupted"
+    finally:
+        # Running entries see the event and return, so waiting is short
+        # and nothing is still sending once the sessions are finished.
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+        for session in sessions:
+            session.stop()
+
+    attacks = sorted((r for r in records if r["type"] != "background"), key=lambda r: r["start_time"])
+    background = [r for r in records if r["type"] == "background"]
+    info = {
+        "name": name,
+        "file": os.path.abspath(source) if source else None,
+        "worker_mode": worker_mode,
+        "max_workers": workers,
+        "entries": scenario["attacks"],
+        "started_at": datetime.fromtimestamp(t0).isoformat() if records else None,
+        "completed_at": datetime.fromtimestamp(completed).isoformat(),
+        "lead_in_s": lead_in,
+        "tail_s": tail,
+        "failed": len(scenario["attacks"]) - len(records),
+        "max_start_lag_ms": max((r["start_lag_ms"] for r in records), default=None),
+        "background": background,
+    }
+    json_files = []
+    for session in sessions:
+        session.stats["attacks_performed"] = attacks
+        session.stats["ground_truth"] = ground_truth(attacks, t0) if records else []
+        session.stats["scenario"] = info
+        json_files.append(session.finish())
+    update_rollups()
+    if info["max_start_lag_ms"] is not None:
+        print(f"[✓] Worst start lag: {info['max_start_lag_ms']} ms")
+    if len(json_files) > 1:
+        return write_summary("attack", json_files, OUTPUT_DIR)
+    return json_files[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a declarative attack scenario while capturing")
+    parser.add_argument("scenario", nargs="?", help="JSON or YAML scenario file (default: built-in example)")
+    parser.add_argument("-i", "--iface", action="append", help="repeat for several interfaces (default: route)")
+    parser.add_argument("--workers", choices=WORKER_MODES, default=WORKER_MODE)
+    parser.add_argument("--lead-in", type=float, default=LEAD_IN)
+    parser.add_argument("--tail", type=float, default=TAIL)
+    parser.add_argument("--print-example", action="store_true", help="print the example scenario as JSON and exit")
+    args = parser.parse_args()
+
+    if args.print_example:
+        print(json.dumps(EXAMPLE_SCENARIO, indent=2))
+    else:
+        run_scenario(args.scenario or EXAMPLE_SCENARIO, args.iface, args.workers, args.lead_in, args.tail)
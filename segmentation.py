@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from feature_store import load_features
+from pcap_reader import PROTO_TCP, PROTO_UDP, PROTO_ICMP
+
+SEGMENT_GRACE = 1.0
+SEGMENT_RESOLUTION = 1.0
+TOP_PORTS = 20
+BACKGROUND = "between_attacks"
+
+
+def _ts(value):
+    return datetime.fromisoformat(value).timestamp() if isinstance(value, str) else float(value)
+
+
+def attack_windows(attacks, grace=SEGMENT_GRACE):
+    # [start, end) windows sorted by start, each end extended by grace
+    # seconds for replies still in flight. Windows keep their real extents,
+    # so overlapping attacks give overlapping windows.
+    attacks = sorted(attacks, key=lambda a: _ts(a["start_time"]))
+    starts = np.array([_ts(a["start_time"]) for a in attacks], dtype=np.float64)
+    ends = np.array([_ts(a["end_time"]) + grace for a in attacks], dtype=np.float64)
+    return attacks, starts, ends
+
+
+def segment_masks(ts, starts, ends):
+    # One row per attack window selecting the packets inside it (a packet
+    # belongs to every window that contains it), plus a last row for the
+    # background bucket: packets outside all windows.
+    ts = np.asarray(ts, dtype=np.float64)
+    masks = np.empty((len(starts) + 1, len(ts)), dtype=bool)
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        masks[i] = (ts >= start) & (ts < end)
+    masks[-1] = ~masks[:-1].any(axis=0)
+    return masks
+
+
+def segment_features(features, attacks, resolution=SEGMENT_RESOLUTION, grace=SEGMENT_GRACE):
+    # Packets in overlapping windows count towards each of those attacks,
+    # so attack segments may add up to more than the capture.
+    attacks, starts, ends = attack_windows(attacks, grace)
+    ts = np.asarray(features["ts"], dtype=np.float64)
+    proto = np.asarray(features["proto"])
+    dport = np.asarray(features["dport"], dtype=np.int64)
+    src = np.asarray(features["src"])
+    length = np.asarray(features["length"], dtype=np.int64)
+    l4 = (proto == PROTO_TCP) | (proto == PROTO_UDP)
+
+    segments = []
+    for i, mask in enumerate(segment_masks(ts, starts, ends)):
+        seg_ts = ts[mask]
+        seg_proto = proto[mask]
+        # pps curves: attack bins start at their window, background bins at
+        # its first packet.
+        if i < len(attacks):
+            origin = starts[i]
+            bins_total = max(int(np.ceil((ends[i] - starts[i]) / resolution)), 1)
+            info = {"type": attacks[i].get("type", f"attack_{i}"),
+                    "start_time": attacks[i]["start_time"], "end_time": attacks[i]["end_time"]}
+        else:
+            origin = seg_ts.min() if len(seg_ts) else 0.0
+            bins_total = 0
+            info = {"type": BACKGROUND}
+        bins = np.floor((seg_ts - origin) / resolution).astype(np.int64)
+        curve = np.bincount(bins, minlength=bins_total)
+        if bins_total:
+            curve = curve[:bins_total]
+        ports, port_counts = np.unique(dport[mask & l4], return_counts=True)
+        order = np.argsort(-port_counts, kind="stable")[:TOP_PORTS]
+        info.update({
+            "packets": int(len(seg_ts)),
+            "tcp_packets": int(np.count_nonzero(seg_proto == PROTO_TCP)),
+            "udp_packets": int(np.count_nonzero(seg_proto == PROTO_UDP)),
+            "icmp_packets": int(np.count_nonzero(seg_proto == PROTO_ICMP)),
+            "bytes": int(length[mask].sum()),
+            "unique_src_ips": int(len(np.unique(src[mask]))),
+            "unique_dst_ports": int(len(ports)),
+            "top_dst_ports": {int(p): int(c) for p, c in zip(ports[order], port_counts[order])},
+            "peak_pps": round(float(curve.max()) / resolution, 2) if len(curve) else 0.0,
+            "mean_pps": round(float(curve.mean()) / resolution, 2) if len(curve) else 0.0,
+            "pps": (curve / resolution).tolist(),
+        })
+        segments.append(info)
+    return segments
+
+
+def segment_capture(stats, resolution=SEGMENT_RESOLUTION):
+    # Segments for an attack capture JSON; None without a feature sidecar.
+    path = stats.get("features_file") if stats else None
+    if not path or not os.path.exists(path) or not stats.get("attacks_performed"):
+        return None
+    return segment_features(load_features(path), stats["attacks_performed"], resolution)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: segmentation.py <attack_stats.json>")
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        segments = segment_capture(json.load(f))
+    if segments is None:
+        print("[!] Needs a features_file and attacks_performed in the stats JSON")
+        sys.exit(1)
+    for s in segments:
+        print(f"[✓] {s['type']:<16} {s['packets']:>8} pkts  TCP {s['tcp_packets']:>7}  UDP {s['udp_packets']:>7}  "
+              f"ICMP {s['icmp_packets']:>7}  peak {s['peak_pps']:>9} pkt/s  ports {s['unique_dst_ports']}")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+import base64
+import hashlib
+import heapq
+import math
+import socket
+import struct
+import zlib
+
+_MASK64 = (1 << 64) - 1
+
+
+def hash64(item):
+    # Stable across processes (unlike hash()), so sketches built in
+    # different workers can be merged.
+    if isinstance(item, int):
+        z = (item + 0x9e3779b97f4a7c15) & _MASK64
+        z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & _MASK64
+        return z ^ (z >> 31)
+    if isinstance(item, str):
+        item = item.encode()
+    return int.from_bytes(hashlib.blake2b(item, digest_size=8).digest(), "little")
+
+
+class SpaceSaving:
+    # Top-k heavy hitters with k counters (Metwally et al.). For a stream of
+    # N items every reported count overestimates the true count by at most
+    # its recorded error, and error <= N / k. Any item whose true frequency
+    # exceeds N / k is guaranteed to be tracked.
+    def __init__(self, k=64):
+        self.k = k
+        self.n = 0
+        self.counts = {}
+        self.errors = {}
+        self._heap = []
+
+    def add(self, item, weight=1):
+        self.n += weight
+        counts = self.counts
+        if item in counts:
+            counts[item] += weight
+        elif len(counts) < self.k:
+            counts[item] = weight
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (weight, item))
+        else:
+            floor, victim = self._pop_min()
+            del counts[victim]
+            del self.errors[victim]
+            counts[item] = floor + weight
+            self.errors[item] = floor
+            heapq.heappush(self._heap, (counts[item], item))
+
+    def _pop_min(self):
+        # The heap holds one entry per tracked item. Increments don't touch
+        # it, so an entry may be stale (too low); refresh it and retry.
+        heap = self._heap
+        while True:
+            count, item = heapq.heappop(heap)
+            current = self.counts[item]
+            if current == count:
+                return count, item
+            heapq.heappush(heap, (current, item))
+
+    def top(self, n=None):
+        items = sorted(self.counts.items(), key=lambda x: x[1], reverse=True)
+        return items[:n] if n else items
+
+    def max_error(self):
+        return self.n // self.k
+
+    def merge(self, other):
+        # Mergeable summaries (Agarwal et al.): error bounds add up.
+        combined = dict(self.counts)
+        errors = dict(self.errors)
+        for item, count in other.counts.items():
+            combined[item] = combined.get(item, 0) + count
+            errors[item] = errors.get(item, 0) + other.errors[item]
+        keep = sorted(combined.items(), key=lambda x: x[1], reverse=True)[:self.k]
+        self.counts = dict(keep)
+        self.errors = {item: errors[item] for item in self.counts}
+        self.n += other.n
+        self._heap = [(c, i) for i, c in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+
+class HyperLogLog:
+    # Distinct-count estimate in 2**p bytes. Relative standard error is
+    # 1.04 / sqrt(2**p): p=14 -> 16 KiB, ~0.81%.
+    def __init__(self, p=14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self._shift = 64 - p
+        self._rest_mask = (1 << self._shift) - 1
+        self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, item):
+        h = hash64(item)
+        index = h >> self._shift
+        rest = h & self._rest_mask
+        rank = self._shift - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = self.m
+        estimate = self.alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            return int(round(m * math.log(m / zeros)))
+        return int(round(estimate))
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def merge(self, other):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+
+    def dump(self):
+        # Registers as text for a stats JSON (zlib + base64, a few KiB), so
+        # sessions captured apart can still be merged into one count.
+        return base64.b64encode(zlib.compress(bytes(self.registers))).decode("ascii")
+
+    @classmethod
+    def load(cls, data, p=14):
+        hll = cls(p)
+        registers = zlib.decompress(base64.b64decode(data))
+        if len(registers) != hll.m:
+            raise ValueError(f"expected {hll.m} HLL registers, got {len(registers)}")
+        hll.registers = bytearray(registers)
+        return hll
+
+
+def ip_to_int(ip):
+    return struct.unpack("!I", socket.inet_aton(ip))[0]
+
+
+class TrafficSketch:
+    # Fixed-memory replacement for seen_src/seen_dst and port_frequency.
+    def __init__(self, top_k=64, hll_precision=14):
+        self.ports = SpaceSaving(top_k)
+        self.talkers = SpaceSaving(top_k)
+        self.src = HyperLogLog(hll_precision)
+        self.dst = HyperLogLog(hll_precision)
+
+    def add_ips(self, src, dst):
+        self.talkers.add(src)
+        self.src.add(ip_to_int(src))
+        self.dst.add(ip_to_int(dst))
+
+    def add_port(self, port):
+        self.ports.add(port)
+
+    def summary(self, top_n=20):
+        # Distinct-count estimates go in unique_*_count and heavy hitters in
+        # top_talkers; there are no exact unique_*_ips lists in sketch mode.
+        return {
+            "unique_src_count": self.src.count(),
+            "unique_dst_count": self.dst.count(),
+            "port_frequency": dict(self.ports.top(top_n)),
+            "top_talkers": dict(self.talkers.top(top_n)),
+            "sketch": {
+                "top_k": self.ports.k,
+                "top_n": top_n,
+                "port_max_overcount": self.ports.max_error(),
+                "talker_max_overcount": self.talkers.max_error(),
+                "hll_precision": self.src.p,
+                "hll_relative_std_error": round(self.src.relative_error(), 5),
+                "src_registers": self.src.dump(),
+                "dst_registers": self.dst.dump(),
+            },
+        }
@@ -0,0 +1,85 @@
+from scapy.all import ARP, Ether, IP, TCP, UDP, ICMP, raw
+
+from capture_filter import compile_bpf, run_bpf, MAX_SNAPLEN
+from pcap_reader import LINKTYPE_RAW
+
+TCP_FRAME = raw(Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=1234, dport=80) / (b"x" * 200))
+UDP_FRAME = raw(Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / UDP(sport=1234, dport=53))
+ICMP_FRAME = raw(Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / ICMP())
+ARP_FRAME = raw(Ether() / ARP())
+
+
+def keep(program, frame, off=0):
+    return run_bpf(program, frame, off, len(frame) - off, len(frame) - off)
+
+
+# Builtin BPF compiler
+
+def test_builtin_tcp_program():
+    assert compile_bpf("tcp") == [
+        (0x28, 0, 0, 12),           # ldh [12]
+        (0x15, 0, 3, 0x0800),       # jeq #0x800
+        (0x30, 0, 0, 23),           # ldb [23]
+        (0x15, 0, 1, 6),            # jeq #6
+        (0x06, 0, 0, MAX_SNAPLEN),  # ret #snaplen
+        (0x06, 0, 0, 0),            # ret #0
+    ]
+
+
+def test_builtin_program_clamps_snaplen():
+    assert compile_bpf("", 96) == [(0x06, 0, 0, 96)]
+    assert compile_bpf("tcp or udp", 96)[-2:] == [(0x06, 0, 0, 96), (0x06, 0, 0, 0)]
+
+
+def test_builtin_filters_select_protocols():
+    frames = {"tcp": TCP_FRAME, "udp": UDP_FRAME, "icmp": ICMP_FRAME, "arp": ARP_FRAME}
+    expected = {
+        "": {"tcp", "udp", "icmp", "arp"},
+        "ip": {"tcp", "udp", "icmp"},
+        "tcp": {"tcp"},
+        "udp": {"udp"},
+        "icmp": {"icmp"},
+        "tcp or udp": {"tcp", "udp"},
+        "TCP  or  UDP or icmp": {"tcp", "udp", "icmp"},
+    }
+    for expr, accepted in expected.items():
+        program = compile_bpf(expr)
+        assert {name for name, frame in frames.items() if keep(program, frame)} == accepted, expr
+
+
+def test_builtin_raw_linktype():
+    program = compile_bpf("udp", 0, LINKTYPE_RAW)
+    assert keep(program, UDP_FRAME, 14) == MAX_SNAPLEN
+    assert keep(program, TCP_FRAME, 14) == 0
+
+
+# Offline cBPF interpreter
+
+def test_run_bpf_returns_snaplen_or_zero():
+    program = compile_bpf("tcp", 64)
+    assert keep(program, TCP_FRAME) == 64
+    assert keep(program, UDP_FRAME) == 0
+
+
+def test_run_bpf_indexed_load():
+    # tcp dst port 80 as tcpdump emits it: ldxb 4*([14]&0xf); ldh [x + 16]
+    program = [(0x30, 0, 0, 23), (0x15, 0, 4, 6), (0xb1, 0, 0, 14), (0x48, 0, 0, 16),
+               (0x15, 0, 1, 80), (0x06, 0, 0, 0xffff), (0x06, 0, 0, 0)]
+    assert keep(program, TCP_FRAME) == 0xffff
+    other = raw(Ether() / IP() / TCP(dport=81))
+    assert keep(program, other) == 0
+
+
+def test_run_bpf_alu_and_return_a():
+    # ld len; sub #14; ret a
+    program = [(0x80, 0, 0, 0), (0x14, 0, 0, 14), (0x16, 0, 0, 0)]
+    assert run_bpf(program, TCP_FRAME, 0, 60, len(TCP_FRAME)) == len(TCP_FRAME) - 14
+    # ld #3; st M[2]; ldx M[2]; ld #10; mul x; ret a
+    program = [(0x00, 0, 0, 3), (0x02, 0, 0, 2), (0x61, 0, 0, 2), (0x00, 0, 0, 10),
+               (0x2c, 0, 0, 0), (0x16, 0, 0, 0)]
+    assert keep(program, TCP_FRAME) == 30
+
+
+def test_run_bpf_out_of_bounds_and_division_by_zero_drop():
+    assert keep([(0x20, 0, 0, len(ARP_FRAME) - 2), (0x06, 0, 0, 1)], ARP_FRAME) == 0
+    assert keep([(0x00, 0, 0, 5), (0x34, 0, 0, 0), (0x06, 0, 0, 1)], ARP_FRAME) == 0
@@ -0,0 +1,26 @@
+import numpy as np
+from scapy.all import Ether, IP, TCP, UDP, ICMP, fragment, rdpcap, wrpcap
+
+from feature_store import FeatureWriter, features_from_pcap, load_features, stats_from_features
+
+
+def test_live_and_offline_features_agree_on_fragments(tmp_path):
+    tcp = fragment(IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=1234, dport=80) / (b"a" * 3000), fragsize=1000)
+    udp = fragment(IP(src="10.0.0.3", dst="10.0.0.2") / UDP(sport=5353, dport=53) / (b"b" * 2000), fragsize=1000)
+    packets = [Ether() / p for p in tcp + udp + [IP(dst="10.0.0.2") / ICMP()]]
+    for i, pkt in enumerate(packets):
+        pkt.time = 1000.0 + i / 10
+    pcap = str(tmp_path / "frags.pcap")
+    wrpcap(pcap, packets)
+
+    writer = FeatureWriter(str(tmp_path / "live_features.npy"))
+    for pkt in rdpcap(pcap):
+        writer.append_packet(pkt)
+    live = load_features(writer.close(), mmap=False)
+    offline = load_features(features_from_pcap(pcap, str(tmp_path / "offline_features.npy")), mmap=False)
+
+    assert np.array_equal(live, offline)
+    stats = stats_from_features(live)
+    assert (stats["tcp_packets"], stats["udp_packets"], stats["icmp_packets"]) == (1, 1, 1)
+    assert stats["total_packets"] == len(packets)
+    assert stats["port_frequency"] == {80: 1}
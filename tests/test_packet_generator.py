@@ -0,0 +1,21 @@
+import random
+import struct
+
+from packet_generator import checksum, patch_checksum
+
+
+def test_patch_checksum_rfc1624_example():
+    # Section 4: m = 0x5555 -> 0x3285 with HC = 0xDD2F gives HC' = 0x0000.
+    assert patch_checksum(0xDD2F, 0x5555, 0x3285) == 0x0000
+
+
+def test_patch_checksum_matches_recomputation():
+    rng = random.Random(7)
+    header = bytearray(struct.pack("!HHHH", 1024, 53, 8, 0) + bytes(rng.randrange(256) for _ in range(12)))
+    csum = checksum(bytes(header))
+    for _ in range(200):
+        old = struct.unpack_from("!H", header, 0)[0]
+        new = rng.randrange(0x10000)
+        struct.pack_into("!H", header, 0, new)
+        csum = patch_checksum(csum, old, new)
+        assert csum == checksum(bytes(header))
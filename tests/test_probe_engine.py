@@ -0,0 +1,76 @@
+import asyncio
+import errno
+import socket
+
+import probe_engine
+from probe_engine import connect_scan, parse_ports, syn_scan
+
+
+def test_parse_ports():
+    assert parse_ports("22,80-82,443") == [22, 80, 81, 82, 443]
+
+
+def test_connect_scan_against_stand_in_listeners():
+    # Stand-in listeners on ephemeral localhost ports, half of them sending
+    # a banner, plus a port nobody listens on.
+    async def with_banner(reader, writer):
+        writer.write(b"SSH-2.0-StandIn_1.0\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def silent(reader, writer):
+        await asyncio.sleep(0.2)
+        writer.close()
+
+    async def scan():
+        servers = [await asyncio.start_server(with_banner if i % 2 == 0 else silent, "127.0.0.1", 0)
+                   for i in range(20)]
+        ports = [s.sockets[0].getsockname()[1] for s in servers]
+        closed = socket.socket()
+        closed.bind(("127.0.0.1", 0))
+        closed_port = closed.getsockname()[1]
+        closed.close()
+        try:
+            results = await connect_scan("127.0.0.1", ports + [closed_port], banner_timeout=0.3)
+        finally:
+            for s in servers:
+                s.close()
+        return ports, closed_port, {r["port"]: r for r in results}
+
+    ports, closed_port, by_port = asyncio.run(scan())
+    assert all(by_port[p]["state"] == "open" for p in ports)
+    assert by_port[closed_port]["state"] == "closed"
+    assert all(by_port[p]["banner"].startswith("SSH-2.0") for p in ports[::2])
+    assert all(by_port[p]["banner"] == "" for p in ports[1::2])
+
+
+def test_syn_scan_backs_off_on_full_send_buffer(monkeypatch):
+    # The raw sender fails with ENOBUFS/EAGAIN a few times per port, and
+    # always for port 3; the listener is a socketpair end that never
+    # receives anything. No root needed.
+    real_socket = socket.socket
+    socketpair = socket.socketpair
+    attempts = []
+
+    class Sender:
+        def sendto(self, packet, dest):
+            port = int.from_bytes(packet[22:24], "big")
+            attempts.append(port)
+            if port == 3 or attempts.count(port) < 3:
+                raise OSError(errno.ENOBUFS if port % 2 else errno.EAGAIN, "buffer full")
+
+        def close(self):
+            pass
+
+    def fake_socket(family=-1, type=-1, proto=-1, fileno=None):
+        if type == socket.SOCK_RAW:
+            return Sender() if proto == socket.IPPROTO_RAW else socketpair()[0]
+        return real_socket(family, type, proto, fileno)
+
+    monkeypatch.setattr(socket, "socket", fake_socket)
+    monkeypatch.setattr(probe_engine, "SEND_BACKOFF", 0.0001)
+    monkeypatch.setattr(probe_engine, "SEND_RETRIES", 4)
+    results = asyncio.run(syn_scan("127.0.0.1", [1, 2, 3, 4], rate=1000, timeout=0.05))
+
+    assert [r["state"] for r in results] == ["filtered", "filtered", "error", "filtered"]
+    assert [attempts.count(p) for p in (1, 2, 3, 4)] == [3, 3, 4, 3]
@@ -0,0 +1,63 @@
+import numpy as np
+
+from segmentation import attack_windows, segment_features, segment_masks, BACKGROUND
+
+
+def test_segment_masks():
+    starts = np.array([10.0, 20.0])
+    ends = np.array([15.0, 25.0])
+    ts = np.array([5.0, 10.0, 14.9, 15.0, 19.0, 20.0, 24.99, 25.0, 30.0])
+    assert segment_masks(ts, starts, ends).astype(int).tolist() == [
+        [0, 1, 1, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 1, 1, 0, 0],
+        [1, 0, 0, 1, 1, 0, 0, 1, 1],
+    ]
+
+
+def test_segment_masks_without_attacks():
+    ts = np.array([1.0, 2.0])
+    assert segment_masks(ts, np.array([]), np.array([])).tolist() == [[True, True]]
+
+
+def test_segment_masks_overlapping_windows():
+    starts = np.array([10.0, 12.0])
+    ends = np.array([16.0, 18.0])
+    ts = np.array([9.0, 11.0, 13.0, 15.5, 17.0, 18.0])
+    assert segment_masks(ts, starts, ends).astype(int).tolist() == [
+        [0, 1, 1, 1, 0, 0],
+        [0, 0, 1, 1, 1, 0],
+        [1, 0, 0, 0, 0, 1],
+    ]
+
+
+def test_attack_windows_keep_real_extents():
+    attacks = [{"start_time": 12.0, "end_time": 17.0}, {"start_time": 10.0, "end_time": 15.0}]
+    _, starts, ends = attack_windows(attacks, grace=1.0)
+    assert starts.tolist() == [10.0, 12.0]
+    assert ends.tolist() == [16.0, 18.0]
+
+
+def test_segment_features_overlapping_attacks():
+    # scenario.EXAMPLE_SCENARIO's shape: a SYN flood at 10-15 s overlapping
+    # an ICMP flood at 12-17 s, 100 pkt/s each, over 1 pkt/s of UDP.
+    syn = np.arange(1000, 1500) / 100
+    icmp = np.arange(1200, 1700) / 100
+    udp = np.arange(25) + 0.5
+    ts = np.concatenate([syn, icmp, udp])
+    proto = np.concatenate([np.full(len(syn), 6), np.full(len(icmp), 1), np.full(len(udp), 17)])
+    dport = np.concatenate([np.full(len(syn), 80), np.zeros(len(icmp), dtype=int), np.full(len(udp), 53)])
+    order = np.argsort(ts, kind="stable")
+    features = {"ts": ts[order], "proto": proto[order], "dport": dport[order],
+                "src": np.zeros(len(ts), dtype=np.uint32), "length": np.full(len(ts), 60)}
+    attacks = [{"type": "syn_flood", "start_time": 10.0, "end_time": 15.0},
+               {"type": "icmp_flood", "start_time": 12.0, "end_time": 17.0}]
+    syn_seg, icmp_seg, background = segment_features(features, attacks, grace=0.0)
+    assert syn_seg["type"] == "syn_flood"
+    assert syn_seg["tcp_packets"] == 500
+    assert syn_seg["icmp_packets"] == 300
+    assert icmp_seg["icmp_packets"] == 500
+    assert icmp_seg["tcp_packets"] == 300
+    assert len(syn_seg["pps"]) == 5 and syn_seg["pps"][0] == 101.0
+    assert background["type"] == BACKGROUND
+    assert background["packets"] == 18
+    assert background["tcp_packets"] == background["icmp_packets"] == 0
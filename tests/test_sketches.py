@@ -0,0 +1,53 @@
+import random
+
+from sketches import HyperLogLog, SpaceSaving, TrafficSketch
+
+
+def test_hyperloglog_within_error_bound():
+    for n in (1000, 200000):
+        hll = HyperLogLog(14)
+        for i in range(n):
+            hll.add(i)
+        assert abs(hll.count() - n) <= 3 * hll.relative_error() * n, n
+
+
+def test_hyperloglog_merge_and_dump_round_trip():
+    a, b, both = HyperLogLog(12), HyperLogLog(12), HyperLogLog(12)
+    for i in range(20000):
+        (a if i % 2 else b).add(f"10.0.{i >> 8}.{i & 0xff}")
+        both.add(f"10.0.{i >> 8}.{i & 0xff}")
+    assert a.merge(b).registers == both.registers
+    assert HyperLogLog.load(both.dump(), 12).count() == both.count()
+
+
+def test_space_saving_error_bounds():
+    rng = random.Random(1)
+    k = 16
+    sketch = SpaceSaving(k)
+    truth = {}
+    for _ in range(50000):
+        port = min(int(rng.paretovariate(1.2)), 2000)
+        truth[port] = truth.get(port, 0) + 1
+        sketch.add(port)
+    bound = sketch.max_error()
+    assert bound == 50000 // k
+    for port, count in sketch.counts.items():
+        error = sketch.errors[port]
+        assert error <= bound
+        assert truth.get(port, 0) <= count <= truth.get(port, 0) + error
+    heavy = {port for port, count in truth.items() if count > 50000 / k}
+    assert heavy and heavy <= set(sketch.counts)
+
+
+def test_traffic_sketch_summary_keeps_counts_apart_from_talkers():
+    sketch = TrafficSketch(top_k=8)
+    for i in range(100):
+        sketch.add_ips(f"10.0.0.{i % 40}", "10.0.1.1")
+        sketch.add_port(80 if i % 2 else 1000 + i)
+    summary = sketch.summary(top_n=3)
+    assert "unique_src_ips" not in summary and "unique_dst_ips" not in summary
+    assert summary["unique_src_count"] == 40
+    assert summary["unique_dst_count"] == 1
+    assert len(summary["top_talkers"]) == 3
+    assert len(summary["port_frequency"]) == 3 and summary["port_frequency"][80] >= 50
+    assert summary["sketch"]["top_n"] == 3
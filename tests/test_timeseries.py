@@ -0,0 +1,28 @@
+import numpy as np
+
+from parallel_analyzer import ShardStats
+from timeseries import packets_per_second
+
+
+def test_packets_per_second_keeps_empty_and_last_partial_second():
+    ts = [100.2, 100.9, 102.5, 103.1, 103.99]
+    assert packets_per_second(ts) == [2, 0, 1, 2]
+
+
+def test_packets_per_second_spans_capture_window():
+    ts = np.array([101.5, 101.7])
+    assert packets_per_second(ts, start=99.4, end=103.2) == [0, 0, 2, 0, 0]
+
+
+def test_packets_per_second_weights_and_empty_capture():
+    assert packets_per_second([100, 103], 99.5, 103.5, weights=[3, 4]) == [0, 3, 0, 0, 4]
+    assert packets_per_second([], 10.5, 12.0) == [0, 0, 0]
+    assert packets_per_second([]) == []
+
+
+def test_shard_stats_packets_per_second_matches_binning():
+    shard = ShardStats()
+    ts = [100.2, 100.9, 102.5, 103.1, 103.99]
+    for t in ts:
+        shard.add_packet(int(t), 1, 2, 6, 80)
+    assert shard.to_stats()["packets_per_second"] == packets_per_second(ts)
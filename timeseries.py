@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+
+from feature_store import load_features
+from pcap_reader import PROTO_TCP, PROTO_UDP, PROTO_ICMP
+
+MIN_RESOLUTION = 0.01
+MAX_RESOLUTION = 60.0
+PROTOCOLS = {"tcp": PROTO_TCP, "udp": PROTO_UDP, "icmp": PROTO_ICMP}
+# (network, mask) pairs counted as "our side" for direction: RFC 1918,
+# loopback and link-local.
+LOCAL_NETS = (
+    (0x0a000000, 0xff000000),
+    (0xac100000, 0xfff00000),
+    (0xc0a80000, 0xffff0000),
+    (0x7f000000, 0xff000000),
+    (0xa9fe0000, 0xffff0000),
+)
+
+
+def check_resolution(resolution):
+    if not MIN_RESOLUTION <= resolution <= MAX_RESOLUTION:
+        raise ValueError(f"resolution must be between {MIN_RESOLUTION}s and {MAX_RESOLUTION}s, got {resolution}")
+    return float(resolution)
+
+
+def is_local(addrs, local_nets=LOCAL_NETS):
+    addrs = np.asarray(addrs, dtype=np.uint32)
+    local = np.zeros(len(addrs), dtype=bool)
+    for net, mask in local_nets:
+        local |= (addrs & np.uint32(mask)) == np.uint32(net)
+    return local
+
+
+def bin_index(ts, resolution, start):
+    # Bin i covers [start + i*resolution, start + (i+1)*resolution).
+    return np.floor((np.asarray(ts, dtype=np.float64) - start) / resolution).astype(np.int64)
+
+
+def bin_counts(index, length, mask=None, weights=None):
+    if mask is not None:
+        index = index[mask]
+        weights = None if weights is None else weights[mask]
+    return np.bincount(index, weights=weights, minlength=length)[:length]
+
+
+def traffic_series(features, resolution=1.0, start=None, end=None, local_nets=LOCAL_NETS):
+    # Packet counts per bin from the packets' own timestamps, empty bins
+    # included, for the total, each protocol and each direction. start/end
+    # default to the first/last packet; the last bin may be partial.
+    resolution = check_resolution(resolution)
+    ts = features["ts"]
+    if start is None:
+        start = float(ts.min()) if len(ts) else 0.0
+    start = np.floor(start / resolution) * resolution
+    if end is None:
+        end = float(ts.max()) if len(ts) else start
+    length = max(int(np.floor((end - start) / resolution)) + 1, 1)
+    index = bin_index(ts, resolution, start)
+    inside = (index >= 0) & (index < length)
+    index = index[inside]
+    proto = np.asarray(features["proto"])[inside]
+    src_local = is_local(np.asarray(features["src"])[inside], local_nets)
+    dst_local = is_local(np.asarray(features["dst"])[inside], local_nets)
+    series = {
+        "start": float(start),
+        "resolution": resolution,
+        "total": bin_counts(index, length),
+        "bytes": bin_counts(index, length, weights=np.asarray(features["length"], dtype=np.float64)[inside]),
+    }
+    for name, number in PROTOCOLS.items():
+        series[name] = bin_counts(index, length, proto == number)
+    series["inbound"] = bin_counts(index, length, dst_local & ~src_local)
+    series["outbound"] = bin_counts(index, length, src_local & ~dst_local)
+    series["internal"] = bin_counts(index, length, src_local & dst_local)
+    return series
+
+
+def packets_per_second(ts, start=None, end=None, weights=None):
+    # A stats JSON's packets_per_second: counts per whole second from the
+    # packets' own timestamps, empty seconds included and the last, partial
+    # second kept. start/end (epoch seconds) stretch the span to the capture
+    # window; weights count timestamps that were already aggregated.
+    ts = np.asarray(ts, dtype=np.float64)
+    if len(ts):
+        start = ts.min() if start is None else min(start, ts.min())
+        end = ts.max() if end is None else max(end, ts.max())
+    if start is None:
+        return []
+    start = np.floor(start)
+    length = max(int(np.floor(end if end is not None else start) - start) + 1, 1)
+    weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+    return bin_counts(bin_index(ts, 1.0, start), length, weights=weights).astype(np.int64).tolist()
+
+
+def series_for_capture(stats, resolution=1.0):
+    # Series for a capture JSON, spanning its start_time..end_time so idle
+    # stretches at either end show up as empty bins. None without a
+    # feature sidecar.
+    path = stats.get("features_file") if stats else None
+    if not path or not os.path.exists(path):
+        return None
+    features = load_features(path)
+    start = end = None
+    if stats.get("start_time"):
+        start = datetime.fromisoformat(stats["start_time"]).timestamp()
+    if stats.get("end_time"):
+        end = datetime.fromisoformat(stats["end_time"]).timestamp()
+    if len(features):
+        first, last = float(features["ts"].min()), float(features["ts"].max())
+        start = first if start is None else min(start, first)
+        end = last if end is None else max(end, last)
+    elif start is None:
+        return None
+    return traffic_series(features, resolution, start, end)
+
+
+def rate(series, name="total"):
+    return series[name] / series["resolution"]
+
+
+def minmax_downsample(x, y, points):
+    # Keeps the min and max sample of each of points/2 equal-count buckets,
+    # so spikes survive however far a series is shrunk.
+    x, y = np.asarray(x), np.asarray(y, dtype=np.float64)
+    if len(y) <= points:
+        return x, y
+    width = int(np.ceil(len(y) / max(points // 2, 1)))
+    rows = int(np.ceil(len(y) / width))
+    padded = np.full(rows * width, np.nan)
+    padded[:len(y)] = y
+    grid = padded.reshape(rows, width)
+    base = np.arange(rows) * width
+    keep = np.unique(np.concatenate(([0, len(y) - 1], base + np.nanargmin(grid, axis=1),
+                                     base + np.nanargmax(grid, axis=1))))
+    return x[keep], y[keep]
+
+
+def lttb(x, y, points):
+    # Largest-Triangle-Three-Buckets: per bucket, the sample forming the
+    # largest triangle with the previous pick and the next bucket's mean.
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    if len(y) <= points or points < 3:
+        return x, y
+    edges = np.linspace(1, len(y) - 1, points - 1).astype(np.int64)
+    keep = [0]
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else len(y)
+        ax, ay = x[keep[-1]], y[keep[-1]]
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        keep.append(lo + int(np.argmax(area)))
+    keep.append(len(y) - 1)
+    return x[keep], y[keep]
+
+
+def downsample(x, y, points, method="minmax"):
+    if method == "lttb":
+        return lttb(x, y, points)
+    return minmax_downsample(x, y, points)
+
+
+def series_to_json(series):
+    return {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in series.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bin a feature sidecar into per-protocol/direction time series")
+    parser.add_argument("features")
+    parser.add_argument("-r", "--resolution", type=float, default=1.0, help="bin width in seconds (0.01-60)")
+    args = parser.parse_args()
+
+    series = traffic_series(load_features(args.features), args.resolution)
+    total = series["total"]
+    print(f"[✓] {len(total)} bins of {series['resolution']}s, {int(total.sum())} packets, "
+          f"{int(np.count_nonzero(total == 0))} empty bins")
+    print(f"    peak {rate(series).max():.1f} pkt/s, mean {rate(series).mean():.1f} pkt/s")
+    for name in ("tcp", "udp", "icmp", "inbound", "outbound", "internal"):
+        print(f"    {name:<9} {int(series[name].sum())}")
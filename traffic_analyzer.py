@@ -1,24 +1,85 @@
 #!/usr/bin/env python3
 import json
 import os
-import glob
+import hashlib
+import inspect
+import io
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
+from feature_store import load_features, stats_from_features
+from baseline_model import check_capture
+import timeseries
+from timeseries import series_for_capture, downsample
+from capture_catalog import find_runs, import_folder
+from segmentation import segment_capture
+from deviation import window_deviation
+import metrics
 
 OUTPUT_DIR = "../reports/charts"
+TIMESERIES_RESOLUTION = 1.0
+CHART_DPI = 150
+# TrafficSketch.summary's default, for sketch stats that predate its top_n.
+SKETCH_TOP_N = 20
+MAX_PLOT_POINTS = 2000
+CHART_CACHE_DIR = f"{OUTPUT_DIR}/cache"
+CHART_WORKERS = os.cpu_count() or 1
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def load_latest_json(folder):
-    files = glob.glob(f"{folder}/*.json")
-    if not files:
-        print(f"[!] No JSON files in {folder}")
+def load_latest_run(kind, folder, interface=None):
+    # Newest run of this kind from the capture catalog. Stats files in the
+    # folder that aren't catalogued yet are imported first; catalogued
+    # runs whose JSON has since been deleted are skipped.
+    import_folder(folder, kind, only_new=True)
+    run = next((r for r in find_runs(kind, interface) if os.path.exists(r['json_path'])), None)
+    if run is None:
+        print(f"[!] No {kind} runs in the catalog or {folder}")
         return None
-    latest = max(files, key=os.path.getctime)
-    print(f"[*] Loading: {latest}")
-    with open(latest) as f:
-        return json.load(f)
+    print(f"[*] Loading: {run['json_path']}")
+    with open(run['json_path']) as f:
+        data = json.load(f)
+    summary = data.get("summary_file")
+    if summary and os.path.exists(summary) and interface is None:
+        # Part of a multi-interface run: analyse the merged view.
+        print(f"[*] Loading merged run: {summary}")
+        with open(summary) as f:
+            return json.load(f)
+    return data
+
+def apply_feature_stats(data):
+    path = data.get("features_file") if data else None
+    if not path or not os.path.exists(path):
+        return data
+    print(f"[*] Recomputing stats from features: {path}")
+    sketch = data.get("sketch")
+    if sketch:
+        # Sketch runs keep their bounded shape: the sketch's top N ports and
+        # distinct counts, no per-IP lists.
+        for key in ("unique_src_ips", "unique_dst_ips"):
+            data.pop(key, None)
+        data.update(stats_from_features(load_features(path), top_n=sketch.get("top_n", SKETCH_TOP_N), ip_lists=False))
+    else:
+        data.update(stats_from_features(load_features(path), top_n=None))
+    return data
+
+def rate_series(data, resolution=TIMESERIES_RESOLUTION):
+    # (seconds since start, pkt/s per bin, full series or None). Binned from
+    # packet timestamps when the capture has a feature sidecar, else the
+    # stats' packets_per_second list.
+    series = series_for_capture(data, resolution)
+    if series is None:
+        pps = data.get('packets_per_second', []) or [0]
+        return np.arange(len(pps), dtype=float), np.asarray(pps, dtype=float), None
+    x = np.arange(len(series['total'])) * series['resolution']
+    return x, series['total'] / series['resolution'], series
+
+def figure_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=CHART_DPI, bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
 
 def chart_protocol_comparison(baseline, attack):
     fig, axes = plt.subplots(1, 2, figsize=(14, 6))
@@ -30,11 +91,7 @@ def chart_protocol_comparison(baseline, attack):
         ax.pie(values, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
         ax.set_title(title, fontsize=13, fontweight='bold')
     plt.tight_layout()
-    path = f"{OUTPUT_DIR}/chart1_protocol_comparison.png"
-    plt.savefig(path, dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"[✓] Chart 1 saved")
-    return path
+    return figure_png(fig)
 
 def chart_packet_volume(baseline, attack):
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -57,11 +114,7 @@ def chart_packet_volume(baseline, attack):
     ax.legend(fontsize=11)
     ax.grid(axis='y', alpha=0.3)
     plt.tight_layout()
-    path = f"{OUTPUT_DIR}/chart2_packet_volume.png"
-    plt.savefig(path, dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"[✓] Chart 2 saved")
-    return path
+    return figure_png(fig)
 
 def chart_top_ports(baseline, attack):
     fig, axes = plt.subplots(1, 2, figsize=(16, 7))
@@ -78,11 +131,7 @@ def chart_top_ports(baseline, attack):
             ax.text(bar.get_width() + 0.5, bar.get_y() + bar.get_height()/2, str(count), va='center', fontsize=9)
         ax.grid(axis='x', alpha=0.3)
     plt.tight_layout()
-    path = f"{OUTPUT_DIR}/chart3_top_ports.png"
-    plt.savefig(path, dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"[✓] Chart 3 saved")
-    return path
+    return figure_png(fig)
 
 def chart_packets_per_second(baseline, attack):
     fig, axes = plt.subplots(2, 1, figsize=(14, 10))
@@ -93,12 +142,16 @@ def chart_packets_per_second(baseline, attack):
         ['Baseline (Normal Behavior)', 'Attack Traffic (Deviation)'],
         ['#2196F3', '#F44336']
     ):
-        pps = data.get('packets_per_second', [0])
-        if not pps:
-            pps = [0]
-        x = list(range(len(pps)))
-        ax.plot(x, pps, color=color, linewidth=2)
-        ax.fill_between(x, pps, alpha=0.3, color=color)
+        x, pps, series = rate_series(data)
+        # Long captures are min/max-downsampled to a pixel-sized point count.
+        plot_x, plot_pps = downsample(x, pps, MAX_PLOT_POINTS)
+        ax.plot(plot_x, plot_pps, color=color, linewidth=2, label='Total')
+        ax.fill_between(plot_x, plot_pps, alpha=0.3, color=color)
+        if series is not None:
+            for name, proto_color in (('tcp', '#3F51B5'), ('udp', '#4CAF50'), ('icmp', '#FF9800')):
+                if series[name].any():
+                    ax.plot(*downsample(x, series[name] / series['resolution'], MAX_PLOT_POINTS),
+                            color=proto_color, linewidth=1, alpha=0.8, label=name.upper())
         ax.axhline(y=np.mean(pps), color='black', linestyle='--', alpha=0.7, label=f'Mean: {np.mean(pps):.1f} pkt/s')
         ax.set_xlabel('Time (seconds)', fontsize=11)
         ax.set_ylabel('Packets/Second', fontsize=11)
@@ -106,49 +159,163 @@ def chart_packets_per_second(baseline, attack):
         ax.legend(fontsize=10)
         ax.grid(alpha=0.3)
     plt.tight_layout()
-    path = f"{OUTPUT_DIR}/chart4_pps_timeline.png"
-    plt.savefig(path, dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"[✓] Chart 4 saved")
-    return path
+    return figure_png(fig)
+
+def file_fingerprint(path):
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return [path, st.st_size, st.st_mtime_ns]
+
+COUNT_FIELDS = ('total_packets', 'tcp_packets', 'udp_packets', 'icmp_packets')
+PPS_FIELDS = ('packets_per_second', 'features_file', 'start_time', 'end_time')
+
+# (file stem, chart function, capture fields the chart reads)
+CHARTS = [
+    ("chart1_protocol_comparison", chart_protocol_comparison, COUNT_FIELDS),
+    ("chart2_packet_volume", chart_packet_volume, COUNT_FIELDS),
+    ("chart3_top_ports", chart_top_ports, ('port_frequency',)),
+    ("chart4_pps_timeline", chart_packets_per_second, PPS_FIELDS),
+]
+
+def chart_inputs(data, fields):
+    return {k: data.get(k) for k in fields}
+
+def helper_source():
+    # Code every chart goes through besides its own function: the shared
+    # figure/series helpers here and the whole timeseries module (binning,
+    # downsampling). Read once per process.
+    global _HELPER_SOURCE
+    if _HELPER_SOURCE is None:
+        _HELPER_SOURCE = "".join(inspect.getsource(obj) for obj in (rate_series, figure_png, timeseries))
+    return _HELPER_SOURCE
+
+_HELPER_SOURCE = None
+
+def chart_key(name, func, baseline, attack):
+    # Content hash of everything that affects the PNG: the inputs, the
+    # feature file behind chart 4, the dpi, the chart code itself and the
+    # helpers it renders through.
+    payload = {
+        "chart": name,
+        "code": inspect.getsource(func),
+        "helpers": hashlib.sha256(helper_source().encode()).hexdigest(),
+        "matplotlib": matplotlib.__version__,
+        "dpi": CHART_DPI,
+        "points": MAX_PLOT_POINTS,
+        "resolution": TIMESERIES_RESOLUTION,
+        "inputs": [baseline, attack],
+        "features": [file_fingerprint(d.get('features_file')) for d in (baseline, attack)],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def _render_chart(index, baseline, attack):
+    return CHARTS[index][1](baseline, attack)
+
+def render_charts(runs, workers=CHART_WORKERS, cache_dir=CHART_CACHE_DIR):
+    # runs: [(baseline, attack), ...]. Returns per run a list of
+    # (path, png_bytes). Charts whose key is already in cache_dir are
+    # reused; the rest are rendered across one process pool.
+    os.makedirs(cache_dir, exist_ok=True)
+    results = [[None] * len(CHARTS) for _ in runs]
+    pending = {}
+    for r, (baseline, attack) in enumerate(runs):
+        for c, (name, func, fields) in enumerate(CHARTS):
+            b, a = chart_inputs(baseline, fields), chart_inputs(attack, fields)
+            cache_path = f"{cache_dir}/{chart_key(name, func, b, a)}.png"
+            if os.path.exists(cache_path):
+                with open(cache_path, 'rb') as f:
+                    results[r][c] = (cache_path, f.read())
+            else:
+                pending.setdefault(cache_path, []).append((r, c, b, a))
+    if pending:
+        jobs = [(path, targets[0][1], targets[0][2], targets[0][3]) for path, targets in pending.items()]
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+                pngs = list(pool.map(_render_chart, *zip(*[(c, b, a) for _, c, b, a in jobs])))
+        else:
+            pngs = [_render_chart(c, b, a) for _, c, b, a in jobs]
+        for (cache_path, _, _, _), png in zip(jobs, pngs):
+            tmp = cache_path + ".tmp"
+            with open(tmp, 'wb') as f:
+                f.write(png)
+            os.replace(tmp, cache_path)
+            for r, c, _, _ in pending[cache_path]:
+                results[r][c] = (cache_path, png)
+    print(f"[✓] Charts: {len(runs) * len(CHARTS) - sum(len(t) for t in pending.values())} cached, "
+          f"{len(pending)} rendered")
+    return results
 
 def calculate_deviation(baseline, attack):
     def safe_div(a, b):
         return round(((a - b) / b * 100), 1) if b > 0 else 0
+    baseline_pps = rate_series(baseline)[1]
+    attack_pps = rate_series(attack)[1]
     return {
         "total_packet_increase_pct": safe_div(attack['total_packets'], baseline['total_packets']),
         "tcp_increase_pct": safe_div(attack['tcp_packets'], baseline['tcp_packets']),
         "udp_increase_pct": safe_div(attack['udp_packets'], baseline['udp_packets']),
         "icmp_increase_pct": safe_div(attack['icmp_packets'], baseline['icmp_packets']),
-        "baseline_avg_pps": round(np.mean(baseline.get('packets_per_second', [0])), 2),
-        "attack_avg_pps": round(np.mean(attack.get('packets_per_second', [0])), 2),
+        "baseline_avg_pps": round(float(np.mean(baseline_pps)), 2),
+        "attack_avg_pps": round(float(np.mean(attack_pps)), 2),
+        "baseline_peak_pps": round(float(np.max(baseline_pps)), 2),
+        "attack_peak_pps": round(float(np.max(attack_pps)), 2),
+        "timeseries_resolution": TIMESERIES_RESOLUTION,
     }
 
 def run_analysis():
+    # Each step is timed as a stage in metrics.REGISTRY.
     print("\n[*] Loading data...")
-    baseline = load_latest_json("../captures/baseline")
-    attack = load_latest_json("../captures/attack")
+    with metrics.stage("load"):
+        baseline = load_latest_run("baseline", "../captures/baseline")
+        attack = load_latest_run("attack", "../captures/attack")
     if not baseline or not attack:
         print("[!] Missing data. Run capture scripts first.")
         return None
+    with metrics.stage("feature_stats"):
+        baseline, attack = apply_feature_stats(baseline), apply_feature_stats(attack)
     print("[*] Generating charts...")
-    chart1 = chart_protocol_comparison(baseline, attack)
-    chart2 = chart_packet_volume(baseline, attack)
-    chart3 = chart_top_ports(baseline, attack)
-    chart4 = chart_packets_per_second(baseline, attack)
-    deviation = calculate_deviation(baseline, attack)
+    with metrics.stage("charts"):
+        charts = render_charts([(baseline, attack)])[0]
+        for (name, _, _), (cache_path, png) in zip(CHARTS, charts):
+            with open(f"{OUTPUT_DIR}/{name}.png", 'wb') as f:
+                f.write(png)
+    with metrics.stage("deviation"):
+        deviation = calculate_deviation(baseline, attack)
     print(f"\n[*] DEVIATION SUMMARY")
     print(f"    Total Packet Increase : {deviation['total_packet_increase_pct']}%")
     print(f"    TCP Increase          : {deviation['tcp_increase_pct']}%")
     print(f"    ICMP Increase         : {deviation['icmp_increase_pct']}%")
     print(f"    Baseline Avg PPS      : {deviation['baseline_avg_pps']}")
     print(f"    Attack Avg PPS        : {deviation['attack_avg_pps']}")
+    print(f"    Attack Peak PPS       : {deviation['attack_peak_pps']} ({TIMESERIES_RESOLUTION}s bins)")
+    with metrics.stage("window_deviation"):
+        windows = window_deviation(baseline, attack)
+    if windows:
+        print(f"    Anomalous Windows     : {windows['anomalous_windows']}/{windows['attack_windows']} "
+              f"({windows['window_seconds']:g}s, >{windows['z_threshold']}σ)")
+        for w in windows["ranked_windows"][:3]:
+            print(f"      +{w['offset_s']:g}s {w['label']}: score {w['score']} ({w['worst_metric']})")
+    with metrics.stage("model_check"):
+        model_check = check_capture(attack)
+    for protocol, check in model_check.items():
+        if check["zscore"] is not None:
+            flag = "ANOMALOUS" if check["anomalous"] else "normal"
+            print(f"    {protocol.upper():<5} vs rolling baseline : z={check['zscore']} ({flag})")
+    with metrics.stage("segments"):
+        segments = attack.get("segments") or segment_capture(attack)
     return {
         "baseline": baseline,
         "attack": attack,
         "deviation": deviation,
-        "charts": [chart1, chart2, chart3, chart4]
+        "model_check": model_check,
+        "windows": windows,
+        "segments": segments,
+        "charts": [f"{OUTPUT_DIR}/{name}.png" for name, _, _ in CHARTS],
+        "chart_png": [png for _, png in charts]
     }
 
 if __name__ == "__main__":
     run_analysis()
+    metrics.export_analysis()
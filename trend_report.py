@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import argparse
+import base64
+import os
+import time
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from capture_catalog import find_runs, CATALOG_PATH, KINDS
+from rollups import update_rollups, trend_series
+from timeseries import downsample
+from traffic_analyzer import figure_png, MAX_PLOT_POINTS
+
+REPORT_PATH = "../reports/trend_report.html"
+DEFAULT_DAYS = 7
+RUN_TABLE_LIMIT = 50
+KIND_COLORS = {"baseline": '#2196F3', "attack": '#F44336'}
+
+
+def gapped_rates(series, points=MAX_PLOT_POINTS):
+    # Downsampled pkt/s with a NaN between buckets that are not adjacent,
+    # so time without any capture shows as a gap instead of a slope.
+    x = series["bucket_ts"]
+    if len(x) == 0:
+        return x, x
+    y = series["packets"] / np.maximum(series["seconds"], 1.0)
+    segment = np.concatenate(([0], np.cumsum(np.diff(x) > series["resolution"])))
+    dx, dy = downsample(x, y, points)
+    seg = segment[np.searchsorted(x, dx)]
+    breaks = np.flatnonzero(np.diff(seg)) + 1
+    dx = np.insert(dx, breaks, dx[breaks - 1] + series["resolution"])
+    dy = np.insert(dy, breaks, np.nan)
+    return dx, dy
+
+
+def chart_trend(since, until, interface=None, path=CATALOG_PATH):
+    fig, ax = plt.subplots(figsize=(14, 6))
+    resolution = None
+    for kind in KINDS:
+        series = trend_series(kind, since, until, interface, path=path)
+        resolution = series["resolution"]
+        x, y = gapped_rates(series)
+        if len(x):
+            ax.plot(x.astype('datetime64[s]'), y, color=KIND_COLORS[kind], linewidth=1.2, label=kind.title())
+    label = "1 min" if resolution == 60 else "1 h"
+    ax.set_title(f'Packets Per Second Trend ({label} rollups)', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Packets/Second', fontsize=11)
+    ax.grid(alpha=0.3)
+    if ax.lines:
+        ax.legend(fontsize=10)
+    fig.autofmt_xdate()
+    plt.tight_layout()
+    return figure_png(fig)
+
+
+def kind_summary(kind, since, until, interface=None, path=CATALOG_PATH):
+    series = trend_series(kind, since, until, interface, path=path)
+    seconds = series["seconds"].sum()
+    rates = series["packets"] / np.maximum(series["seconds"], 1.0)
+    return {
+        "packets": int(series["packets"].sum()),
+        "captured_hours": round(float(seconds) / 3600, 2),
+        "mean_pps": round(float(series["packets"].sum() / seconds), 2) if seconds else 0.0,
+        "peak_pps": round(float(rates.max()), 2) if len(rates) else 0.0,
+    }
+
+
+def generate_trend_report(since=None, until=None, interface=None, output=REPORT_PATH, path=CATALOG_PATH):
+    until = until or time.time()
+    since = since or until - DEFAULT_DAYS * 86400
+    added = update_rollups(path)
+    if added:
+        print(f"[*] Rolled up {added} new runs")
+    start = time.perf_counter()
+    png = chart_trend(since, until, interface, path)
+    print(f"[✓] Trend chart rendered in {time.perf_counter() - start:.2f}s")
+    summary_rows = ""
+    for kind in KINDS:
+        s = kind_summary(kind, since, until, interface, path)
+        summary_rows += (f"<tr><td>{kind.title()}</td><td>{s['packets']}</td><td>{s['captured_hours']}</td>"
+                         f"<td>{s['mean_pps']}</td><td>{s['peak_pps']}</td></tr>")
+    runs = find_runs(None, interface, since, until, RUN_TABLE_LIMIT, path)
+    run_rows = ""
+    for run in runs:
+        started = datetime.fromtimestamp(run["start_ts"]).strftime('%Y-%m-%d %H:%M:%S') if run["start_ts"] else "N/A"
+        run_rows += (f"<tr><td>{started}</td><td>{run['kind'].title()}</td><td>{run['interface'] or 'N/A'}</td>"
+                     f"<td>{run['total_packets']}</td><td>{os.path.basename(run['json_path'])}</td></tr>")
+    span = f"{datetime.fromtimestamp(since):%Y-%m-%d %H:%M} — {datetime.fromtimestamp(until):%Y-%m-%d %H:%M}"
+    html = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>Network Traffic Trend Report</title>
+<style>
+body{{font-family:'Segoe UI',sans-serif;background:#0f1117;color:#e0e0e0;margin:0;}}
+.header{{background:linear-gradient(135deg,#1a1f2e,#16213e);border-bottom:3px solid #00d4ff;padding:40px;text-align:center;}}
+.header h1{{font-size:2em;color:#00d4ff;margin-bottom:10px;}}
+.header p{{color:#888;}}
+.container{{max-width:1200px;margin:0 auto;padding:30px 20px;}}
+.section{{background:#1a1f2e;border-radius:12px;padding:25px;margin:20px 0;border:1px solid #2d3561;}}
+.section h2{{color:#00d4ff;font-size:1.3em;margin-bottom:20px;border-bottom:1px solid #2d3561;padding-bottom:10px;}}
+.section img{{width:100%;border-radius:8px;}}
+table{{width:100%;border-collapse:collapse;}}
+th{{background:#0f1117;color:#00d4ff;padding:12px;text-align:left;font-size:0.9em;}}
+td{{padding:10px 12px;border-bottom:1px solid #2d3561;font-size:0.9em;}}
+</style>
+</head>
+<body>
+<div class="header">
+<h1>Network Traffic Trend Report</h1>
+<p>{span} &nbsp;|&nbsp; Interface: {interface or 'all'} &nbsp;|&nbsp; Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+</div>
+<div class="container">
+<div class="section">
+<h2>Packet Rate Trend</h2>
+<img src="data:image/png;base64,{base64.b64encode(png).decode('utf-8')}" alt="Packet rate trend"/>
+</div>
+<div class="section">
+<h2>Totals</h2>
+<table>
+<tr><th>Run Type</th><th>Packets</th><th>Hours Captured</th><th>Mean PPS</th><th>Peak PPS</th></tr>
+{summary_rows}
+</table>
+</div>
+<div class="section">
+<h2>Latest Runs</h2>
+<table>
+<tr><th>Start</th><th>Type</th><th>Interface</th><th>Packets</th><th>Stats File</th></tr>
+{run_rows}
+</table>
+</div>
+</div>
+</body>
+</html>"""
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w') as f:
+        f.write(html)
+    print(f"[✓] Trend report saved: {output}")
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-run trend report from the capture catalog's rollups")
+    parser.add_argument("--since", help=f"ISO date/time (default: {DEFAULT_DAYS} days ago)")
+    parser.add_argument("--until", help="ISO date/time (default: now)")
+    parser.add_argument("--iface")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    parser.add_argument("--catalog", default=CATALOG_PATH)
+    args = parser.parse_args()
+
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    until = datetime.fromisoformat(args.until).timestamp() if args.until else None
+    generate_trend_report(since, until, args.iface, args.output, args.catalog)